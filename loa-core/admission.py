@@ -0,0 +1,206 @@
+"""
+9LMNTS STUDIO - Admission Control
+Per-client token buckets, a global concurrency cap with a priority wait queue, and fast 429/503 rejections
+"""
+
+import os
+import math
+import time
+import heapq
+import asyncio
+import logging
+import itertools
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+from log_config import setup_logging
+from metrics import admission_rejected, admission_wait, admission_active, queue_depth
+
+# Configure logging
+setup_logging()
+logger = logging.getLogger("ADMISSION")
+
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "64"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "128"))
+ADMISSION_MAX_WAIT = float(os.getenv("ADMISSION_MAX_WAIT", "2.0"))  # seconds a request may queue before 503
+ADMISSION_MAX_CLIENTS = int(os.getenv("ADMISSION_MAX_CLIENTS", "100000"))  # buckets kept (LRU)
+# Keys that get their own bucket via X-API-Key; any other caller is limited by IP, so made-up keys don't help
+ADMISSION_API_KEYS = frozenset(key.strip() for key in os.getenv("ADMISSION_API_KEYS", "").split(",") if key.strip())
+
+# Lanes: lower priority value is served first; rate/burst are per client (configured API key or IP)
+LANES = {
+    "inbound": {"priority": 0, "rate": 50.0, "burst": 200},  # signed webhooks and edge functions: few IPs, many events
+    "leads": {"priority": 0, "rate": 10.0, "burst": 30},
+    "chat": {"priority": 1, "rate": 2.0, "burst": 10},
+    "default": {"priority": 2, "rate": 5.0, "burst": 20},
+}
+ROUTE_LANES = {"/lead": "leads", "/api/submit-lead": "inbound", "/chat": "chat"}
+ROUTE_PREFIX_LANES = (("/webhook/", "inbound"),)
+# Never throttled: scrapes, health checks and the profiler must keep working during overload
+EXEMPT_PREFIXES = ("/metrics", "/health", "/workers", "/execution/stats", "/admission/stats", "/debug/", "/docs", "/openapi.json")
+
+for _lane, _config in LANES.items():
+    # ADMISSION_RATE_CHAT=2/10 -> 2 requests/second, bursts of 10
+    _override = os.getenv(f"ADMISSION_RATE_{_lane.upper()}")
+    if _override:
+        _rate, _, _burst = _override.partition("/")
+        _config["rate"] = float(_rate)
+        _config["burst"] = int(_burst or _config["burst"])
+
+
+class Rejected(Exception):
+    """Request refused before it reached a handler - becomes a 429/503 with Retry-After"""
+
+    def __init__(self, status: int, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class RateLimiter:
+    """Token bucket per (lane, client), least-recently-seen clients evicted past max_clients"""
+
+    def __init__(self, lanes: Dict[str, Dict] = LANES, max_clients: int = ADMISSION_MAX_CLIENTS):
+        self.lanes = lanes
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+
+    def check(self, lane: str, client: str):
+        """Take one token or raise Rejected(429) with the time until the next token"""
+        config = self.lanes[lane]
+        key = (lane, client)
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(config["burst"]), now]
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        tokens = min(config["burst"], bucket[0] + (now - bucket[1]) * config["rate"])
+        bucket[1] = now
+        if tokens < 1:
+            bucket[0] = tokens
+            raise Rejected(429, "rate_limited", (1 - tokens) / config["rate"])
+        bucket[0] = tokens - 1
+
+
+class ConcurrencyGate:
+    """At most max_concurrent requests in handlers; the rest wait in a bounded priority queue.
+
+    A freed slot goes straight to the highest-priority waiter. When the queue is full a
+    newcomer that outranks the worst waiter sheds it (hot leads displace chat), otherwise
+    the newcomer is refused immediately - under overload nobody waits longer than max_wait.
+    All state is touched only from the event loop thread, so no locks.
+    """
+
+    def __init__(self, max_concurrent: int = ADMISSION_MAX_CONCURRENT, max_queue: int = ADMISSION_MAX_QUEUE,
+                 max_wait: float = ADMISSION_MAX_WAIT):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.active = 0
+        self.queued = 0
+        self.service_time = 0.05  # EWMA of time a request holds its slot, for Retry-After estimates
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+    def retry_after(self) -> float:
+        return (self.queued + 1) * self.service_time / self.max_concurrent
+
+    def _shed_worst(self, priority: int) -> bool:
+        live = [entry for entry in self._waiters if not entry[2].done()]
+        if not live:
+            return False
+        worst = max(live, key=lambda entry: (entry[0], entry[1]))
+        if worst[0] <= priority:
+            return False
+        worst[2].set_exception(Rejected(503, "shed", self.retry_after()))
+        self.queued -= 1
+        return True
+
+    async def acquire(self, priority: int):
+        if self.active < self.max_concurrent and not self.queued:
+            self.active += 1
+            return
+        if self.queued >= self.max_queue and not self._shed_worst(priority):
+            raise Rejected(503, "queue_full", self.retry_after())
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        self.queued += 1
+        try:
+            done, _ = await asyncio.wait({future}, timeout=self.max_wait)
+        except asyncio.CancelledError:
+            # Client went away while queued: give back a slot we were just handed, or leave the queue
+            if future.done() and not future.cancelled() and future.exception() is None:
+                self.release(self.service_time)
+            elif not future.done():
+                future.cancel()
+                self.queued -= 1
+            raise
+        if not done:
+            future.cancel()
+            self.queued -= 1
+            raise Rejected(503, "queue_timeout", self.retry_after())
+        future.result()  # raises Rejected if this waiter was shed
+
+    def release(self, held_for: float):
+        self.service_time = 0.9 * self.service_time + 0.1 * held_for
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self.queued -= 1
+                future.set_result(True)  # hand the slot over - active stays the same
+                return
+        self.active -= 1
+
+
+class AdmissionController:
+    """Decides, before any handler runs, whether a request may proceed"""
+
+    def __init__(self, limiter: Optional[RateLimiter] = None, gate: Optional[ConcurrencyGate] = None):
+        self.limiter = limiter or RateLimiter()
+        self.gate = gate or ConcurrencyGate()
+
+    @staticmethod
+    def lane_for(path: str) -> Optional[str]:
+        if path.startswith(EXEMPT_PREFIXES):
+            return None
+        for prefix, lane in ROUTE_PREFIX_LANES:
+            if path.startswith(prefix):
+                return lane
+        return ROUTE_LANES.get(path.rstrip("/") or "/", "default")
+
+    @staticmethod
+    def client_key(headers, client_host: Optional[str]) -> str:
+        api_key = headers.get("x-api-key")
+        if api_key and api_key in ADMISSION_API_KEYS:
+            return f"key:{api_key}"
+        return f"ip:{client_host or 'unknown'}"
+
+    async def admit(self, lane: str, client: str):
+        """Rate limit, then wait for a concurrency slot; raises Rejected"""
+        try:
+            self.limiter.check(lane, client)
+            started = time.perf_counter()
+            await self.gate.acquire(LANES[lane]["priority"])
+            admission_wait.observe(time.perf_counter() - started, lane=lane)
+        except Rejected as e:
+            admission_rejected.inc(lane=lane, reason=e.reason)
+            raise
+
+    def release(self, held_for: float):
+        self.gate.release(held_for)
+
+    def collect(self):
+        """Metrics collector: slots in use and queue length"""
+        admission_active.set(self.gate.active)
+        queue_depth.set(self.gate.queued, queue="admission")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"active": self.gate.active, "queued": self.gate.queued, "max_concurrent": self.gate.max_concurrent,
+                "max_queue": self.gate.max_queue, "service_time_ms": round(self.gate.service_time * 1000, 1),
+                "clients_tracked": len(self.limiter._buckets), "lanes": LANES}
+
+
+admission = AdmissionController()
@@ -0,0 +1,215 @@
+"""
+9LMNTS STUDIO - Event OS Compliance Engine
+Batch license compliance auditing over platform usage logs
+"""
+
+import sys
+import json
+import logging
+from collections import Counter
+from typing import Dict, Any, List, Optional, Iterable, Iterator
+
+from service_catalog import get_catalog
+from log_config import setup_logging
+from execution import execution_policy, BLOCKING
+
+# Configure logging
+setup_logging()
+logger = logging.getLogger("COMPLIANCE_ENGINE")
+
+# Usage flags (what an event does) share bit positions with the license right that permits it,
+# so the violations of an event are simply `usage & ~rights`.
+NON_GLOBAL_USE = 1 << 0
+COMMERCIAL_USE = 1 << 1
+NO_ATTRIBUTION = 1 << 2
+TRANSFER = 1 << 3
+
+GLOBAL_GEOGRAPHIES = frozenset(["global", "worldwide", "any"])
+BATCH_RIGHTS_CACHE = 10000  # registry lookups remembered within one audit pass
+
+# (flag, penalty, violation message) - same scoring as EventOSLicense.verify_compliance
+COMPLIANCE_RULES = [
+    (NON_GLOBAL_USE, 20, "❌ Geographic scope violation"),
+    (COMMERCIAL_USE, 30, "❌ Commercial use restriction"),
+    (NO_ATTRIBUTION, 10, "⚠️ Attribution requirement violation"),
+    (TRANSFER, 15, "❌ Transfer rights violation"),
+]
+
+
+def _build_outcome(violation_mask: int) -> Dict[str, Any]:
+    score = 100
+    violations = []
+    for flag, penalty, message in COMPLIANCE_RULES:
+        if violation_mask & flag:
+            score -= penalty
+            violations.append(message)
+    status = "COMPLIANT" if score >= 90 else "NON_COMPLIANT" if score >= 70 else "VIOLATION"
+    return {
+        "compliance_score": score,
+        "status": status,
+        "violations": violations,
+        "recommended_action": "Proceed" if score >= 90 else "Review license terms"
+    }
+
+
+# Every possible violation combination scored once up front - evaluation is a table lookup
+OUTCOMES = [_build_outcome(mask) for mask in range(1 << len(COMPLIANCE_RULES))]
+
+
+def compile_rights(license_data: Dict) -> int:
+    """Compile a license's usage rights and terms into a rights bitmask"""
+    rights = 0
+    # Geographic restriction is enforced for every license (no regional grants exist yet)
+    if "Commercial use unlimited" in license_data["usage_rights"]:
+        rights |= COMMERCIAL_USE
+    if "9LMNTS attribution optional" in license_data["terms"]["attribution"]:
+        rights |= NO_ATTRIBUTION
+    if "Full IP rights transferable" in license_data["terms"]["transferability"]:
+        rights |= TRANSFER
+    return rights
+
+
+def usage_flags(usage_context: Dict) -> int:
+    """Compile a usage event/context into usage flags"""
+    flags = 0
+    if usage_context.get("geography") not in GLOBAL_GEOGRAPHIES:
+        flags |= NON_GLOBAL_USE
+    if usage_context.get("commercial"):
+        flags |= COMMERCIAL_USE
+    if usage_context.get("no_attribution"):
+        flags |= NO_ATTRIBUTION
+    if usage_context.get("transfer"):
+        flags |= TRANSFER
+    return flags
+
+
+def evaluate_usage(rights: int, usage_context: Dict) -> Dict:
+    """Score one usage context against compiled rights (returns a fresh dict)"""
+    outcome = OUTCOMES[usage_flags(usage_context) & ~rights]
+    return {**outcome, "violations": list(outcome["violations"])}
+
+
+class ComplianceEngine:
+    """Compiles license rights once and audits large streams of usage events against them.
+
+    Rights are resolved per license_id: explicitly added licenses first, then the license
+    registry, whose records carry the usage rights and terms snapshotted at issue time (records
+    written before those were stored fall back to per-package rights from the catalog).
+    Registry results are only remembered for the length of one audit pass, so a license
+    revoked by any worker fails the next audit.
+    """
+
+    def __init__(self, license_system=None):
+        self.license_system = license_system
+        self._rights: Dict[str, int] = {}
+
+    @property
+    def _package_rights(self) -> Dict[str, int]:
+        if self.license_system is None:
+            return {}
+        snapshot = get_catalog().current
+        terms = self.license_system.license_terms
+        return snapshot.derive("compliance_package_rights", lambda snap: {
+            package: compile_rights({"usage_rights": package_info["restrictions"], "terms": terms})
+            for package, package_info in snap.licenses.items()
+        })
+
+    def add_license(self, license_data: Dict):
+        self._rights[license_data["license_id"]] = compile_rights(license_data)
+
+    def add_licenses(self, licenses: Iterable[Dict]):
+        for license_data in licenses:
+            self.add_license(license_data)
+
+    def rights_for(self, license_id: str) -> Optional[int]:
+        """Compiled rights of an active license; None if unknown or revoked (checked against the registry)"""
+        rights = self._rights.get(license_id)
+        if rights is not None:
+            return rights
+        registry = getattr(self.license_system, "registry", None)
+        if registry is None:
+            return None
+        record = registry.lookup(license_id)
+        if record is None or record["status"] != "active":
+            return None
+        if "usage_rights" in record and "terms" in record:
+            return compile_rights(record)
+        return self._package_rights.get(record["service_package"], 0)
+
+    def evaluate_batch(self, events: Iterable[Dict]) -> Iterator[Dict]:
+        """Stream compliance results for usage events, one per event, in input order"""
+        resolved: Dict[str, Optional[int]] = {}  # this pass only - bounded, and gone once the audit ends
+        for event in events:
+            license_id = event.get("license_id", "")
+            if license_id in resolved:
+                rights = resolved[license_id]
+            else:
+                rights = self.rights_for(license_id)
+                if len(resolved) >= BATCH_RIGHTS_CACHE:
+                    resolved.clear()
+                resolved[license_id] = rights
+            if rights is None:
+                yield {"license_id": license_id, "status": "UNKNOWN_LICENSE", "compliance_score": 0,
+                       "violations": ["❌ Unknown or revoked license"], "recommended_action": "Review license terms"}
+                continue
+            outcome = OUTCOMES[usage_flags(event) & ~rights]
+            # Outcome dicts are shared lookup-table entries - callers must not mutate them
+            yield {"license_id": license_id, **outcome}
+
+    @execution_policy(BLOCKING)
+    def audit(self, events: Iterable[Dict], results_path: Optional[str] = None) -> Dict:
+        """Evaluate a whole usage stream in a single pass and aggregate violation counts"""
+        status_counts = Counter()
+        violation_counts = Counter()
+        violating_licenses = Counter()
+        total = 0
+
+        results_file = open(results_path, "w") if results_path else None
+        try:
+            for result in self.evaluate_batch(events):
+                total += 1
+                status_counts[result["status"]] += 1
+                if result["violations"]:
+                    violation_counts.update(result["violations"])
+                    violating_licenses[result["license_id"]] += 1
+                if results_file:
+                    results_file.write(json.dumps(result, separators=(",", ":"), ensure_ascii=False) + "\n")
+        finally:
+            if results_file:
+                results_file.close()
+
+        logger.info("🔍 Compliance audit: %s events, %s compliant", total, status_counts.get('COMPLIANT', 0))
+
+        return {
+            "events": total,
+            "status_counts": dict(status_counts),
+            "violation_counts": dict(violation_counts),
+            "licenses_with_violations": len(violating_licenses),
+            "top_violators": violating_licenses.most_common(10),
+            "results_path": results_path
+        }
+
+
+def read_usage_log(path: str) -> Iterator[Dict]:
+    """Stream usage events from a JSONL platform usage log"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def main(argv: List[str]):
+    """Nightly audit: python compliance_engine.py <usage_log.jsonl> [results.jsonl]"""
+    if not argv:
+        print("Usage: python compliance_engine.py <usage_log.jsonl> [results.jsonl]")
+        return 1
+
+    from event_os_license import EventOSLicense, LicenseRegistry
+    engine = ComplianceEngine(EventOSLicense(registry=LicenseRegistry()))
+    summary = engine.audit(read_usage_log(argv[0]), argv[1] if len(argv) > 1 else None)
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
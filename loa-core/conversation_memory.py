@@ -0,0 +1,333 @@
+"""
+9LMNTS STUDIO - Conversation Memory
+Per-user turn history for LOA Brain: shared write-through store, bounded LRU with TTL, rolling summaries and token-windowed context
+"""
+
+import os
+import re
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict, Counter, deque
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from log_config import setup_logging
+from serialization import dumps
+from shared_state import get_shared_state, SharedMapping
+
+# Configure logging
+setup_logging()
+logger = logging.getLogger("MEMORY")
+
+MEMORY_MAX_USERS = int(os.getenv("MEMORY_MAX_USERS", "10000"))  # conversations held in RAM per worker
+MEMORY_TTL = float(os.getenv("MEMORY_TTL", "1800"))  # idle seconds before a conversation drops out of RAM
+MEMORY_MAX_TURNS = int(os.getenv("MEMORY_MAX_TURNS", "20"))  # verbatim turns kept; older ones fold into the summary
+MEMORY_CONTEXT_TOKENS = int(os.getenv("MEMORY_CONTEXT_TOKENS", "2000"))  # history budget for one prompt
+MEMORY_MAX_FACTS = 20
+SUMMARY_EARLIER = 5  # openings of forgotten turns kept in the summary
+SNIPPET_CHARS = 80
+
+# Intents mirror LOABrain.think's routing (checked in the same order)
+INTENTS = (
+    ("pillar_inquiry", ("mcing", "djing", "graffiti", "breaking", "beatboxing", "knowledge", "fashion", "entrepreneurship", "language")),
+    ("sales_inquiry", ("lead", "client", "customer", "sale", "deal", "revenue", "money", "paid")),
+    ("proposal", ("proposal",)),
+    ("deploy", ("deploy",)),
+    ("status", ("status",)),
+    ("scraping", ("scrap", "target")),
+)
+PILLARS = INTENTS[0][1]
+# An amount only counts as a budget with a currency marker, a "k" or the word "budget" next to it
+_BUDGET = re.compile(r"(\$|usd\s?)?(\d{1,3}(?:,\d{3})+|\d+(?:\.\d+)?)\s?(k\b)?(\s?(?:usd|dollars|bucks)\b)?", re.IGNORECASE)
+_BUDGET_WORD = re.compile(r"\bbudget", re.IGNORECASE)
+BUDGET_WORD_DISTANCE = 20  # characters between "budget" and the amount
+
+
+def classify_intent(message: str) -> str:
+    text = message.lower()
+    for intent, keywords in INTENTS:
+        if any(keyword in text for keyword in keywords):
+            return intent
+    return "general"
+
+
+def estimate_tokens(text: str) -> int:
+    """~4 characters per token - close enough for budgeting without a tokenizer dependency"""
+    return len(text) // 4 + 1
+
+
+def _budget_in(text: str) -> Optional[int]:
+    """Largest budget-like amount: "$5,000", "5k", "3000 usd", "budget is 4000" - not "10000 followers" """
+    best = None
+    for match in _BUDGET.finditer(text):
+        currency, number, thousands, suffix = match.groups()
+        if not (currency or thousands or suffix):
+            nearby = text[max(0, match.start() - BUDGET_WORD_DISTANCE):match.end() + BUDGET_WORD_DISTANCE]
+            if not _BUDGET_WORD.search(nearby):
+                continue
+        value = float(number.replace(",", "")) * (1000 if thousands else 1)
+        if value >= 100 and (best is None or value > best):
+            best = int(value)
+    return best
+
+
+class Conversation:
+    """One user's memory: the last N turns verbatim plus a summary that absorbs everything older.
+
+    Every update is O(1): a turn is appended to a bounded deque, and the turn it pushes
+    out is folded into the summary counters instead of being rescanned later.
+    """
+
+    def __init__(self, user_id: str, max_turns: int = MEMORY_MAX_TURNS):
+        self.user_id = user_id
+        self.turns: deque = deque(maxlen=max_turns)  # (timestamp, message, response, tokens)
+        self.turn_tokens = 0
+        self.total_turns = 0
+        self.first_at: Optional[float] = None
+        self.last_at = time.time()
+        self.touched = time.monotonic()  # last read or write, for the LRU's idle check
+        self.intents: Counter = Counter()
+        self.pillars: List[str] = []
+        self.budget: Optional[int] = None
+        self.facts: Dict[str, str] = {}
+        self.earlier: deque = deque(maxlen=SUMMARY_EARLIER)
+        self._summary: Optional[str] = None
+
+    def add_turn(self, message: str, response: str, intent: str, at: Optional[float] = None):
+        at = at or time.time()
+        if len(self.turns) == self.turns.maxlen:
+            _, old_message, _, old_tokens = self.turns[0]
+            self.turn_tokens -= old_tokens
+            self.earlier.append(old_message[:SNIPPET_CHARS])
+        tokens = estimate_tokens(message) + estimate_tokens(response)
+        self.turns.append((at, message, response, tokens))
+        self.turn_tokens += tokens
+        self.total_turns += 1
+        self.first_at = self.first_at or at
+        self.last_at = at
+        self.intents[intent] += 1
+        text = message.lower()
+        for pillar in PILLARS:
+            if pillar in text and pillar not in self.pillars:
+                self.pillars.append(pillar)
+        self.budget = _budget_in(message) or self.budget
+        self._summary = None
+
+    def remember(self, facts: Dict[str, Any]):
+        """Keep scalar request context (company, channel, ...) - the newest value wins"""
+        for key, value in facts.items():
+            if isinstance(value, (str, int, float, bool)) and (key in self.facts or len(self.facts) < MEMORY_MAX_FACTS):
+                self.facts[str(key)] = str(value)[:SNIPPET_CHARS]
+                self._summary = None
+
+    def summary(self) -> str:
+        """One paragraph for the prompt, rebuilt only after the conversation changes"""
+        if self._summary is None:
+            if not self.total_turns and not self.facts:
+                self._summary = ""
+                return self._summary
+            parts = [f"{self.total_turns} messages"]
+            if self.first_at:
+                parts[0] += f" since {datetime.fromtimestamp(self.first_at):%Y-%m-%d}"
+            if self.intents:
+                parts.append("mostly " + ", ".join(intent for intent, _ in self.intents.most_common(2)))
+            if self.pillars:
+                parts.append("interested in " + ", ".join(pillar.title() for pillar in self.pillars))
+            if self.budget:
+                parts.append(f"budget ~${self.budget:,}")
+            if self.facts:
+                parts.append("known: " + ", ".join(f"{key}={value}" for key, value in self.facts.items()))
+            if self.earlier:
+                parts.append("earlier topics: " + " | ".join(self.earlier))
+            self._summary = "; ".join(parts)
+        return self._summary
+
+    def window(self, max_tokens: int) -> List[Tuple[float, str, str, int]]:
+        """Newest turns that fit in max_tokens, oldest first - walks back only as far as the budget reaches"""
+        if self.turn_tokens <= max_tokens:
+            return list(self.turns)
+        selected = []
+        used = 0
+        for turn in reversed(self.turns):
+            if used + turn[3] > max_tokens:
+                break
+            selected.append(turn)
+            used += turn[3]
+        selected.reverse()
+        return selected
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"user_id": self.user_id, "turns": list(self.turns), "total_turns": self.total_turns,
+                "first_at": self.first_at, "last_at": self.last_at, "intents": dict(self.intents),
+                "pillars": self.pillars, "budget": self.budget, "facts": self.facts, "earlier": list(self.earlier)}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], max_turns: int = MEMORY_MAX_TURNS) -> "Conversation":
+        conversation = cls(data["user_id"], max_turns)
+        for turn in data["turns"][-max_turns:]:
+            conversation.turns.append(tuple(turn))
+        conversation.turn_tokens = sum(turn[3] for turn in conversation.turns)
+        conversation.total_turns = data["total_turns"]
+        conversation.first_at = data["first_at"]
+        conversation.last_at = data["last_at"]
+        conversation.intents = Counter(data["intents"])
+        conversation.pillars = data["pillars"]
+        conversation.budget = data["budget"]
+        conversation.facts = data["facts"]
+        conversation.earlier.extend(data["earlier"])
+        return conversation
+
+
+class ConversationMemory:
+    """Conversations by user id, written through to the shared SQLite store on every turn.
+
+    The store is the source of truth, so any worker process can serve a user's next
+    message. RAM holds an LRU of decoded conversations (idle ones drop out after `ttl`);
+    on each access the stored payload is compared with the cached copy's digest and
+    decoded again only if another worker has written since.
+    """
+
+    def __init__(self, store=None, max_users: int = MEMORY_MAX_USERS, ttl: float = MEMORY_TTL,
+                 max_turns: int = MEMORY_MAX_TURNS):
+        self._store = store
+        self.max_users = max_users
+        self.ttl = ttl
+        self.max_turns = max_turns
+        self._users: "OrderedDict[str, Tuple[Conversation, int]]" = OrderedDict()  # user -> (conversation, payload hash)
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "loads": 0, "misses": 0, "writes": 0, "expired": 0}
+
+    @property
+    def store(self):
+        if self._store is None:
+            self._store = SharedMapping(get_shared_state(), "conversations")
+        return self._store
+
+    def _evict(self, keep: str):
+        """Drop idle conversations (the LRU front is the least recently used) and any overflow - lock held.
+
+        Nothing is lost: every turn is already in the store.
+        """
+        deadline = time.monotonic() - self.ttl
+        while self._users:
+            user_id, (conversation, _) = next(iter(self._users.items()))
+            if user_id == keep or conversation.touched >= deadline and len(self._users) <= self.max_users:
+                break
+            self._users.popitem(last=False)
+            if conversation.touched < deadline:
+                self.counters["expired"] += 1
+
+    def _checkout(self, user_id: str) -> Conversation:
+        """Current conversation for user_id, moved to the LRU tail - call with the lock held"""
+        cached = self._users.pop(user_id, None)
+        try:
+            raw = self.store.get(user_id)
+            digest = hash(raw) if raw is not None else None
+        except Exception as e:
+            logger.error("❌ Could not load conversation %s: %s", user_id, e)
+            raw, digest = None, cached[1] if cached else None  # serve the cached copy while the store is down
+        if cached is not None and cached[1] == digest:
+            conversation = cached[0]  # unchanged since we last wrote or read it
+            self.counters["hits"] += 1
+        elif raw is not None:
+            conversation = Conversation.from_dict(json.loads(raw), self.max_turns)
+            self.counters["loads"] += 1
+        else:
+            conversation = Conversation(user_id, self.max_turns)
+            self.counters["misses"] += 1
+        self._users[user_id] = (conversation, digest)
+        conversation.touched = time.monotonic()
+        self._evict(keep=user_id)
+        return conversation
+
+    def record(self, user_id: str, message: str, response: str, context: Optional[Dict[str, Any]] = None) -> str:
+        """Append one exchange; returns its intent.
+
+        The read-modify-write runs inside one store transaction, so turns recorded for the
+        same user by different workers at the same moment are all kept.
+        """
+        intent = classify_intent(message)
+        updated: List[Conversation] = []
+
+        def append_turn(raw: Optional[bytes]) -> bytes:
+            if cached is not None and raw is not None and cached[1] == hash(raw):
+                conversation = cached[0]
+                self.counters["hits"] += 1
+            elif raw is not None:
+                conversation = Conversation.from_dict(json.loads(raw), self.max_turns)
+                self.counters["loads"] += 1
+            else:
+                conversation = Conversation(user_id, self.max_turns)
+                self.counters["misses"] += 1
+            conversation.add_turn(message, response, intent)
+            if context:
+                conversation.remember(context)
+            updated.append(conversation)
+            return dumps(conversation.to_dict())
+
+        with self._lock:
+            cached = self._users.pop(user_id, None)  # re-cached only once the write has committed
+            try:
+                payload = self.store.modify(user_id, append_turn)
+            except Exception as e:
+                logger.error("❌ Could not save conversation %s: %s", user_id, e)
+                return intent
+            self.counters["writes"] += 1
+            conversation = updated[0]
+            conversation.touched = time.monotonic()
+            self._users[user_id] = (conversation, hash(payload))
+            self._evict(keep=user_id)
+        return intent
+
+    def context(self, user_id: str, max_tokens: int = MEMORY_CONTEXT_TOKENS) -> Dict[str, Any]:
+        """Summary plus the newest turns that fit the token budget (the summary's tokens count too)"""
+        with self._lock:
+            conversation = self._checkout(user_id)
+            summary = conversation.summary()
+            turns = conversation.window(max(0, max_tokens - estimate_tokens(summary)))
+            total_turns = conversation.total_turns
+        return {"user_id": user_id, "summary": summary, "total_turns": total_turns,
+                "turns": [{"at": datetime.fromtimestamp(at).isoformat(), "message": message, "response": response}
+                          for at, message, response, _ in turns],
+                "tokens": estimate_tokens(summary) + sum(turn[3] for turn in turns)}
+
+    def recall(self, user_id: str) -> Dict[str, Any]:
+        """What the brain remembers about a user, for routing decisions"""
+        with self._lock:
+            conversation = self._checkout(user_id)
+            return {"total_turns": conversation.total_turns, "budget": conversation.budget,
+                    "pillars": list(conversation.pillars), "facts": dict(conversation.facts)}
+
+    def messages(self, user_id: str, system_prompt: str, user_input: str,
+                 max_tokens: int = MEMORY_CONTEXT_TOKENS) -> List[Dict[str, str]]:
+        """Chat-completion style prompt: system (+ summary), windowed history, then the new message"""
+        memory = self.context(user_id, max_tokens)
+        system = system_prompt
+        if memory["summary"]:
+            system += f"\n\nConversation so far with this user: {memory['summary']}"
+        prompt = [{"role": "system", "content": system}]
+        for turn in memory["turns"]:
+            prompt.append({"role": "user", "content": turn["message"]})
+            prompt.append({"role": "assistant", "content": turn["response"]})
+        prompt.append({"role": "user", "content": user_input})
+        return prompt
+
+    def forget(self, user_id: str):
+        """Erase a user's history from RAM and the store"""
+        with self._lock:
+            self._users.pop(user_id, None)
+            self.store.pop(user_id, None)
+
+    def flush(self):
+        """Drop the RAM cache at shutdown (every turn is already in the store)"""
+        with self._lock:
+            self._users.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"in_memory": len(self._users), "max_users": self.max_users, "ttl": self.ttl,
+                    "max_turns": self.max_turns, **self.counters}
+
+
+conversation_memory = ConversationMemory()
@@ -0,0 +1,250 @@
+"""
+9LMNTS STUDIO - Document Rendering Engine
+Compiled templates, fixed-width box layouts and cached text/HTML/PDF output for certificates and sales copy
+"""
+
+import html
+import string
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple, Union
+from log_config import setup_logging
+
+# Configure logging
+setup_logging()
+logger = logging.getLogger("DOCUMENT_RENDERER")
+
+TARGETS = ("text", "html", "pdf")
+
+
+def display_width(text: str) -> int:
+    """Terminal/monospace column width - wide chars (emoji, CJK) take 2 columns, combining marks 0"""
+    width = 0
+    for ch in text:
+        if unicodedata.combining(ch) or ch in "\ufe0f\u200d":
+            continue
+        width += 2 if unicodedata.east_asian_width(ch) in ("W", "F") else 1
+    return width
+
+
+def pad_to_width(text: str, width: int) -> str:
+    return text + " " * max(0, width - display_width(text))
+
+
+def _split_to_width(word: str, width: int) -> List[str]:
+    """Break a word wider than the line into column-bounded chunks"""
+    chunks, chunk, used = [], "", 0
+    for ch in word:
+        ch_width = display_width(ch)
+        if chunk and used + ch_width > width:
+            chunks.append(chunk)
+            chunk, used = "", 0
+        chunk += ch
+        used += ch_width
+    return chunks + [chunk] if chunk else chunks
+
+
+def wrap_to_width(text: str, width: int) -> List[str]:
+    """Greedy word wrap measured in display columns (textwrap counts characters, not columns)"""
+    lines, line, used = [], "", 0
+    for word in text.split():
+        word_width = display_width(word)
+        if line and used + 1 + word_width <= width:
+            line += " " + word
+            used += 1 + word_width
+            continue
+        if line:
+            lines.append(line)
+        if word_width > width:
+            *full, word = _split_to_width(word, width)
+            lines.extend(full)
+            word_width = display_width(word)
+        line, used = word, word_width
+    if line:
+        lines.append(line)
+    return lines
+
+
+class CompiledTemplate:
+    """A template parsed once into literal/field segments; rendering is a single join"""
+
+    __slots__ = ("name", "segments", "fields")
+
+    def __init__(self, name: str, source: str):
+        self.name = name
+        self.segments: List[Tuple[str, Optional[str]]] = []
+        for literal, field, _, _ in string.Formatter().parse(source):
+            self.segments.append((literal, field or None))
+        self.fields = tuple(sorted({field for _, field in self.segments if field}))
+
+    def render(self, values: Dict[str, Any]) -> str:
+        parts = []
+        for literal, field in self.segments:
+            parts.append(literal)
+            if field:
+                parts.append(str(values.get(field, "")))
+        return "".join(parts)
+
+
+class BoxLayout:
+    """Fixed-width box drawing with correct padding for wide characters"""
+
+    def __init__(self, width: int = 72):
+        self.width = width  # interior width in columns
+        self.text_width = width - 4  # two columns of margin on each side
+
+    def _row(self, text: str = "") -> str:
+        return "║  " + pad_to_width(text, self.text_width) + "  ║"
+
+    def _wrap(self, text: str, indent: int = 0) -> List[str]:
+        return wrap_to_width(text, self.text_width - indent) or [""]
+
+    def render(self, title: str, blocks: List[Union[str, Tuple[str, List[str]]]]) -> str:
+        """Blocks are plain lines (wrapped), "" for a blank row, or (heading, [bullet, ...]) sections"""
+        rule = "═" * self.width
+        lines = ["╔" + rule + "╗"]
+        # A title wider than the box wraps onto centred lines instead of pushing the border out
+        for title_line in wrap_to_width(title, self.width - 2) or [""]:
+            title_pad = self.width - display_width(title_line)
+            lines.append("║" + " " * (title_pad // 2) + title_line + " " * (title_pad - title_pad // 2) + "║")
+        lines += ["╠" + rule + "╣", self._row()]
+        for block in blocks:
+            if isinstance(block, tuple):
+                heading, bullets = block
+                lines.append(self._row(heading))
+                for bullet in bullets:
+                    wrapped = self._wrap(bullet, indent=4)
+                    lines.append(self._row("  • " + wrapped[0]))
+                    lines.extend(self._row("    " + line) for line in wrapped[1:])
+                lines.append(self._row())
+            elif block == "":
+                lines.append(self._row())
+            else:
+                lines.extend(self._row(line) for line in self._wrap(block))
+        lines.append("╚" + rule + "╝")
+        return "\n".join(lines)
+
+
+# Box/emoji characters have no glyphs in the standard PDF fonts - map the box, drop the rest
+_PDF_TRANSLATION = str.maketrans({
+    "═": "=", "─": "-", "║": "|", "│": "|",
+    "╔": "+", "╗": "+", "╚": "+", "╝": "+", "╠": "+", "╣": "+",
+    "•": "*", "→": "->"
+})
+
+
+def text_to_pdf(text: str, lines_per_page: int = 60, font_size: int = 9) -> bytes:
+    """Minimal PDF writer: monospace text, one content stream per page"""
+    lines = [line.translate(_PDF_TRANSLATION).encode("latin-1", "ignore").decode("latin-1")
+             for line in text.splitlines()] or [""]
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)]
+
+    objects: List[bytes] = []
+    page_ids = [4 + 2 * i for i in range(len(pages))]
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    objects.append(("<< /Type /Pages /Kids [" + " ".join(f"{pid} 0 R" for pid in page_ids)
+                    + f"] /Count {len(pages)} >>").encode())
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier >>")
+    for page_id, page_lines in zip(page_ids, pages):
+        stream = [f"BT /F1 {font_size} Tf {font_size + 3} TL 40 800 Td"]
+        for line in page_lines:
+            escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            stream.append(f"({escaped}) Tj T*")
+        stream.append("ET")
+        content = "\n".join(stream).encode("latin-1")
+        objects.append((f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                        f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>").encode())
+        objects.append(f"<< /Length {len(content)} >>\nstream\n".encode() + content + b"\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref_at = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_at}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+class DocumentRenderer:
+    """Registry of compiled templates with an LRU cache of rendered output per (template, inputs, target)"""
+
+    def __init__(self, cache_size: int = 2048):
+        self.templates: Dict[str, CompiledTemplate] = {}
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Union[str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def register(self, name: str, source: str) -> CompiledTemplate:
+        template = self.templates[name] = CompiledTemplate(name, source)
+        return template
+
+    @staticmethod
+    def _cache_key(kind: str, target: str, parts) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{kind}\x00{target}".encode())
+        for part in parts:
+            digest.update(b"\x00" + str(part).encode("utf-8", "surrogatepass"))
+        return digest.hexdigest()
+
+    def _cached(self, key: str, build):
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.stats["hits"] += 1
+                return self._cache[key]
+        output = build()
+        with self._lock:
+            self.stats["misses"] += 1
+            self._cache[key] = output
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return output
+
+    def render(self, name: str, values: Dict[str, Any], target: str = "text", cache: bool = True) -> Union[str, bytes]:
+        """Render a registered template; only the fields the template uses go into the cache key.
+
+        Pass cache=False for one-off per-recipient renders (bulk campaigns) so they don't evict shared output.
+        """
+        template = self.templates[name]
+        if not cache:
+            return self._convert(template.render(values), target, preformatted=False)
+        key = self._cache_key(name, target, [(field, values.get(field, "")) for field in template.fields])
+        return self._cached(key, lambda: self._convert(template.render(values), target, preformatted=False))
+
+    def render_box(self, title: str, blocks: List, target: str = "text", width: int = 72) -> Union[str, bytes]:
+        """Render a fixed-width box document (certificates)"""
+        key = self._cache_key(f"box:{width}:{title}", target, blocks)
+        return self._cached(key, lambda: self._convert(BoxLayout(width).render(title, blocks), target, preformatted=True))
+
+    @staticmethod
+    def _convert(text: str, target: str, preformatted: bool) -> Union[str, bytes]:
+        if target == "text":
+            return text
+        if target == "html":
+            if preformatted:
+                return f'<pre class="document">{html.escape(text)}</pre>'
+            paragraphs = [p.strip() for p in text.strip().split("\n\n") if p.strip()]
+            return "\n".join(f"<p>{html.escape(p).replace(chr(10), '<br>')}</p>" for p in paragraphs)
+        if target == "pdf":
+            return text_to_pdf(text)
+        raise ValueError(f"Unknown render target: {target} (expected one of {', '.join(TARGETS)})")
+
+    def get_stats(self) -> Dict:
+        total = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "cached": len(self._cache),
+            "templates": len(self.templates),
+            "hit_rate": round(self.stats["hits"] / total, 3) if total else 0.0
+        }
+
+
+# Shared renderer for certificates, follow-ups and pitches
+renderer = DocumentRenderer()
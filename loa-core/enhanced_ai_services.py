@@ -11,11 +11,25 @@ from typing import Dict, Any, List, Optional
 import requests
 import os
 from loa_brain import LOABrain, NINE_PILLARS_SERVICES
+from structured_output import StructuredOutput, IncrementalJSONParser
+from metrics import instrument, instrument_llm
+from tracing import traced
+from execution import execution, BLOCKING
+from log_config import setup_logging
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+setup_logging()
 logger = logging.getLogger("ENHANCED_AI_SERVICES")
 
+# Models that accept response_format json_schema; the rest get JSON mode with the schema in the prompt
+OPENAI_SCHEMA_MODELS = tuple(os.getenv("OPENAI_SCHEMA_MODELS", "gpt-4o,gpt-4.1,o1,o3,o4").split(","))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))  # connect/read timeout, per streamed chunk too
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "60"))
+
+# Provider calls use blocking `requests` - dedicated pools keep them off the loop and away from other I/O
+execution.add_pool("openai", BLOCKING, int(os.getenv("OPENAI_WORKERS", "8")))
+execution.add_pool("gemini", BLOCKING, int(os.getenv("GEMINI_WORKERS", "4")))
+
 class EnhancedAIServices:
     def __init__(self):
         self.openai_api_key = os.getenv("OPENAI_API_KEY", "sk-abbc264f01284ae6b79de2ec8cd601ce")
@@ -27,7 +41,10 @@ class EnhancedAIServices:
         self.deepseek_base_url = "https://api.deepseek.com/v1"
         
         self.loa_brain = LOABrain()
+        self.structured = StructuredOutput()
         
+    @instrument("enhanced_ai", pillar="mcing_element")
+    @traced("enhanced_ai.brand_voice")
     async def generate_ai_brand_voice(self, company_info: Dict) -> Dict:
         """Generate custom AI brand voice using multiple AI models"""
         
@@ -54,7 +71,7 @@ class EnhancedAIServices:
         Format as JSON with clear structure for training a custom GPT model.
         """
         
-        openai_response = await self._call_openai(openai_prompt, "gpt-4-turbo")
+        personality = await self.structured.generate("mcing_element", openai_prompt, self._json_caller("gpt-4-turbo"))
         
         # Use Gemini for cultural adaptation
         gemini_prompt = f"""
@@ -80,7 +97,8 @@ class EnhancedAIServices:
             "industry": industry,
             "target_audience": target_audience,
             "brand_values": brand_values,
-            "personality": json.loads(openai_response.get("content", "{}")),
+            "personality": personality["data"],
+            "structured_output": self._output_report(personality),
             "cultural_adaptation": gemini_response.get("content", ""),
             "training_data": {
                 "model_type": "custom_gpt",
@@ -98,6 +116,8 @@ class EnhancedAIServices:
         
         return brand_voice
     
+    @instrument("enhanced_ai", pillar="graffiti_element")
+    @traced("enhanced_ai.visual_design_system")
     async def generate_ai_visual_design_system(self, brand_info: Dict) -> Dict:
         """Generate AI-powered visual design system"""
         
@@ -125,7 +145,7 @@ class EnhancedAIServices:
         Format as structured JSON for immediate implementation.
         """
         
-        openai_response = await self._call_openai(design_prompt, "gpt-4-turbo")
+        design_concepts = await self.structured.generate("graffiti_element", design_prompt, self._json_caller("gpt-4-turbo"))
         
         # Use Gemini for trend analysis
         trend_prompt = f"""
@@ -145,7 +165,8 @@ class EnhancedAIServices:
         design_system = {
             "brand": brand_name,
             "industry": industry,
-            "design_concepts": json.loads(openai_response.get("content", "{}")),
+            "design_concepts": design_concepts["data"],
+            "structured_output": self._output_report(design_concepts),
             "trend_analysis": gemini_response.get("content", ""),
             "ai_generation": {
                 "logo_variations": "Unlimited",
@@ -170,6 +191,8 @@ class EnhancedAIServices:
         
         return design_system
     
+    @instrument("enhanced_ai", pillar="entrepreneurship_element")
+    @traced("enhanced_ai.business_automation")
     async def generate_ai_business_automation(self, business_info: Dict) -> Dict:
         """Generate AI-powered business automation workflows"""
         
@@ -195,9 +218,10 @@ class EnhancedAIServices:
         7. Scalability considerations
         
         Focus on practical, immediately implementable solutions.
+        Format as JSON.
         """
         
-        openai_response = await self._call_openai(workflow_prompt, "gpt-4-turbo")
+        workflows = await self.structured.generate("entrepreneurship_element", workflow_prompt, self._json_caller("gpt-4-turbo"))
         
         # Use Gemini for technology stack recommendations
         tech_prompt = f"""
@@ -222,7 +246,8 @@ class EnhancedAIServices:
         automation_system = {
             "business": business_name,
             "type": business_type,
-            "workflows": json.loads(openai_response.get("content", "{}")),
+            "workflows": workflows["data"],
+            "structured_output": self._output_report(workflows),
             "technology_stack": gemini_response.get("content", ""),
             "ai_capabilities": {
                 "process_automation": "Intelligent workflow orchestration",
@@ -248,6 +273,8 @@ class EnhancedAIServices:
         
         return automation_system
     
+    @instrument("enhanced_ai", pillar="language_element")
+    @traced("enhanced_ai.multilingual_communication")
     async def generate_ai_multilingual_communication(self, communication_info: Dict) -> Dict:
         """Generate AI-powered multilingual communication system"""
         
@@ -272,9 +299,10 @@ class EnhancedAIServices:
         7. Communication channel optimization
         
         Focus on scalable, AI-driven solutions.
+        Format as JSON.
         """
         
-        openai_response = await self._call_openai(comm_prompt, "gpt-4-turbo")
+        strategy = await self.structured.generate("language_element", comm_prompt, self._json_caller("gpt-4-turbo"))
         
         # Use Gemini for cultural intelligence
         cultural_prompt = f"""
@@ -298,7 +326,8 @@ class EnhancedAIServices:
         multilingual_system = {
             "business": business_name,
             "target_markets": target_markets,
-            "communication_strategy": json.loads(openai_response.get("content", "{}")),
+            "communication_strategy": strategy["data"],
+            "structured_output": self._output_report(strategy),
             "cultural_intelligence": gemini_response.get("content", ""),
             "ai_capabilities": {
                 "real_time_translation": "100+ languages",
@@ -319,24 +348,59 @@ class EnhancedAIServices:
         
         return multilingual_system
     
-    async def _call_openai(self, prompt: str, model: str = "gpt-4-turbo") -> Dict:
-        """Call OpenAI API"""
+    def _json_caller(self, model: str):
+        """Provider call for StructuredOutput: OpenAI JSON-schema mode where the model supports it (JSON
+        mode with the schema in the prompt otherwise), streamed and parsed as it arrives"""
+        async def call(prompt: str, response_format: Dict) -> Dict:
+            if not model.startswith(OPENAI_SCHEMA_MODELS):
+                schema = response_format["json_schema"]["schema"]
+                prompt = f"{prompt.strip()}\n\nReturn ONLY a JSON object matching this JSON schema: {json.dumps(schema)}"
+                response_format = {"type": "json_object"}
+            return await self._call_openai(prompt, model, response_format=response_format, stream=True)
+        return call
+
+    @staticmethod
+    def _output_report(result: Dict) -> Dict:
+        return {key: result[key] for key in ("valid", "missing", "repaired", "attempts")}
+
+    @instrument_llm("openai")
+    @traced("llm.openai", kind="client")
+    async def _call_openai(self, prompt: str, model: str = "gpt-4-turbo", response_format: Optional[Dict] = None,
+                           stream: bool = False) -> Dict:
+        """Call OpenAI API (optionally in JSON-schema mode, streaming tokens through the incremental parser)"""
         try:
-            response = requests.post(
-                f"{self.openai_base_url}/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {self.openai_api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": model,
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": 0.7,
-                    "max_tokens": 4000
-                }
-            )
-            
-            if response.status_code == 200:
+            payload = {
+                "model": model,
+                "messages": [{"role": "user", "content": prompt}],
+                "temperature": 0.7,
+                "max_tokens": 4000
+            }
+            if response_format:
+                payload["response_format"] = response_format
+            if stream:
+                payload["stream"] = True
+                payload["stream_options"] = {"include_usage": True}
+            # The whole exchange, stream included, is blocking I/O - it runs on the openai pool
+            return await execution.run_in("openai", self._post_openai, payload, model, stream)
+                
+        except Exception as e:
+            logger.error("❌ OpenAI call error: %s", e)
+            return {"status": "error", "error": str(e)}
+
+    def _post_openai(self, payload: Dict, model: str, stream: bool) -> Dict:
+        with requests.post(
+            f"{self.openai_base_url}/chat/completions",
+            headers={
+                "Authorization": f"Bearer {self.openai_api_key}",
+                "Content-Type": "application/json"
+            },
+            json=payload,
+            stream=stream,
+            timeout=OPENAI_TIMEOUT
+        ) as response:
+            if response.status_code == 200 and stream:
+                return self._read_openai_stream(response, model)
+            elif response.status_code == 200:
                 data = response.json()
                 return {
                     "status": "success",
@@ -345,17 +409,49 @@ class EnhancedAIServices:
                     "tokens_used": data["usage"]["total_tokens"]
                 }
             else:
-                logger.error(f"❌ OpenAI API error: {response.text}")
+                logger.error("❌ OpenAI API error: %s", response.text)
                 return {"status": "error", "error": response.text}
-                
-        except Exception as e:
-            logger.error(f"❌ OpenAI call error: {e}")
-            return {"status": "error", "error": str(e)}
     
+    def _read_openai_stream(self, response, model: str) -> Dict:
+        """Assemble a streamed completion, tracking which JSON fields have fully arrived"""
+        parser = IncrementalJSONParser()
+        parts = []
+        finish_reason = None
+        tokens_used = 0
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data: "):
+                continue
+            data = line[len("data: "):]
+            if data == "[DONE]":
+                break
+            chunk = json.loads(data)
+            if chunk.get("usage"):
+                tokens_used = chunk["usage"]["total_tokens"]  # final chunk (stream_options.include_usage)
+            for choice in chunk.get("choices", []):
+                delta = choice.get("delta", {}).get("content") or ""
+                parts.append(delta)
+                parser.feed(delta)  # no-op once the object has closed
+                finish_reason = choice.get("finish_reason") or finish_reason
+        if finish_reason == "length":
+            logger.warning("⚠️ %s output truncated after fields: %s", model, ', '.join(parser.completed_keys))
+        return {
+            "status": "success",
+            # Trailing chatter after the closed object is dropped
+            "content": parser.text if parser.complete else "".join(parts),
+            "model": model,
+            "tokens_used": tokens_used,
+            "completed_fields": parser.completed_keys,
+            "finish_reason": finish_reason
+        }
+    
+    @instrument_llm("gemini")
+    @traced("llm.gemini", kind="client")
     async def _call_gemini(self, prompt: str) -> Dict:
         """Call Gemini API"""
         try:
-            response = requests.post(
+            response = await execution.run_in(
+                "gemini",
+                requests.post,
                 f"{self.gemini_base_url}/models/gemini-pro:generateContent?key={self.gemini_api_key}",
                 headers={"Content-Type": "application/json"},
                 json={
@@ -364,7 +460,8 @@ class EnhancedAIServices:
                         "temperature": 0.7,
                         "maxOutputTokens": 4000
                     }
-                }
+                },
+                timeout=GEMINI_TIMEOUT
             )
             
             if response.status_code == 200:
@@ -372,16 +469,19 @@ class EnhancedAIServices:
                 return {
                     "status": "success",
                     "content": data["candidates"][0]["content"]["parts"][0]["text"],
-                    "model": "gemini-pro"
+                    "model": "gemini-pro",
+                    "tokens_used": data.get("usageMetadata", {}).get("totalTokenCount", 0)
                 }
             else:
-                logger.error(f"❌ Gemini API error: {response.text}")
+                logger.error("❌ Gemini API error: %s", response.text)
                 return {"status": "error", "error": response.text}
                 
         except Exception as e:
-            logger.error(f"❌ Gemini call error: {e}")
+            logger.error("❌ Gemini call error: %s", e)
             return {"status": "error", "error": str(e)}
     
+    @instrument("enhanced_ai")
+    @traced("enhanced_ai.comprehensive_solution")
     async def generate_comprehensive_ai_solution(self, client_info: Dict) -> Dict:
         """Generate complete Nine Pillars AI solution"""
         
@@ -390,7 +490,7 @@ class EnhancedAIServices:
         requirements = client_info.get("requirements", "")
         budget = client_info.get("budget", 0)
         
-        logger.info(f"🚀 Generating comprehensive AI solution for {client_name}")
+        logger.info("🚀 Generating comprehensive AI solution for %s", client_name)
         
         # Generate all Nine Pillars services
         brand_voice = await self.generate_ai_brand_voice({
@@ -467,7 +567,7 @@ class EnhancedAIServices:
             }
         }
         
-        logger.info(f"✅ Generated comprehensive AI solution for {client_name}")
+        logger.info("✅ Generated comprehensive AI solution for %s", client_name)
         return comprehensive_solution
 
 # Initialize enhanced AI services
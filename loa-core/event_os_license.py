@@ -3,77 +3,284 @@
 Intellectual Property Protection for AI-Powered Digital Assets and Services
 """
 
+import os
+import re
+import dbm
 import json
+import time
+import base64
+import threading
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Iterable, Iterator, Tuple
 import logging
+from document_renderer import renderer
+from service_catalog import get_catalog, DEFAULT_LICENSE_VALUE
+from shared_state import get_shared_state, SharedMapping
+from log_config import setup_logging
+from execution import execution_policy, BLOCKING
+from serialization import dumps
+
+# Ed25519 signing for offline-verifiable licenses (requires `pip install cryptography`)
+try:
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+    SIGNING_AVAILABLE = True
+except ImportError:
+    SIGNING_AVAILABLE = False
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+setup_logging()
 logger = logging.getLogger("EVENT_OS_LICENSE")
 
+LICENSE_EXPORT_DIR = os.getenv("LICENSE_EXPORT_DIR", "licenses")
+LICENSE_REGISTRY_PATH = os.getenv("LICENSE_REGISTRY_PATH", "licenses/registry")
+LICENSE_REGISTRY_BACKEND = os.getenv("LICENSE_REGISTRY_BACKEND", "dbm")  # dbm | shared (multi-worker)
+LICENSE_SIGNING_KEY_PATH = os.getenv("LICENSE_SIGNING_KEY_PATH", "license_signing.key")
+LICENSE_VERIFY_BASE_URL = os.getenv("LICENSE_VERIFY_BASE_URL", "https://9lmntsstudio.com/verify")
+
+LEGAL_ENFORCEMENT = {
+    "jurisdiction": "International IP Law",
+    "dispute_resolution": "Arbitration",
+    "infringement_penalty": "3x project value + legal fees",
+    "attorney_fees": "Reimbursable if infringement proven"
+}
+
+# Built-in license catalog; the live values come from the service catalog (hot-reloadable)
+LICENSE_TYPES = {
+    "ai_brand_transformation": {
+        "name": "AI Brand Transformation License",
+        "code": "EVT-OS-BT-2025",
+        "duration": "perpetual",
+        "scope": "global",
+        "protections": [
+            "Custom GPT model ownership",
+            "AI-generated brand voice rights",
+            "Automated content IP",
+            "Visual design system variations",
+            "Multilingual communication assets"
+        ],
+        "restrictions": [
+            "No resale of core AI models",
+            "Attribution required for derivative works",
+            "Commercial use unlimited"
+        ]
+    },
+    "digital_dominance": {
+        "name": "Digital Dominance License",
+        "code": "EVT-OS-DD-2025",
+        "duration": "perpetual",
+        "scope": "global",
+        "protections": [
+            "AI automation workflows",
+            "UX optimization systems",
+            "Content generation pipelines",
+            "Business process IP"
+        ],
+        "restrictions": [
+            "Workflow redistribution restricted",
+            "System architecture confidential",
+            "Commercial use unlimited"
+        ]
+    },
+    "ai_business_empire": {
+        "name": "AI Business Empire License",
+        "code": "EVT-OS-BE-2025",
+        "duration": "perpetual",
+        "scope": "global",
+        "protections": [
+            "Enterprise AI systems",
+            "Custom automation solutions",
+            "Business intelligence IP",
+            "Scalable architecture rights"
+        ],
+        "restrictions": [
+            "No competitor transfer",
+            "Source code protection",
+            "Enterprise use unlimited"
+        ]
+    }
+}
+
+LICENSE_VALUES = {
+    "ai_brand_transformation": {
+        "market_value": 15000,
+        "license_price": 0,  # Included in service price
+        "client_roi": 9000,
+        "protection_level": "Standard"
+    },
+    "digital_dominance": {
+        "market_value": 25000,
+        "license_price": 0,
+        "client_roi": 17500,
+        "protection_level": "Professional"
+    },
+    "ai_business_empire": {
+        "market_value": 50000,
+        "license_price": 0,
+        "client_roi": 35000,
+        "protection_level": "Enterprise"
+    }
+}
+
+_CROCKFORD32 = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+
+class ULIDGenerator:
+    """Time-ordered unique IDs: 48-bit millisecond timestamp + 80 random bits, Crockford base32.
+
+    IDs generated within the same millisecond increment the random part, so they stay
+    strictly sortable by issue order.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._last_random = 0
+
+    def new(self) -> str:
+        with self._lock:
+            ms = int(time.time() * 1000)
+            if ms <= self._last_ms:
+                ms = self._last_ms
+                random_part = (self._last_random + 1) & ((1 << 80) - 1)
+            else:
+                random_part = int.from_bytes(os.urandom(10), "big")
+            self._last_ms, self._last_random = ms, random_part
+        value = (ms << 80) | random_part
+        return "".join(_CROCKFORD32[(value >> shift) & 31] for shift in range(125, -1, -5))
+
+
+ulid = ULIDGenerator()
+
+
+def _b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64url_decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+class LicenseSigner:
+    """Signs license claims with Ed25519 so anyone holding the public key can verify offline"""
+
+    def __init__(self, key_path: str = LICENSE_SIGNING_KEY_PATH):
+        seed = os.getenv("LICENSE_SIGNING_KEY")
+        if seed:
+            self._private_key = Ed25519PrivateKey.from_private_bytes(base64.b64decode(seed))
+        elif os.path.exists(key_path):
+            self._private_key = self._load(key_path)
+        else:
+            self._private_key = Ed25519PrivateKey.generate()
+            # Write then hard-link into place: if another API worker created the key first, use theirs
+            tmp_path = f"{key_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(base64.b64encode(self._private_key.private_bytes_raw()))
+            os.chmod(tmp_path, 0o600)
+            try:
+                os.link(tmp_path, key_path)
+                logger.info("🔑 Generated new license signing key: %s", key_path)
+            except FileExistsError:
+                self._private_key = self._load(key_path)
+            finally:
+                os.remove(tmp_path)
+        self.public_key = _b64url(self._private_key.public_key().public_bytes_raw())
+
+    @staticmethod
+    def _load(key_path: str):
+        with open(key_path, "rb") as f:
+            return Ed25519PrivateKey.from_private_bytes(base64.b64decode(f.read()))
+
+    def sign(self, claims: Dict) -> str:
+        """Compact token: base64url(claims JSON) + "." + base64url(signature)"""
+        payload = _b64url(json.dumps(claims, separators=(",", ":"), sort_keys=True).encode())
+        return payload + "." + _b64url(self._private_key.sign(payload.encode()))
+
+
+def verify_license_token(token: str, public_key: str) -> Dict:
+    """Verify a signed license token offline - no registry lookup. Raises ValueError if invalid."""
+    if not SIGNING_AVAILABLE:
+        raise RuntimeError("cryptography is not installed")
+    try:
+        payload, signature = token.split(".")
+        Ed25519PublicKey.from_public_bytes(_b64url_decode(public_key)).verify(_b64url_decode(signature), payload.encode())
+    except (ValueError, InvalidSignature):
+        raise ValueError("Invalid license signature")
+    return json.loads(_b64url_decode(payload))
+
+
+class LicenseRegistry:
+    """Persistent hash index of issued licenses: license_id -> compact license record"""
+
+    def __init__(self, path: str = LICENSE_REGISTRY_PATH, backend: str = LICENSE_REGISTRY_BACKEND):
+        self.path = path
+        if backend == "shared":
+            # dbm files can't be shared between worker processes - use the SQLite shared state instead
+            self._db = SharedMapping(get_shared_state(), "licenses")
+        else:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._db = dbm.open(path, "c")
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _record(license_data: Dict) -> bytes:
+        return json.dumps({
+            "license_id": license_data["license_id"],
+            "service_package": license_data["service_package"],
+            "type": license_data["license_info"]["type"],
+            "client": license_data["client_info"]["name"],
+            "company": license_data["client_info"]["company"],
+            "issue_date": license_data["license_info"]["issue_date"],
+            "signature": license_data.get("signature"),
+            # Terms as sold - compliance audits read these, not the live catalog
+            "usage_rights": license_data["usage_rights"],
+            "terms": license_data["terms"],
+            "status": "active"
+        }, separators=(",", ":")).encode()
+
+    def register(self, license_data: Dict):
+        with self._lock:
+            self._db[license_data["license_id"]] = self._record(license_data)
+
+    def lookup(self, license_id: str) -> Optional[Dict]:
+        with self._lock:
+            raw = self._db.get(license_id.encode())
+        return json.loads(raw) if raw else None
+
+    def revoke(self, license_id: str) -> bool:
+        with self._lock:
+            raw = self._db.get(license_id.encode())
+            if not raw:
+                return False
+            record = json.loads(raw)
+            record["status"] = "revoked"
+            self._db[license_id] = json.dumps(record, separators=(",", ":")).encode()
+        return True
+
+    def sync(self):
+        with self._lock:
+            if hasattr(self._db, "sync"):
+                self._db.sync()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._db)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
 class EventOSLicense:
     """
     Event OS IP License Framework for Nine Pillars AI Services
     Protects client intellectual property while enabling AI transformation
     """
     
-    def __init__(self):
-        self.license_types = {
-            "ai_brand_transformation": {
-                "name": "AI Brand Transformation License",
-                "code": "EVT-OS-BT-2025",
-                "duration": "perpetual",
-                "scope": "global",
-                "protections": [
-                    "Custom GPT model ownership",
-                    "AI-generated brand voice rights",
-                    "Automated content IP",
-                    "Visual design system variations",
-                    "Multilingual communication assets"
-                ],
-                "restrictions": [
-                    "No resale of core AI models",
-                    "Attribution required for derivative works",
-                    "Commercial use unlimited"
-                ]
-            },
-            "digital_dominance": {
-                "name": "Digital Dominance License",
-                "code": "EVT-OS-DD-2025", 
-                "duration": "perpetual",
-                "scope": "global",
-                "protections": [
-                    "AI automation workflows",
-                    "UX optimization systems",
-                    "Content generation pipelines",
-                    "Business process IP"
-                ],
-                "restrictions": [
-                    "Workflow redistribution restricted",
-                    "System architecture confidential",
-                    "Commercial use unlimited"
-                ]
-            },
-            "ai_business_empire": {
-                "name": "AI Business Empire License",
-                "code": "EVT-OS-BE-2025",
-                "duration": "perpetual", 
-                "scope": "global",
-                "protections": [
-                    "Enterprise AI systems",
-                    "Custom automation solutions",
-                    "Business intelligence IP",
-                    "Scalable architecture rights"
-                ],
-                "restrictions": [
-                    "No competitor transfer",
-                    "Source code protection",
-                    "Enterprise use unlimited"
-                ]
-            }
-        }
-        
+    def __init__(self, registry: Optional[LicenseRegistry] = None, signer: Optional[LicenseSigner] = None):
+        self.registry = registry
+        self.signer = signer
         self.license_terms = {
             "ownership": "Client owns 100% of delivered AI assets and custom models",
             "exclusivity": "9LMNTS cannot resell client-specific customizations",
@@ -83,15 +290,20 @@ class EventOSLicense:
             "protection": "Legal protection against IP infringement included"
         }
     
-    def generate_license(self, client_info: Dict, service_package: str, custom_terms: Optional[Dict] = None) -> Dict:
-        """Generate Event OS IP License for client"""
-        
+    @property
+    def license_types(self) -> Dict[str, Dict]:
+        return get_catalog().current.licenses
+
+    def _package_info(self, service_package: str) -> Dict:
         package_info = self.license_types.get(service_package)
         if not package_info:
             raise ValueError(f"Unknown service package: {service_package}")
-        
-        license_id = f"{package_info['code']}-{client_info.get('name', 'UNKNOWN')[:3].upper()}"
-        
+        return package_info
+
+    def _build_license(self, package_info: Dict, service_package: str, client_info: Dict,
+                       custom_terms: Optional[Dict], issued_at: str) -> Dict:
+        license_id = f"{package_info['code']}-{ulid.new()}"
+
         license_document = {
             "license_id": license_id,
             "client_info": {
@@ -103,8 +315,8 @@ class EventOSLicense:
             "license_info": {
                 "type": package_info["name"],
                 "code": package_info["code"],
-                "issue_date": datetime.now().isoformat(),
-                "start_date": datetime.now().isoformat(),
+                "issue_date": issued_at,
+                "start_date": issued_at,
                 "duration": package_info["duration"],
                 "scope": package_info["scope"],
                 "auto_renewal": True
@@ -114,78 +326,148 @@ class EventOSLicense:
             "usage_rights": package_info["restrictions"],
             "terms": self.license_terms,
             "custom_terms": custom_terms or {},
-            "legal_enforcement": {
-                "jurisdiction": "International IP Law",
-                "dispute_resolution": "Arbitration",
-                "infringement_penalty": "3x project value + legal fees",
-                "attorney_fees": "Reimbursable if infringement proven"
-            }
+            "legal_enforcement": LEGAL_ENFORCEMENT
         }
+
+        if self.signer is not None:
+            license_document["signature"] = self.signer.sign({
+                "lid": license_id,
+                "pkg": service_package,
+                "sub": license_document["client_info"]["name"],
+                "co": license_document["client_info"]["company"],
+                "iat": issued_at
+            })
+
+        return license_document
+
+    def generate_license(self, client_info: Dict, service_package: str, custom_terms: Optional[Dict] = None) -> Dict:
+        """Generate Event OS IP License for client"""
+        
+        package_info = self._package_info(service_package)
+        license_document = self._build_license(
+            package_info, service_package, client_info, custom_terms, datetime.now().isoformat()
+        )
+        if self.registry is not None:
+            self.registry.register(license_document)
         
-        logger.info(f"📋 Generated Event OS License: {license_id} for {client_info.get('name')}")
+        logger.info("📋 Generated Event OS License: %s for %s", license_document['license_id'], client_info.get('name'))
         
         return license_document
+
+    def generate_licenses_bulk(self, clients: Iterable[Dict], service_package: str,
+                               custom_terms: Optional[Dict] = None) -> Iterator[Dict]:
+        """Generate licenses for a batch of clients in one pass.
+
+        Package lookup and issue timestamp are resolved once for the whole batch, and the
+        package protections/terms are shared between the yielded documents - treat them
+        as read-only and serialize them as they come.
+        """
+        package_info = self._package_info(service_package)
+        issued_at = datetime.now().isoformat()
+        for client_info in clients:
+            license_document = self._build_license(package_info, service_package, client_info, custom_terms, issued_at)
+            if self.registry is not None:
+                self.registry.register(license_document)
+            yield license_document
+        if self.registry is not None:
+            self.registry.sync()
+
+    def export_licenses_jsonl(self, licenses: Iterable[Dict], batch_name: str,
+                              export_dir: str = LICENSE_EXPORT_DIR) -> Dict:
+        """Stream licenses to a compact JSON Lines archive plus an offset index.
+
+        The index (`<batch>.index.json`) maps each license to its byte offset and length in
+        the archive so single licenses can be read back without parsing the whole batch.
+        """
+        archive_path, index_path = self._batch_paths(batch_name, export_dir)
+        os.makedirs(export_dir, exist_ok=True)
+
+        encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+        entries = []
+        offset = 0
+        with open(archive_path, "xb") as f:  # an existing batch is never overwritten
+            for license_data in licenses:
+                line = (encoder.encode(license_data) + "\n").encode("utf-8")
+                f.write(line)
+                entries.append([license_data["license_id"], license_data["client_info"]["name"], offset, len(line)])
+                offset += len(line)
+
+        index = {
+            "version": "1.0",
+            "archive": os.path.basename(archive_path),
+            "generated_at": datetime.now().isoformat(),
+            "count": len(entries),
+            "fields": ["license_id", "client_name", "offset", "length"],
+            "entries": entries
+        }
+        with open(index_path, "x") as f:
+            json.dump(index, f, separators=(",", ":"))
+
+        logger.info("📁 Exported %s licenses: %s", len(entries), archive_path)
+
+        return {"archive": archive_path, "index": index_path, "count": len(entries), "bytes": offset}
+
+    @staticmethod
+    def _batch_paths(batch_name: str, export_dir: str) -> Tuple[str, str]:
+        batch_name = re.sub(r"[^A-Za-z0-9_.-]", "_", batch_name).lstrip(".")  # no path tricks from API input
+        return os.path.join(export_dir, f"{batch_name}.jsonl"), os.path.join(export_dir, f"{batch_name}.index.json")
+
+    @execution_policy(BLOCKING)
+    def issue_bulk_licenses(self, clients: List[Dict], service_package: str, batch_name: Optional[str] = None,
+                            custom_terms: Optional[Dict] = None, export_dir: str = LICENSE_EXPORT_DIR) -> Dict:
+        """Generate and export a whole batch of licenses in one fast pass"""
+        batch_name = batch_name or f"{service_package}_{datetime.now().strftime('%Y%m%d%H%M%S')}_{ulid.new()}"
+        archive_path, _ = self._batch_paths(batch_name, export_dir)
+        if os.path.exists(archive_path):
+            # Checked before issuing, so a name clash doesn't leave registered licenses without an archive
+            raise FileExistsError(f"License batch {os.path.basename(archive_path)[:-len('.jsonl')]} already exists")
+        licenses = self.generate_licenses_bulk(clients, service_package, custom_terms)
+        result = self.export_licenses_jsonl(licenses, batch_name, export_dir)
+        result["batch_name"] = os.path.basename(result["archive"])[:-len(".jsonl")]
+        result["service_package"] = service_package
+        return result
+
+    @staticmethod
+    def read_license_from_archive(index_path: str, position: int) -> Dict:
+        """Read the Nth license of an exported batch using its index (no full archive scan)"""
+        with open(index_path) as f:
+            index = json.load(f)
+        _, _, offset, length = index["entries"][position]
+        with open(os.path.join(os.path.dirname(index_path), index["archive"]), "rb") as f:
+            f.seek(offset)
+            return json.loads(f.read(length))
     
-    def create_license_certificate(self, license_data: Dict) -> str:
-        """Create printable license certificate"""
+    def create_license_certificate(self, license_data: Dict, target: str = "text"):
+        """Create printable license certificate (text, html or pdf)"""
         
-        certificate = f"""
-╔════════════════════════════════════════════════════════════════╗
-║                    EVENT OS IP LICENSE CERTIFICATE                      ║
-╠══════════════════════════════════════════════════════════════╣
-║                                                                              ║
-║  License ID: {license_data['license_id']}                                      ║
-║  Client: {license_data['client_info']['name']} ({license_data['client_info']['company']})         ║
-║  Service: {license_data['service_package']}                              ║
-║  Issue Date: {license_data['license_info']['issue_date'][:10]}                    ║
-║  Duration: Perpetual                                                        ║
-║  Scope: Global                                                            ║
-║                                                                              ║
-║  PROTECTED INTELLECTUAL PROPERTY:                                         ║
-║  {chr(10).join([f'  • {protection}' for protection in license_data['ip_protections'][:5]])}    ║
-║  {chr(10).join([f'  • {protection}' for protection in license_data['ip_protections'][5:]])}    ║
-║                                                                              ║
-║  USAGE RIGHTS:                                                           ║
-║  {chr(10).join([f'  • {right}' for right in license_data['usage_rights'][:3]])}           ║
-║  {chr(10).join([f'  • {right}' for right in license_data['usage_rights'][3:]])}           ║
-║                                                                              ║
-║  This license grants you perpetual, global rights to use the AI services and     ║
-║  intellectual property developed by 9LMNTS Studio for your business.            ║
-║                                                                              ║
-║  ISSUED BY:                                                              ║
-║  9LMNTS Studio - AI-Powered Digital Dominance                          ║
-║  https://9lmntsstudio.com                                              ║
-║  Event OS IP License Framework v1.0                                          ║
-╚══════════════════════════════════════════════════════════════════════╝
-        """
+        client = license_data['client_info']
+        blocks = [
+            f"License ID: {license_data['license_id']}",
+            f"Client: {client['name']} ({client['company']})",
+            f"Service: {license_data['service_package']}",
+            f"Issue Date: {license_data['license_info']['issue_date'][:10]}",
+            "Duration: Perpetual",
+            "Scope: Global",
+            "",
+            ("PROTECTED INTELLECTUAL PROPERTY:", license_data['ip_protections']),
+            ("USAGE RIGHTS:", license_data['usage_rights']),
+            "This license grants you perpetual, global rights to use the AI services and "
+            "intellectual property developed by 9LMNTS Studio for your business.",
+            "",
+            "ISSUED BY:",
+            "9LMNTS Studio - AI-Powered Digital Dominance",
+            "https://9lmntsstudio.com",
+            "Event OS IP License Framework v1.0",
+            ""
+        ]
         
-        return certificate.strip()
+        return renderer.render_box("EVENT OS IP LICENSE CERTIFICATE", blocks, target=target)
     
     def calculate_license_value(self, service_package: str) -> Dict:
         """Calculate the value and ROI of license"""
         
-        package_values = {
-            "ai_brand_transformation": {
-                "market_value": 15000,
-                "license_price": 0,  # Included in service price
-                "client_roi": 9000,
-                "protection_level": "Standard"
-            },
-            "digital_dominance": {
-                "market_value": 25000,
-                "license_price": 0,
-                "client_roi": 17500,
-                "protection_level": "Professional"
-            },
-            "ai_business_empire": {
-                "market_value": 50000,
-                "license_price": 0,
-                "client_roi": 35000,
-                "protection_level": "Enterprise"
-            }
-        }
-        
-        values = package_values.get(service_package, package_values["ai_brand_transformation"])
+        package_values = get_catalog().current.license_values
+        values = package_values.get(service_package, package_values[DEFAULT_LICENSE_VALUE])
         
         return {
             "market_value": values["market_value"],
@@ -197,38 +479,9 @@ class EventOSLicense:
     
     def verify_compliance(self, license_data: Dict, usage_context: Dict) -> Dict:
         """Verify license compliance for specific usage"""
-        
-        compliance_score = 100
-        violations = []
-        
-        # Check scope compliance
-        if usage_context.get("geography") not in ["global", "worldwide", "any"]:
-            compliance_score -= 20
-            violations.append("❌ Geographic scope violation")
-        
-        # Check commercial use
-        if usage_context.get("commercial") and "Commercial use unlimited" not in license_data["usage_rights"]:
-            compliance_score -= 30
-            violations.append("❌ Commercial use restriction")
-        
-        # Check attribution requirements
-        if usage_context.get("no_attribution") and "9LMNTS attribution optional" not in license_data["terms"]["attribution"]:
-            compliance_score -= 10
-            violations.append("⚠️ Attribution requirement violation")
-        
-        # Check transfer rights
-        if usage_context.get("transfer") and "Full IP rights transferable" not in license_data["terms"]["transferability"]:
-            compliance_score -= 15
-            violations.append("❌ Transfer rights violation")
-        
-        compliance_status = "COMPLIANT" if compliance_score >= 90 else "NON_COMPLIANT" if compliance_score >= 70 else "VIOLATION"
-        
-        return {
-            "compliance_score": compliance_score,
-            "status": compliance_status,
-            "violations": violations,
-            "recommended_action": "Proceed" if compliance_score >= 90 else "Review license terms"
-        }
+        from compliance_engine import compile_rights, evaluate_usage
+
+        return evaluate_usage(compile_rights(license_data), usage_context)
     
     def export_license_json(self, license_data: Dict, filename: str) -> str:
         """Export license as JSON file"""
@@ -239,16 +492,16 @@ class EventOSLicense:
                 "license_data": license_data,
                 "generated_by": "9LMNTS Studio AI System",
                 "generated_at": datetime.now().isoformat(),
-                "verification_url": f"https://9lmntsstudio.com/verify/{license_data['license_id']}"
+                "verification_url": f"{LICENSE_VERIFY_BASE_URL}/{license_data['license_id']}"
             }
         }
         
         filename_with_ext = f"{filename}.json"
         
-        with open(filename_with_ext, 'w') as f:
-            json.dump(export_data, f, indent=2)
+        with open(filename_with_ext, 'wb') as f:
+            f.write(dumps(export_data, pretty=True))
         
-        logger.info(f"📁 License exported: {filename_with_ext}")
+        logger.info("📁 License exported: %s", filename_with_ext)
         
         return filename_with_ext
 
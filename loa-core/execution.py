@@ -0,0 +1,266 @@
+"""
+9LMNTS STUDIO - Execution Policy
+Routes CPU-bound and blocking work off the event loop to bounded pools, with saturation metrics and a loop-lag monitor
+"""
+
+import os
+import sys
+import time
+import pickle
+import asyncio
+import logging
+import functools
+import threading
+import contextvars
+import multiprocessing
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Optional, Callable
+from log_config import setup_logging
+from profiler import following_thread
+from metrics import executor_in_flight, executor_saturation, executor_duration, loop_lag, loop_stalls
+
+# Configure logging
+setup_logging()
+logger = logging.getLogger("EXECUTION")
+
+# Execution policies
+CPU = "cpu"            # pure-Python crunching: a process pool, so it runs in parallel and holds no GIL here
+BLOCKING = "blocking"  # sync I/O (requests, SQLite, files): a bounded thread pool
+ASYNC = "async"        # already non-blocking or trivially cheap: run on the loop
+
+EXEC_CPU_WORKERS = int(os.getenv("EXEC_CPU_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+EXEC_BLOCKING_WORKERS = int(os.getenv("EXEC_BLOCKING_WORKERS", "16"))
+EXEC_QUEUE_LIMIT = int(os.getenv("EXEC_QUEUE_LIMIT", "256"))  # submissions per pool before callers wait
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.25"))
+LOOP_STALL_THRESHOLD = float(os.getenv("LOOP_STALL_THRESHOLD", "0.2"))  # a stall this long logs the culprit's stack
+
+
+def execution_policy(kind: str, pool: Optional[str] = None) -> Callable:
+    """Tag a function with how it must run - execution.run() routes it; direct calls are unaffected"""
+    if kind not in (CPU, BLOCKING, ASYNC):
+        raise ValueError(f"Unknown execution policy: {kind}")
+
+    def decorator(func: Callable) -> Callable:
+        func.__execution_policy__ = (kind, pool or kind)
+        return func
+    return decorator
+
+
+def _policy_of(func: Callable) -> tuple:
+    target = getattr(func, "__func__", func)  # bound methods carry their function's tag
+    while isinstance(target, functools.partial):
+        target = target.func
+    return getattr(target, "__execution_policy__", (BLOCKING, BLOCKING))
+
+
+class Pool:
+    """One executor plus its admission limit and live counters"""
+
+    def __init__(self, name: str, kind: str, workers: int, limit: int = EXEC_QUEUE_LIMIT):
+        self.name = name
+        self.kind = kind
+        self.workers = workers
+        self.limit = limit
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self._executor: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> Executor:
+        # Created on first use: a pool that is never needed costs no threads or processes
+        with self._lock:
+            if self._executor is None:
+                if self.kind == CPU:
+                    # spawn, not fork: forking a process that already runs threads can deadlock the child
+                    self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+                else:
+                    self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix=f"exec-{self.name}")
+            return self._executor
+
+    @property
+    def slots(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.limit)
+        return self._slots
+
+    def _track(self, delta: int):
+        with self._lock:
+            self.in_flight += delta
+            in_flight = self.in_flight
+        executor_in_flight.set(in_flight, pool=self.name)
+        executor_saturation.set(round(in_flight / self.workers, 3), pool=self.name)
+
+    def reset(self):
+        """Drop a broken process pool so the next call starts a fresh one"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._slots = None  # the semaphore belongs to the loop that is shutting down
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"kind": self.kind, "workers": self.workers, "in_flight": self.in_flight,
+                "saturation": round(self.in_flight / self.workers, 3), "completed": self.completed,
+                "failed": self.failed, "started": self._executor is not None}
+
+
+class ExecutionLayer:
+    """Named pools keyed by policy; run() sends each tagged operation to the right one"""
+
+    def __init__(self):
+        self.pools: Dict[str, Pool] = {}
+        self.add_pool(CPU, CPU, EXEC_CPU_WORKERS)
+        self.add_pool(BLOCKING, BLOCKING, EXEC_BLOCKING_WORKERS)
+
+    def add_pool(self, name: str, kind: str, workers: int, limit: int = EXEC_QUEUE_LIMIT) -> Pool:
+        """Dedicated pool (e.g. one per external API) so one slow dependency can't starve the others"""
+        if name not in self.pools:
+            self.pools[name] = Pool(name, kind, max(1, workers), limit)
+        return self.pools[name]
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Run func according to its @execution_policy tag (untagged = blocking)"""
+        kind, pool = _policy_of(func)
+        if kind == ASYNC:
+            result = func(*args, **kwargs)
+            return await result if asyncio.iscoroutine(result) else result
+        return await self.run_in(pool, func, *args, **kwargs)
+
+    async def run_in(self, name: str, func: Callable, *args, **kwargs) -> Any:
+        """Run func in a specific pool, waiting for a slot if the pool is at its queue limit"""
+        pool = self.pools.get(name) or self.pools[BLOCKING]
+        loop = asyncio.get_running_loop()
+        async with pool.slots:
+            pool._track(1)
+            started = time.perf_counter()
+            try:
+                if pool.kind == CPU:
+                    result = await self._run_cpu(loop, pool, func, args, kwargs)
+                else:
+                    # Copy the context so spans, metric labels and request profiles follow the call into the thread
+                    context = contextvars.copy_context()
+                    result = await loop.run_in_executor(pool.executor, functools.partial(context.run, _in_thread, func, args, kwargs))
+                pool.completed += 1
+                return result
+            except BaseException:
+                pool.failed += 1
+                raise
+            finally:
+                pool._track(-1)
+                executor_duration.observe(time.perf_counter() - started, pool=pool.name)
+
+    async def _run_cpu(self, loop, pool: Pool, func: Callable, args: tuple, kwargs: Dict) -> Any:
+        call = functools.partial(func, *args, **kwargs)
+        try:
+            return await loop.run_in_executor(pool.executor, call)
+        except BrokenProcessPool:
+            logger.error("❌ Process pool %s broke - restarting it and running this call in a thread", pool.name)
+            pool.reset()
+        except (pickle.PicklingError, AttributeError, TypeError) as e:
+            if not _is_pickling_error(e):
+                raise
+            logger.warning("⚠️ %s can't be sent to a process (%s) - running it in a thread", getattr(func, "__name__", func), e)
+        return await loop.run_in_executor(self.pools[BLOCKING].executor, call)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: pool.stats() for name, pool in self.pools.items()}
+
+    def shutdown(self, wait: bool = True):
+        for pool in self.pools.values():
+            pool.shutdown(wait)
+
+
+def _in_thread(func: Callable, args: tuple, kwargs: Dict) -> Any:
+    with following_thread():
+        return func(*args, **kwargs)
+
+
+def _is_pickling_error(error: Exception) -> bool:
+    return isinstance(error, pickle.PicklingError) or "pickle" in str(error).lower()
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes up, and names the code that stalled it.
+
+    An async ticker records lag (actual minus expected wake-up) into a histogram. A watchdog
+    thread notices when the ticker stops advancing and logs the loop thread's stack while the
+    stall is still happening - that stack is the sync call that should be offloaded.
+    """
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL, stall_threshold: float = LOOP_STALL_THRESHOLD):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.max_lag = 0.0
+        self.stalls = 0
+        self._last_tick = time.monotonic()
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    async def _tick(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._last_tick = now
+            self.max_lag = max(self.max_lag, lag)
+            loop_lag.observe(lag)
+
+    def _watch(self):
+        reported = False
+        while not self._stop.wait(self.stall_threshold / 2):
+            stalled = time.monotonic() - self._last_tick - self.interval
+            if stalled < self.stall_threshold:
+                reported = False
+                continue
+            if reported:
+                continue
+            reported = True  # one report per stall
+            self.stalls += 1
+            loop_stalls.inc()
+            frame = sys._current_frames().get(self._loop_thread)
+            stack = []
+            while frame is not None and len(stack) < 12:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{frame.f_lineno} {code.co_name}")
+                frame = frame.f_back
+            logger.warning("⚠️ Event loop stalled for %.0fms in: %s", stalled * 1000, " <- ".join(stack))
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._loop_thread = threading.get_ident()
+        self._last_tick = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._tick())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"max_lag_ms": round(self.max_lag * 1000, 1), "stalls": self.stalls}
+
+
+execution = ExecutionLayer()
+loop_monitor = LoopLagMonitor()
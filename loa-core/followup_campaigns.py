@@ -0,0 +1,318 @@
+"""
+9LMNTS STUDIO - Follow-up Campaign Engine
+Bulk personalized follow-ups over lead segments with pooled SMTP delivery and resumable progress
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import queue
+import asyncio
+import smtplib
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from email.message import EmailMessage
+from email.utils import formatdate, make_msgid
+from typing import Dict, Any, List, Optional, Tuple
+
+from lead_store import LeadStore
+from document_renderer import renderer
+from sales_automation import FOLLOWUP_TEMPLATES
+from log_config import setup_logging
+
+# Configure logging
+setup_logging()
+logger = logging.getLogger("FOLLOWUP_CAMPAIGNS")
+
+SMTP_HOST = os.getenv("SMTP_HOST", "localhost")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "1025"))  # local test server by default
+SMTP_USER = os.getenv("SMTP_USER", "")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "false").lower() == "true"
+SMTP_FROM = os.getenv("SMTP_FROM", "9LMNTS Studio <hello@9lmntsstudio.com>")
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "8"))
+DOMAIN_RATE_PER_SECOND = float(os.getenv("CAMPAIGN_DOMAIN_RATE", "20"))
+DOMAIN_BURST = int(os.getenv("CAMPAIGN_DOMAIN_BURST", "40"))
+CAMPAIGN_DIR = os.getenv("CAMPAIGN_DIR", "campaigns")
+
+FOLLOWUP_STAGES = list(FOLLOWUP_TEMPLATES.keys())  # hot_lead, warm_lead, nurture
+CAMPAIGN_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]+")  # ids become checkpoint file names
+
+
+def valid_campaign_id(campaign_id: str) -> bool:
+    return bool(CAMPAIGN_ID_PATTERN.fullmatch(campaign_id or ""))
+
+
+class SMTPPool:
+    """Fixed pool of reusable SMTP connections; broken connections are replaced transparently"""
+
+    def __init__(self, size: int = SMTP_POOL_SIZE, host: str = SMTP_HOST, port: int = SMTP_PORT):
+        self.size = size
+        self.host = host
+        self.port = port
+        self._idle: "queue.LifoQueue[Optional[smtplib.SMTP]]" = queue.LifoQueue()
+        for _ in range(size):
+            self._idle.put(None)  # connect lazily
+        self.connections_opened = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        connection = smtplib.SMTP(self.host, self.port, timeout=30)
+        if SMTP_STARTTLS:
+            connection.starttls()
+        if SMTP_USER:
+            connection.login(SMTP_USER, SMTP_PASSWORD)
+        self.connections_opened += 1
+        return connection
+
+    def send(self, message: EmailMessage):
+        """Blocking send on a pooled connection (call from a worker thread)"""
+        connection = self._idle.get()
+        try:
+            if connection is None:
+                connection = self._connect()
+            try:
+                connection.send_message(message)
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                # Server dropped an idle connection - release it, reconnect once and retry
+                self._discard(connection)
+                connection = None
+                connection = self._connect()
+                connection.send_message(message)
+        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException):
+            # The server rejected this message, not the session (smtplib has already sent RSET,
+            # or closed the socket on a 421) - the connection goes back to the pool
+            raise
+        except OSError:
+            # Connection-level failure (SMTPException is an OSError) - the session can't be trusted
+            self._discard(connection)
+            connection = None
+            raise
+        finally:
+            self._idle.put(connection)
+
+    @staticmethod
+    def _discard(connection: Optional[smtplib.SMTP]):
+        """Close a connection that is being dropped from the pool, ignoring a dead socket"""
+        if connection is None:
+            return
+        try:
+            connection.quit()
+        except (smtplib.SMTPException, OSError):
+            connection.close()
+
+    def close(self):
+        while not self._idle.empty():
+            self._discard(self._idle.get_nowait())
+
+
+class DomainThrottle:
+    """Per-recipient-domain token buckets; callers wait (not drop) until their domain has capacity"""
+
+    def __init__(self, rate: float = DOMAIN_RATE_PER_SECOND, burst: int = DOMAIN_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._buckets: Dict[str, List[float]] = {}
+
+    async def acquire(self, domain: str):
+        while True:
+            now = time.monotonic()
+            bucket = self._buckets.setdefault(domain, [float(self.burst), now])
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return
+            await asyncio.sleep((1 - bucket[0]) / self.rate)
+
+
+def build_followup_message(lead: Dict, stage: str) -> EmailMessage:
+    """Render the stage follow-up for a lead; the first line of the template becomes the subject"""
+    text = renderer.render(f"followup_{stage}", {
+        "name": lead.get("name") or "there",
+        "company": lead.get("company") or "your company",
+        "industry": lead.get("industry") or "your industry"
+    }, cache=False).strip()
+    subject, _, body = text.partition("\n")
+
+    message = EmailMessage()
+    message["From"] = SMTP_FROM
+    message["To"] = lead["email"]
+    message["Subject"] = subject.strip()
+    message["Date"] = formatdate(localtime=True)
+    message["Message-ID"] = make_msgid(domain="9lmntsstudio.com")
+    message.set_content(body.strip())
+    return message
+
+
+class FollowupCampaign:
+    """One follow-up run over a lead segment. Progress is checkpointed per batch so a restart resumes.
+
+    Leads whose send failed are kept in the checkpoint and retried at the start of the next run.
+    """
+
+    def __init__(self, campaign_id: str, stages: List[str], store: LeadStore, pool: SMTPPool,
+                 batch_size: int = 200, concurrency: int = SMTP_POOL_SIZE):
+        if not valid_campaign_id(campaign_id):
+            raise ValueError(f"Invalid campaign id {campaign_id!r} (letters, digits, '_' and '-' only)")
+        unknown = [stage for stage in stages if stage not in FOLLOWUP_STAGES]
+        if unknown:
+            raise ValueError(f"Unknown follow-up stages: {unknown}")
+        self.campaign_id = campaign_id
+        self.stages = stages
+        self.store = store
+        self.pool = pool
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.throttle = DomainThrottle()
+        self.checkpoint_path = os.path.join(CAMPAIGN_DIR, f"{campaign_id}.checkpoint.json")
+        self.state = self._load_checkpoint()
+        self._failed: set = set()  # lead ids that failed during the current run
+
+    def _load_checkpoint(self) -> Dict[str, Any]:
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as f:
+                state = json.load(f)
+            logger.info("♻️ Resuming campaign %s after lead %s", self.campaign_id, state['last_lead_id'])
+            return state
+        return {
+            "campaign_id": self.campaign_id,
+            "stages": self.stages,
+            "status": "pending",
+            "last_lead_id": 0,
+            "sent": 0,
+            "failed": 0,
+            "failed_lead_ids": [],
+            "skipped": 0,
+            "started_at": datetime.now().isoformat(),
+            "updated_at": None
+        }
+
+    def _save_checkpoint(self):
+        os.makedirs(CAMPAIGN_DIR, exist_ok=True)
+        self.state["updated_at"] = datetime.now().isoformat()
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.checkpoint_path)  # atomic - a crash never leaves a torn checkpoint
+
+    async def _deliver(self, lead: Dict, executor: ThreadPoolExecutor, semaphore: asyncio.Semaphore) -> Optional[Tuple[int, str]]:
+        email = (lead.get("email") or "").strip()
+        if "@" not in email:
+            self.state["skipped"] += 1
+            return None
+        stage = lead["stage"]
+        await self.throttle.acquire(email.rsplit("@", 1)[1].lower())
+        async with semaphore:
+            try:
+                message = build_followup_message(lead, stage)
+                await asyncio.get_running_loop().run_in_executor(executor, self.pool.send, message)
+            except Exception as e:
+                self.state["failed"] += 1
+                self._failed.add(lead["id"])
+                logger.error("❌ Follow-up to lead %s failed: %s", lead["id"], e)
+                return None
+        self.state["sent"] += 1
+        return lead["id"], stage
+
+    async def _deliver_batch(self, batch: List[Dict], executor: ThreadPoolExecutor, semaphore: asyncio.Semaphore):
+        results = await asyncio.gather(*[self._deliver(lead, executor, semaphore) for lead in batch])
+        self.store.mark_followed_up([result for result in results if result])
+
+    async def _retry_failed(self, executor: ThreadPoolExecutor, semaphore: asyncio.Semaphore):
+        """Re-send to leads that failed in an earlier run (dropping any that left the campaign's stages)"""
+        retry = [lead for lead in map(self.store.get, self.state.get("failed_lead_ids", []))
+                 if lead and lead["stage"] in self.stages]
+        if not retry:
+            return
+        logger.info("♻️ Retrying %s failed follow-ups for campaign %s", len(retry), self.campaign_id)
+        self.state["failed"] = max(0, self.state["failed"] - len(retry))
+        for start in range(0, len(retry), self.batch_size):
+            await self._deliver_batch(retry[start:start + self.batch_size], executor, semaphore)
+
+    async def run(self) -> Dict:
+        self.state["status"] = "running"
+        self.state["remaining"] = self.store.count(self.stages, after_id=self.state["last_lead_id"])
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        self._failed = set()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="smtp") as executor:
+            await self._retry_failed(executor, semaphore)
+            self.state["failed_lead_ids"] = sorted(self._failed)
+            self._save_checkpoint()
+            for batch in self.store.iter_segment(self.stages, self.state["last_lead_id"], self.batch_size):
+                await self._deliver_batch(batch, executor, semaphore)
+                self.state["failed_lead_ids"] = sorted(self._failed)
+                self.state["last_lead_id"] = batch[-1]["id"]
+                self.state["remaining"] = max(0, self.state["remaining"] - len(batch))
+                self._save_checkpoint()
+
+        self.state["status"] = "completed"
+        self.state["duration_seconds"] = round(time.perf_counter() - started, 2)
+        self._save_checkpoint()
+        logger.info("📧 Campaign %s done: %s sent, %s failed", self.campaign_id, self.state['sent'], self.state['failed'])
+        return self.state
+
+
+class CampaignManager:
+    """Runs campaigns as background tasks inside the API process"""
+
+    def __init__(self, store: LeadStore):
+        self.store = store
+        self.campaigns: Dict[str, FollowupCampaign] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def start(self, stages: List[str], campaign_id: Optional[str] = None) -> Dict:
+        campaign_id = campaign_id or f"followup_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        if campaign_id in self._tasks and not self._tasks[campaign_id].done():
+            raise ValueError(f"Campaign {campaign_id} is already running")
+        campaign = FollowupCampaign(campaign_id, stages, self.store, SMTPPool())
+        self.campaigns[campaign_id] = campaign
+        self._tasks[campaign_id] = asyncio.create_task(self._run(campaign))
+        return {"campaign_id": campaign_id, "stages": stages, "status": "started"}
+
+    @staticmethod
+    async def _run(campaign: FollowupCampaign):
+        try:
+            await campaign.run()
+        except Exception as e:
+            campaign.state["status"] = "failed"
+            campaign.state["error"] = str(e)
+            logger.error("❌ Campaign %s failed: %s", campaign.campaign_id, e)
+        finally:
+            campaign.pool.close()
+
+    def status(self, campaign_id: str) -> Optional[Dict]:
+        campaign = self.campaigns.get(campaign_id)
+        if campaign:
+            return campaign.state
+        if not valid_campaign_id(campaign_id):
+            return None
+        checkpoint = os.path.join(CAMPAIGN_DIR, f"{campaign_id}.checkpoint.json")
+        if os.path.exists(checkpoint):
+            with open(checkpoint) as f:
+                return json.load(f)
+        return None
+
+
+async def main(argv: List[str]):
+    """Run (or resume) a follow-up campaign from the command line"""
+    parser = argparse.ArgumentParser(description="Run a follow-up campaign over stored leads")
+    parser.add_argument("--campaign-id", required=True, help="Re-use an id to resume from its checkpoint")
+    parser.add_argument("--stages", nargs="+", default=FOLLOWUP_STAGES, choices=FOLLOWUP_STAGES)
+    args = parser.parse_args(argv)
+
+    pool = SMTPPool()
+    try:
+        state = await FollowupCampaign(args.campaign_id, args.stages, LeadStore(), pool).run()
+    finally:
+        pool.close()
+    print(f"✅ Campaign {state['campaign_id']}: {state['sent']} sent, {state['failed']} failed, {state['skipped']} skipped in {state['duration_seconds']}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
@@ -0,0 +1,287 @@
+"""
+9LMNTS STUDIO - Interaction Analytics
+Incremental, indexed SQLite view of the LOA Brain interaction log for per-user, per-intent and per-day queries
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+from log_config import setup_logging
+from conversation_memory import classify_intent
+
+# Configure logging
+setup_logging()
+logger = logging.getLogger("INTERACTION_ANALYTICS")
+
+INTERACTION_LOG_PATH = os.getenv("INTERACTION_LOG_PATH", "loa_interactions.json")
+INTERACTION_DB_PATH = os.getenv("INTERACTION_DB_PATH", "loa_interactions.db")
+INGEST_BATCH_BYTES = 4 * 1024 * 1024  # log bytes per transaction while catching up
+PREVIEW_CHARS = 500  # message/response text kept in the index; the JSONL log stays the full record
+MAX_QUERY_LIMIT = 1000
+ANALYZE_AFTER_ROWS = 10000  # refresh statistics after a big catch-up so per-user queries pick the user index
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS interactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    day TEXT NOT NULL,
+    user_id TEXT,
+    type TEXT,
+    intent TEXT,
+    message TEXT,
+    response TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_interactions_ts ON interactions(ts);
+CREATE INDEX IF NOT EXISTS idx_interactions_user_ts ON interactions(user_id, ts);
+CREATE INDEX IF NOT EXISTS idx_interactions_type_ts ON interactions(type, ts);
+CREATE INDEX IF NOT EXISTS idx_interactions_intent_ts ON interactions(intent, ts);
+CREATE TABLE IF NOT EXISTS daily_intents (
+    day TEXT NOT NULL,
+    intent TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (day, intent)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS ingest_state (
+    path TEXT PRIMARY KEY,
+    offset INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    skipped INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+def parse_time(value: Optional[str]) -> Optional[float]:
+    """"7d" / "24h" / "30m" (ago), or an ISO date/datetime -> epoch seconds"""
+    if not value:
+        return None
+    units = {"d": 86400, "h": 3600, "m": 60}
+    if value[-1] in units and value[:-1].replace(".", "", 1).isdigit():
+        return time.time() - float(value[:-1]) * units[value[-1]]
+    return datetime.fromisoformat(value).timestamp()
+
+
+class InteractionAnalytics:
+    """Indexes loa_interactions.json as it grows - each refresh reads only the bytes appended since the last.
+
+    The byte offset is committed in the same transaction as the rows it covers, so a crash
+    never double-counts, and BEGIN IMMEDIATE makes concurrent workers take turns instead of
+    ingesting the same range twice. Per-day intent counts are rolled up at ingest time.
+    """
+
+    def __init__(self, db_path: str = INTERACTION_DB_PATH, log_path: str = INTERACTION_LOG_PATH):
+        self.db_path = db_path
+        self.log_path = log_path
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30.0, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _parse(line: bytes) -> Optional[Tuple]:
+        try:
+            entry = json.loads(line)
+            timestamp = entry["timestamp"]
+            ts = datetime.fromisoformat(timestamp).timestamp()
+        except (ValueError, KeyError, TypeError):
+            return None
+        message = str(entry.get("message") or "")
+        return (ts, timestamp[:10], entry.get("user_id"), entry.get("type"),
+                entry.get("intent") or classify_intent(message),  # lines written before intents were logged
+                message[:PREVIEW_CHARS], str(entry.get("response") or "")[:PREVIEW_CHARS])
+
+    def _ingest_batch(self) -> Tuple[int, int]:
+        """Index up to INGEST_BATCH_BYTES of complete new lines in one transaction; returns (rows added, bytes read)"""
+        try:
+            stat = os.stat(self.log_path)
+        except FileNotFoundError:
+            return 0, 0
+        conn = self._conn
+        # Cheap read first: an idle log (same file, nothing past the stored offset) must not take the write lock
+        row = conn.execute("SELECT offset, inode FROM ingest_state WHERE path = ?", (self.log_path,)).fetchone()
+        if row and row["inode"] == stat.st_ino and stat.st_size == row["offset"]:
+            return 0, 0
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT offset, inode, skipped FROM ingest_state WHERE path = ?", (self.log_path,)).fetchone()
+            offset, skipped = (row["offset"], row["skipped"]) if row else (0, 0)
+            if row and (row["inode"] != stat.st_ino or stat.st_size < offset):
+                logger.warning("⚠️ %s was rotated or truncated - indexing the new file from the start", self.log_path)
+                offset = 0
+            if stat.st_size <= offset:
+                conn.execute("COMMIT")
+                return 0, 0
+            with open(self.log_path, "rb") as f:
+                f.seek(offset)
+                chunk = f.read(INGEST_BATCH_BYTES)
+            end = chunk.rfind(b"\n") + 1
+            if end == 0:
+                if len(chunk) < INGEST_BATCH_BYTES:
+                    conn.execute("COMMIT")  # a line still being written - pick it up next time
+                    return 0, 0
+                end = len(chunk)  # a single oversized line: skip past it rather than stall forever
+            rows = []
+            for line in chunk[:end].splitlines():
+                if not line.strip():
+                    continue
+                parsed = self._parse(line)
+                if parsed is None:
+                    skipped += 1
+                else:
+                    rows.append(parsed)
+            conn.executemany("INSERT INTO interactions (ts, day, user_id, type, intent, message, response) "
+                             "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            daily: Dict[Tuple[str, str], int] = {}
+            for parsed in rows:
+                daily[(parsed[1], parsed[4])] = daily.get((parsed[1], parsed[4]), 0) + 1
+            conn.executemany("INSERT INTO daily_intents (day, intent, count) VALUES (?, ?, ?) "
+                             "ON CONFLICT(day, intent) DO UPDATE SET count = count + excluded.count",
+                             [(day, intent, count) for (day, intent), count in daily.items()])
+            conn.execute("INSERT OR REPLACE INTO ingest_state (path, offset, inode, skipped, updated_at) VALUES (?, ?, ?, ?, ?)",
+                         (self.log_path, offset + end, stat.st_ino, skipped, time.time()))
+            conn.execute("COMMIT")
+            return len(rows), end
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def refresh(self) -> int:
+        """Catch up with the log; returns the number of interactions indexed"""
+        added = 0
+        started = time.perf_counter()
+        with self._lock:
+            while True:
+                rows, consumed = self._ingest_batch()
+                if not consumed:
+                    break
+                added += rows
+            if added >= ANALYZE_AFTER_ROWS:
+                self._conn.execute("ANALYZE")
+        if added:
+            logger.info("📊 Indexed %d interactions in %.2fs", added, time.perf_counter() - started)
+        return added
+
+    @staticmethod
+    def _where(user_id: Optional[str], type: Optional[str], intent: Optional[str],
+               since: Optional[float], until: Optional[float]) -> Tuple[str, List[Any]]:
+        clauses, params = [], []
+        for column, value in (("user_id", user_id), ("type", type), ("intent", intent)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(until)
+        return (f"WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+    def query(self, user_id: Optional[str] = None, type: Optional[str] = None, intent: Optional[str] = None,
+              since: Optional[float] = None, until: Optional[float] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Newest matching interactions - every filter maps onto an (x, ts) index"""
+        self.refresh()
+        where, params = self._where(user_id, type, intent, since, until)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT ts, user_id, type, intent, message, response FROM interactions {where} ORDER BY ts DESC LIMIT ?",
+                (*params, min(limit, MAX_QUERY_LIMIT))
+            ).fetchall()
+        return [{**dict(row), "timestamp": datetime.fromtimestamp(row["ts"]).isoformat()} for row in rows]
+
+    def count(self, user_id: Optional[str] = None, type: Optional[str] = None, intent: Optional[str] = None,
+              since: Optional[float] = None, until: Optional[float] = None) -> int:
+        self.refresh()
+        where, params = self._where(user_id, type, intent, since, until)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM interactions {where}", params).fetchone()[0]
+
+    def top_intents(self, days: int = 7, top: int = 5) -> Dict[str, List[Dict[str, Any]]]:
+        """Most frequent intents per day, newest day first (read from the daily rollup, not the rows)"""
+        self.refresh()
+        first_day = (datetime.now() - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT day, intent, count FROM daily_intents WHERE day >= ? ORDER BY day DESC, count DESC", (first_day,)
+            ).fetchall()
+        result: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            intents = result.setdefault(row["day"], [])
+            if len(intents) < top:
+                intents.append({"intent": row["intent"], "count": row["count"]})
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._conn.execute("SELECT offset, skipped, updated_at FROM ingest_state WHERE path = ?",
+                                       (self.log_path,)).fetchone()
+            indexed = self._conn.execute("SELECT MAX(id) FROM interactions").fetchone()[0] or 0
+        try:
+            size = os.path.getsize(self.log_path)
+        except OSError:
+            size = 0
+        offset = state["offset"] if state else 0
+        return {"log_path": self.log_path, "log_bytes": size, "indexed_bytes": offset,
+                "pending_bytes": max(0, size - offset), "indexed": indexed,
+                "skipped_lines": state["skipped"] if state else 0, "updated_at": state["updated_at"] if state else None}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def main(argv=None) -> int:
+    """CLI: python interaction_analytics.py {ingest|query|intents|stats} ..."""
+    parser = argparse.ArgumentParser(description="Query the LOA Brain interaction log")
+    parser.add_argument("--db", default=INTERACTION_DB_PATH)
+    parser.add_argument("--log", default=INTERACTION_LOG_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("ingest", help="Index new log lines")
+    commands.add_parser("stats", help="Indexing progress")
+    query = commands.add_parser("query", help="Matching interactions, newest first")
+    query.add_argument("--user")
+    query.add_argument("--type", help="sales_inquiry | general")
+    query.add_argument("--intent")
+    query.add_argument("--since", help='"7d", "24h" or an ISO date')
+    query.add_argument("--until")
+    query.add_argument("--limit", type=int, default=20)
+    query.add_argument("--count", action="store_true", help="Only print the number of matches")
+    intents = commands.add_parser("intents", help="Top intents per day")
+    intents.add_argument("--days", type=int, default=7)
+    intents.add_argument("--top", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    analytics = InteractionAnalytics(args.db, args.log)
+    try:
+        if args.command == "ingest":
+            print(f"Indexed {analytics.refresh()} new interactions")
+        elif args.command == "stats":
+            analytics.refresh()
+            print(json.dumps(analytics.stats(), indent=2))
+        elif args.command == "query":
+            filters = {"user_id": args.user, "type": args.type, "intent": args.intent,
+                       "since": parse_time(args.since), "until": parse_time(args.until)}
+            if args.count:
+                print(analytics.count(**filters))
+            else:
+                for row in analytics.query(limit=args.limit, **filters):
+                    print(f"{row['timestamp'][:19]}  {row['user_id'] or '-':<20} {row['intent']:<15} {row['message'][:80]}")
+        elif args.command == "intents":
+            for day, ranked in analytics.top_intents(args.days, args.top).items():
+                print(f"{day}  " + ", ".join(f"{item['intent']} ({item['count']})" for item in ranked))
+    finally:
+        analytics.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
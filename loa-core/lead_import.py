@@ -0,0 +1,316 @@
+"""
+9LMNTS STUDIO - Bulk Lead Import/Export
+Streaming CSV/JSONL lead import with batch validation, qualification and per-row error reports
+"""
+
+import os
+import io
+import re
+import csv
+import sys
+import json
+import asyncio
+import logging
+import argparse
+from datetime import datetime
+from typing import Dict, Any, List, Optional, AsyncIterator, Iterator, Tuple
+
+from lead_store import LeadStore, LEAD_STAGES
+from lead_sourcing import stage_for_score
+from execution import execution, BLOCKING
+from log_config import setup_logging
+
+# Configure logging
+setup_logging()
+logger = logging.getLogger("LEAD_IMPORT")
+
+IMPORT_DIR = os.getenv("LEAD_IMPORT_DIR", "imports")
+IMPORT_BATCH_SIZE = int(os.getenv("LEAD_IMPORT_BATCH_SIZE", "500"))
+IMPORT_CHUNK_SIZE = 64 * 1024
+MAX_ROW_BYTES = 64 * 1024  # a "row" longer than this is a broken quote, not a lead
+ERROR_PREVIEW = 20  # errors returned inline; the full report is on disk
+
+FORMATS = ("csv", "jsonl")
+
+# Spreadsheet headers seen in the wild -> LeadRequest fields
+FIELD_ALIASES = {
+    "client_name": ("client_name", "name", "full_name", "contact_name", "client", "company", "company_name"),
+    "business_type": ("business_type", "industry", "type", "category", "vertical"),
+    "budget": ("budget", "budget_usd", "deal_size", "value"),
+    "timeline": ("timeline", "timeframe", "deadline", "urgency"),
+    "requirements": ("requirements", "needs", "notes", "description", "project"),
+    "contact_info": ("contact_info", "email", "contact", "phone", "email_address"),
+}
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[A-Za-z]{2,}$")
+EXPORT_FIELDS = ["id", "name", "email", "company", "business_type", "budget", "timeline",
+                 "requirements", "source", "stage", "score", "created_at"]
+
+
+def _pick(row: Dict[str, Any], field: str) -> str:
+    for alias in FIELD_ALIASES[field]:
+        value = row.get(alias)
+        if value not in (None, ""):
+            return str(value).strip()
+    return ""
+
+
+def normalize_row(row: Dict[str, Any]) -> Tuple[Optional[Dict], List[str]]:
+    """Map a raw row onto LeadRequest fields; returns (lead, errors)"""
+    row = {str(key).strip().lower().replace(" ", "_"): value for key, value in row.items() if key is not None}
+    lead = {field: _pick(row, field) for field in FIELD_ALIASES}
+    errors = []
+
+    if not lead["client_name"]:
+        errors.append("client_name is required")
+    if not lead["contact_info"]:
+        errors.append("contact_info (email or phone) is required")
+    elif "@" in lead["contact_info"] and not EMAIL_PATTERN.match(lead["contact_info"]):
+        errors.append(f"invalid email: {lead['contact_info']}")
+
+    budget = lead["budget"].replace(",", "").replace("$", "").strip()
+    if budget:
+        try:
+            lead["budget"] = int(float(budget))
+        except ValueError:
+            errors.append(f"budget is not a number: {lead['budget']}")
+    else:
+        lead["budget"] = None
+
+    if errors:
+        return None, errors
+    lead["business_type"] = lead["business_type"] or "unknown"
+    lead["requirements"] = lead["requirements"] or ""
+    lead["timeline"] = lead["timeline"] or None
+    return lead, []
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a byte stream into text lines without holding more than one partial line"""
+    buffer = b""
+    first = True
+    async for chunk in chunks:
+        buffer += chunk
+        if first and buffer.startswith(b"\xef\xbb\xbf"):
+            buffer = buffer[3:]  # Excel's UTF-8 BOM
+        first = False
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8", "replace").rstrip("\r")
+        if len(buffer) > MAX_ROW_BYTES:
+            raise ValueError("Line exceeds maximum row size - is the file really CSV/JSONL?")
+    if buffer:
+        yield buffer.decode("utf-8", "replace").rstrip("\r")
+
+
+async def iter_csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    """(row number, dict | parse error) - quoted fields may span lines"""
+    header = None
+    record = ""
+    row_number = 0
+    async for line in iter_lines(chunks):
+        record = f"{record}\n{line}" if record else line
+        if record.count('"') % 2:
+            if len(record) > MAX_ROW_BYTES:
+                row_number += 1
+                yield row_number, "unterminated quoted field"
+                record = ""
+            continue  # quoted newline - keep reading
+        values = next(csv.reader([record]), [])
+        record = ""
+        if header is None:
+            header = values
+            continue
+        if not any(value.strip() for value in values):
+            continue
+        row_number += 1
+        if len(values) > len(header):
+            yield row_number, f"expected {len(header)} columns, got {len(values)}"
+            continue
+        yield row_number, dict(zip(header, values))
+    if record:
+        yield row_number + 1, "unterminated quoted field"
+
+
+async def iter_jsonl_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    row_number = 0
+    async for line in iter_lines(chunks):
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield row_number, f"invalid JSON: {e}"
+            continue
+        yield row_number, row if isinstance(row, dict) else "expected a JSON object per line"
+
+
+async def iter_file_chunks(path: str, chunk_size: int = IMPORT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            chunk = await execution.run_in(BLOCKING, f.read, chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+class LeadImporter:
+    """Validates, qualifies and stores leads batch by batch; memory is bounded by the batch size"""
+
+    def __init__(self, sales_bot, lead_store: LeadStore, batch_size: int = IMPORT_BATCH_SIZE):
+        self.sales_bot = sales_bot
+        self.lead_store = lead_store
+        self.batch_size = batch_size
+
+    async def _store_batch(self, batch: List[Dict], summary: Dict):
+        records = []
+        for lead in batch:
+            qualification = await self.sales_bot.qualify_lead_instantly({
+                "name": lead["client_name"],
+                "business_type": lead["business_type"],
+                "budget": lead["budget"] or 0,
+                "timeline": lead["timeline"] or "",
+                "requirements": lead["requirements"]
+            })
+            score = qualification["qualification_score"]
+            stage = stage_for_score(score)
+            summary["stages"][stage] = summary["stages"].get(stage, 0) + 1
+            records.append({
+                "name": lead["client_name"],
+                "email": lead["contact_info"] if "@" in lead["contact_info"] else None,
+                "contact_info": lead["contact_info"],
+                "business_type": lead["business_type"],
+                "budget": lead["budget"],
+                "timeline": lead["timeline"],
+                "requirements": lead["requirements"],
+                "source": summary["source"],
+                "stage": stage,
+                "score": score
+            })
+        # SQLite insert off the event loop; one transaction per batch
+        await execution.run_in(BLOCKING, self.lead_store.add_leads, records)
+        summary["imported"] += len(records)
+
+    async def import_stream(self, chunks: AsyncIterator[bytes], fmt: str, source: str = "import") -> Dict:
+        """Import a CSV/JSONL byte stream; invalid rows go to a JSONL error report instead of failing the upload"""
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format: {fmt} (expected one of {', '.join(FORMATS)})")
+        import_id = f"import_{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
+        os.makedirs(IMPORT_DIR, exist_ok=True)
+        report_path = os.path.join(IMPORT_DIR, f"{import_id}.errors.jsonl")
+        summary = {
+            "import_id": import_id,
+            "status": "completed",
+            "format": fmt,
+            "source": source,
+            "rows": 0,
+            "imported": 0,
+            "rejected": 0,
+            "stages": {},
+            "errors": [],
+            "error_report": report_path
+        }
+        rows = iter_csv_rows(chunks) if fmt == "csv" else iter_jsonl_rows(chunks)
+        batch: List[Dict] = []
+        with open(report_path, "w", encoding="utf-8") as report:
+            try:
+                async for row_number, row in rows:
+                    summary["rows"] += 1
+                    if isinstance(row, str):
+                        lead, errors = None, [row]
+                    else:
+                        lead, errors = normalize_row(row)
+                    if errors:
+                        summary["rejected"] += 1
+                        entry = {"row": row_number, "errors": errors}
+                        report.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                        if len(summary["errors"]) < ERROR_PREVIEW:
+                            summary["errors"].append(entry)
+                        continue
+                    batch.append(lead)
+                    if len(batch) >= self.batch_size:
+                        await self._store_batch(batch, summary)
+                        batch = []
+            except ValueError as e:
+                # Unreadable past this point; earlier batches are already stored, so report a partial import
+                summary["status"] = "partial"
+                summary["error"] = str(e)
+                logger.warning("⚠️ Lead import %s stopped after row %s: %s", import_id, summary['rows'], e)
+            if batch:
+                await self._store_batch(batch, summary)
+
+        if not summary["rejected"]:
+            os.remove(report_path)
+            summary["error_report"] = None
+        logger.info("📥 Lead import %s: %s imported, %s rejected", import_id, summary['imported'], summary['rejected'])
+        return summary
+
+    async def import_file(self, path: str, fmt: Optional[str] = None) -> Dict:
+        fmt = fmt or ("jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv")
+        return await self.import_stream(iter_file_chunks(path), fmt, source=os.path.basename(path))
+
+
+def export_leads(lead_store: LeadStore, fmt: str = "csv", stages: Optional[List[str]] = None,
+                 batch_size: int = 1000) -> Iterator[str]:
+    """Stream stored leads as CSV or JSONL text chunks (one chunk per page of leads)"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format: {fmt} (expected one of {', '.join(FORMATS)})")
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        yield buffer.getvalue()
+    for batch in lead_store.iter_segment(stages or LEAD_STAGES, batch_size=batch_size):
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+            writer.writerows(batch)
+            yield buffer.getvalue()
+        else:
+            yield "".join(json.dumps(lead, ensure_ascii=False, default=str) + "\n" for lead in batch)
+
+
+def iter_error_report(import_id: str) -> Optional[Iterator[bytes]]:
+    """Stream a stored per-row error report (None if the import had no errors or doesn't exist)"""
+    if not re.fullmatch(r"import_\d+", import_id):
+        return None
+    path = os.path.join(IMPORT_DIR, f"{import_id}.errors.jsonl")
+    if not os.path.exists(path):
+        return None
+
+    def chunks():
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(IMPORT_CHUNK_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+
+    return chunks()
+
+
+async def main(argv: List[str]):
+    """CLI: import <file> [--format csv|jsonl] | export <file> [--format csv|jsonl] [--stage ...]"""
+    parser = argparse.ArgumentParser(description="Bulk lead import/export")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS)
+    parser.add_argument("--stage", action="append", choices=LEAD_STAGES)
+    args = parser.parse_args(argv)
+
+    store = LeadStore()
+    if args.command == "import":
+        from sales_automation import SalesAutomation
+        summary = await LeadImporter(SalesAutomation(), store).import_file(args.path, args.format)
+        print(json.dumps({key: value for key, value in summary.items() if key != "errors"}, indent=2))
+    else:
+        fmt = args.format or ("jsonl" if args.path.endswith(".jsonl") else "csv")
+        with open(args.path, "w", encoding="utf-8", newline="") as f:
+            for chunk in export_leads(store, fmt, args.stage):
+                f.write(chunk)
+        print(f"✅ Exported {store.count(args.stage)} leads to {args.path}")
+    store.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
@@ -0,0 +1,558 @@
+"""
+9LMNTS STUDIO - Lead Sourcing Pipeline
+Concurrent crawler over pluggable lead sources (CSV imports, sitemaps, HTML pages) feeding lead qualification
+"""
+
+import os
+import re
+import csv
+import math
+import sys
+import json
+import time
+import asyncio
+import socket
+import hashlib
+import logging
+import argparse
+import ipaddress
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlparse
+from datetime import datetime
+from typing import Dict, Any, List, Optional, AsyncIterator, Iterator, Callable
+
+import httpx
+from log_config import setup_logging
+
+# Configure logging
+setup_logging()
+logger = logging.getLogger("LEAD_SOURCING")
+
+CRAWL_WORKERS = int(os.getenv("CRAWL_WORKERS", "16"))
+CRAWL_HOST_CONCURRENCY = int(os.getenv("CRAWL_HOST_CONCURRENCY", "2"))
+CRAWL_HOST_DELAY = float(os.getenv("CRAWL_HOST_DELAY", "0.5"))  # seconds between requests to one host
+CRAWL_MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", "10000"))
+CRAWL_TIMEOUT = float(os.getenv("CRAWL_TIMEOUT", "15"))
+CRAWL_USER_AGENT = os.getenv("CRAWL_USER_AGENT", "9LMNTS-LeadBot/1.0 (+https://9lmntsstudio.com)")
+CRAWL_MAX_REDIRECTS = int(os.getenv("CRAWL_MAX_REDIRECTS", "5"))
+LEAD_IMPORT_DIR = os.getenv("LEAD_IMPORT_DIR", "imports")  # API-supplied source paths must live under here
+
+EMAIL_PATTERN = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+PHONE_PATTERN = re.compile(r"\+?\d[\d\s().-]{7,}\d")
+SITEMAP_LOC_PATTERN = re.compile(r"<loc>\s*([^<\s]+)\s*</loc>", re.IGNORECASE)
+# Same-site pages worth a second hop: they are where contact details usually live
+CONTACT_LINK_HINTS = ("contact", "about", "team", "impressum")
+IGNORED_EMAIL_SUFFIXES = (".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp")
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter for the URL frontier (no false negatives, tunable false-positive rate)"""
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.001):
+        self.size = max(64, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> Iterator[int]:
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size  # Kirsch-Mitzenmacher double hashing
+
+    def add(self, item: str) -> bool:
+        """Add item; returns False if it was (probably) already present"""
+        new = False
+        for position in self._positions(item):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] >> bit & 1:
+                self.bits[byte] |= 1 << bit
+                new = True
+        self.count += new
+        return new
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[p // 8] >> (p % 8) & 1 for p in self._positions(item))
+
+
+class HostPoliteness:
+    """Caps concurrent requests per host and spaces consecutive requests by a minimum delay"""
+
+    def __init__(self, concurrency: int = CRAWL_HOST_CONCURRENCY, delay: float = CRAWL_HOST_DELAY):
+        self.concurrency = concurrency
+        self.delay = delay
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._next_slot: Dict[str, float] = {}
+
+    async def acquire(self, host: str):
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._semaphores[host] = asyncio.Semaphore(self.concurrency)
+        await semaphore.acquire()
+        # Reserve the next start time before sleeping so concurrent waiters queue up behind us
+        now = time.monotonic()
+        start = max(now, self._next_slot.get(host, 0.0))
+        self._next_slot[host] = start + self.delay
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    def release(self, host: str):
+        self._semaphores[host].release()
+
+
+class PageExtractor(HTMLParser):
+    """Single-pass HTML scan for title, meta tags, links and visible text"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self.meta: Dict[str, str] = {}
+        self.links: List[str] = []
+        self.text_parts: List[str] = []
+        self._in_title = False
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "title":
+            self._in_title = True
+        elif tag in ("script", "style"):
+            self._skip += 1
+        elif tag == "meta":
+            name = attrs.get("name") or attrs.get("property")
+            if name and attrs.get("content"):
+                self.meta[name.lower()] = attrs["content"]
+        elif tag == "a" and attrs.get("href"):
+            self.links.append(attrs["href"])
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+        elif tag in ("script", "style") and self._skip:
+            self._skip -= 1
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skip:
+            self.text_parts.append(data)
+
+    @property
+    def text(self) -> str:
+        return " ".join(part.strip() for part in self.text_parts if part.strip())
+
+
+def extract_lead(url: str, html: str) -> Optional[Dict]:
+    """Build a lead from a page: company from site name/title, contact details from mailto links and text"""
+    page = PageExtractor()
+    page.feed(html)
+    emails = []
+    for link in page.links:
+        if link.lower().startswith("mailto:"):
+            emails.append(link[7:].split("?")[0])
+    emails.extend(EMAIL_PATTERN.findall(page.text))
+    emails = [email for email in dict.fromkeys(email.strip().lower() for email in emails)
+              if not email.endswith(IGNORED_EMAIL_SUFFIXES)]
+    phones = PHONE_PATTERN.findall(page.text)
+    if not emails and not phones:
+        return None
+
+    host = urlparse(url).netloc or os.path.basename(url)
+    company = page.meta.get("og:site_name") or page.title.split("|")[0].split(" - ")[0].strip() or host
+    return {
+        "name": company,
+        "company": company,
+        "email": emails[0] if emails else None,
+        "phone": phones[0].strip() if phones else None,
+        "website": url,
+        "business_type": page.meta.get("og:type", ""),
+        "requirements": page.meta.get("description", ""),
+        "industry": page.meta.get("keywords", "").split(",")[0].strip(),
+        "source": "crawl",
+        "sourced_at": datetime.now().isoformat()
+    }
+
+
+# Sources --------------------------------------------------------------
+
+class LeadSource:
+    """A source yields ready leads (dicts) and/or URLs for the crawler to fetch"""
+
+    name = "source"
+
+    def leads(self) -> Iterator[Dict]:
+        return iter(())
+
+    def urls(self) -> Iterator[str]:
+        return iter(())
+
+
+class CSVSource(LeadSource):
+    """Lead list exports (name, email, company, ... columns; a `website` column is also crawled)"""
+
+    name = "csv"
+
+    def __init__(self, path: str, crawl_websites: bool = False):
+        self.path = path
+        self.crawl_websites = crawl_websites
+
+    def leads(self) -> Iterator[Dict]:
+        with open(self.path, newline="", encoding="utf-8-sig") as f:
+            for row in csv.DictReader(f):
+                lead = {key.strip().lower(): (value or "").strip() for key, value in row.items() if key}
+                budget = lead.pop("budget", "").replace(",", "").lstrip("$")
+                if budget.isdigit():
+                    lead["budget"] = int(budget)
+                lead.setdefault("source", "csv")
+                yield lead
+
+    def urls(self) -> Iterator[str]:
+        if not self.crawl_websites:
+            return
+        with open(self.path, newline="", encoding="utf-8-sig") as f:
+            for row in csv.DictReader(f):
+                website = (row.get("website") or "").strip()
+                if website:
+                    yield website
+
+
+class SitemapSource(LeadSource):
+    """A sitemap.xml (URL or local file); nested sitemap indexes are followed by the crawler"""
+
+    name = "sitemap"
+
+    def __init__(self, location: str):
+        self.location = location
+
+    def urls(self) -> Iterator[str]:
+        if is_web_url(self.location):
+            yield self.location
+        else:
+            yield from SITEMAP_LOC_PATTERN.findall(_read_text(self.location))
+
+
+class HTMLFixtureSource(LeadSource):
+    """Local directory of saved HTML pages (fixtures, offline exports); read here, never by the crawler"""
+
+    name = "html"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _files(self, extensions) -> Iterator[str]:
+        for root, _, files in os.walk(self.directory):
+            for filename in sorted(files):
+                if filename.endswith(extensions):
+                    yield os.path.join(root, filename)
+
+    def leads(self) -> Iterator[Dict]:
+        for path in self._files((".html", ".htm")):
+            lead = extract_lead(os.path.abspath(path), _read_text(path))
+            if lead:
+                yield lead
+
+    def urls(self) -> Iterator[str]:
+        for path in self._files((".xml",)):
+            yield from SITEMAP_LOC_PATTERN.findall(_read_text(path))
+
+
+SOURCE_TYPES = {"csv": CSVSource, "sitemap": SitemapSource, "html": HTMLFixtureSource}
+
+
+def is_web_url(url: str) -> bool:
+    return urlparse(url).scheme in ("http", "https")
+
+
+class UnsafeURLError(ValueError):
+    """URL the crawler refuses to fetch (not http(s), or a host that resolves to a non-public address)"""
+
+
+async def check_public_url(url: str):
+    """Resolve the URL's host and refuse it unless every address is globally routable (no loopback,
+    private, link-local or metadata ranges) - crawled URLs come from untrusted pages and API input"""
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise UnsafeURLError(f"Refusing non-web URL {url!r}")
+    try:
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+    except ValueError as e:
+        raise UnsafeURLError(f"Invalid port in {url!r}") from e
+    try:
+        addresses = await asyncio.get_running_loop().getaddrinfo(parsed.hostname, port, type=socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        raise UnsafeURLError(f"Cannot resolve {parsed.hostname}: {e}") from e
+    for *_, sockaddr in addresses:
+        if not ipaddress.ip_address(sockaddr[0].split("%")[0]).is_global:
+            raise UnsafeURLError(f"Refusing {parsed.hostname}: resolves to non-public address {sockaddr[0]}")
+
+
+async def guarded_get(client: httpx.AsyncClient, url: str, **kwargs) -> httpx.Response:
+    """GET that follows redirects by hand, checking every hop with check_public_url
+    (the client must not follow redirects itself)"""
+    for _ in range(CRAWL_MAX_REDIRECTS + 1):
+        await check_public_url(url)
+        response = await client.get(url, follow_redirects=False, **kwargs)
+        location = response.headers.get("location")
+        if not (response.is_redirect and location):
+            return response
+        url = urljoin(str(response.url), location)
+    raise UnsafeURLError(f"Too many redirects fetching {url!r}")
+
+
+def import_path(path: str) -> str:
+    """Resolve a source path from API input; anything outside LEAD_IMPORT_DIR (symlinks included) is refused"""
+    root = os.path.realpath(LEAD_IMPORT_DIR)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise ValueError(f"Source path {path!r} is outside the import directory")
+    return resolved
+
+
+def build_source(spec: Dict) -> LeadSource:
+    """{"type": "csv"|"sitemap"|"html", "path": ...} -> source (paths are relative to LEAD_IMPORT_DIR)"""
+    source_type = spec.get("type")
+    if source_type not in SOURCE_TYPES:
+        raise ValueError(f"Unknown lead source type: {source_type}")
+    location = spec.get("path")
+    if not location:
+        raise ValueError(f"Lead source {source_type} needs a path")
+    if not (source_type == "sitemap" and is_web_url(location)):
+        location = import_path(location)
+    if source_type == "csv":
+        return CSVSource(location, crawl_websites=spec.get("crawl_websites", False))
+    return SOURCE_TYPES[source_type](location)
+
+
+# Crawler --------------------------------------------------------------
+
+class LeadCrawler:
+    """Bounded worker pool over a deduplicated URL frontier; extracted leads stream out as they're found"""
+
+    def __init__(self, workers: int = CRAWL_WORKERS, max_pages: int = CRAWL_MAX_PAGES,
+                 politeness: Optional[HostPoliteness] = None, client: Optional[httpx.AsyncClient] = None):
+        self.workers = workers
+        self.max_pages = max_pages
+        self.politeness = politeness or HostPoliteness()
+        self.client = client
+        self.seen = BloomFilter(capacity=max(max_pages * 4, 10000))
+        self.frontier: asyncio.Queue = asyncio.Queue()
+        self.output: asyncio.Queue = asyncio.Queue(maxsize=workers * 4)  # backpressure on slow consumers
+        self.stats = {"fetched": 0, "failed": 0, "leads": 0, "duplicates": 0, "skipped": 0, "blocked": 0}
+
+    def enqueue(self, url: str, depth: int = 0):
+        if not is_web_url(url):
+            self.stats["skipped"] += 1  # the crawler only speaks http(s); local files are read by their source
+            return
+        key = url.split("#")[0].rstrip("/")
+        if not self.seen.add(key):
+            self.stats["duplicates"] += 1
+            return
+        if self.seen.count > self.max_pages:
+            self.stats["skipped"] += 1
+            return
+        self.frontier.put_nowait((url, depth))
+
+    async def _fetch(self, url: str) -> Optional[str]:
+        host = urlparse(url).netloc
+        await self.politeness.acquire(host)
+        try:
+            response = await guarded_get(self.client, url)
+            if response.status_code != 200:
+                return None
+            return response.text
+        finally:
+            self.politeness.release(host)
+
+    async def _worker(self):
+        while True:
+            url, depth = await self.frontier.get()
+            try:
+                body = await self._fetch(url)
+                if body is None:
+                    self.stats["failed"] += 1
+                    continue
+                self.stats["fetched"] += 1
+                if "<urlset" in body[:2048] or "<sitemapindex" in body[:2048]:
+                    for loc in SITEMAP_LOC_PATTERN.findall(body):
+                        self.enqueue(loc, depth)
+                    continue
+                lead = extract_lead(url, body)
+                if lead:
+                    self.stats["leads"] += 1
+                    await self.output.put(lead)
+                elif depth == 0:
+                    self._follow_contact_links(url, body, depth)
+            except UnsafeURLError as e:
+                self.stats["blocked"] += 1
+                logger.warning("🚫 %s", e)
+            except (httpx.HTTPError, OSError, UnicodeDecodeError) as e:
+                self.stats["failed"] += 1
+                logger.debug("Fetch failed for %s: %s", url, e)
+            finally:
+                self.frontier.task_done()
+
+    def _follow_contact_links(self, url: str, body: str, depth: int):
+        page = PageExtractor()
+        page.feed(body)
+        host = urlparse(url).netloc
+        for href in page.links:
+            absolute = urljoin(url, href)
+            if urlparse(absolute).netloc == host and any(hint in absolute.lower() for hint in CONTACT_LINK_HINTS):
+                self.enqueue(absolute, depth + 1)
+
+    async def run(self, sources: List[LeadSource]) -> AsyncIterator[Dict]:
+        """Crawl all sources; yields leads (CSV rows first, then crawled pages as workers find them)"""
+        own_client = self.client is None
+        if own_client:
+            self.client = httpx.AsyncClient(
+                timeout=CRAWL_TIMEOUT,
+                follow_redirects=False,  # guarded_get follows them, re-checking each hop
+                headers={"User-Agent": CRAWL_USER_AGENT},
+                limits=httpx.Limits(max_connections=self.workers, max_keepalive_connections=self.workers)
+            )
+        workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        try:
+            for source in sources:
+                for url in source.urls():
+                    self.enqueue(url)
+            for source in sources:
+                for lead in source.leads():
+                    self.stats["leads"] += 1
+                    yield lead
+
+            done = asyncio.create_task(self.frontier.join())
+            while True:
+                get = asyncio.create_task(self.output.get())
+                finished, _ = await asyncio.wait({get, done}, return_when=asyncio.FIRST_COMPLETED)
+                if get in finished:
+                    yield get.result()
+                    continue
+                get.cancel()
+                while not self.output.empty():
+                    yield self.output.get_nowait()
+                break
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            if own_client:
+                await self.client.aclose()
+                self.client = None
+
+
+def _read_text(path: str) -> str:
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+# Qualification handoff ---------------------------------------------------
+
+def stage_for_score(score: int) -> str:
+    """Map a qualify_lead_instantly score onto lead store stages"""
+    if score >= 80:
+        return "hot_lead"
+    if score >= 60:
+        return "warm_lead"
+    if score >= 40:
+        return "nurture"
+    return "cold"
+
+
+class LeadSourcingPipeline:
+    """Crawl -> qualify -> store, streaming: leads are qualified and persisted in batches while crawling continues"""
+
+    def __init__(self, sales_bot, lead_store, workers: int = CRAWL_WORKERS, batch_size: int = 200,
+                 analyze_websites: bool = False, run_store=None):
+        self.sales_bot = sales_bot
+        self.analyze_websites = analyze_websites
+        self.lead_store = lead_store
+        self.workers = workers
+        self.batch_size = batch_size
+        self.runs: Dict[str, Dict] = {}
+        self.run_store = run_store  # optional mapping (e.g. a SharedMapping) other processes read progress from
+
+    def _publish(self, state: Dict):
+        if self.run_store is not None:
+            self.run_store[state["run_id"]] = json.dumps(state, default=str).encode("utf-8")
+
+    def get_run(self, run_id: str) -> Optional[Dict]:
+        """Run state from this process, or as last published to the run store"""
+        state = self.runs.get(run_id)
+        if state is None and self.run_store is not None:
+            raw = self.run_store.get(run_id)
+            state = json.loads(raw) if raw else None
+        return state
+
+    async def run(self, sources: List[LeadSource], run_id: Optional[str] = None,
+                  on_lead: Optional[Callable[[Dict], Any]] = None) -> Dict:
+        run_id = run_id or f"sourcing_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        crawler = LeadCrawler(workers=self.workers)
+        state = self.runs[run_id] = {
+            "run_id": run_id,
+            "status": "running",
+            "sources": [source.name for source in sources],
+            "stored": 0,
+            "stages": {},
+            "crawler": crawler.stats,
+            "started_at": datetime.now().isoformat()
+        }
+        started = time.perf_counter()
+        batch: List[Dict] = []
+        self._publish(state)
+        try:
+            async for lead in crawler.run(sources):
+                if self.analyze_websites and str(lead.get("website", "")).startswith("http"):
+                    await self.sales_bot.analyze_website(lead)
+                qualification = await self.sales_bot.qualify_lead_instantly(lead)
+                lead["score"] = qualification["qualification_score"]
+                lead["stage"] = stage_for_score(lead["score"])
+                state["stages"][lead["stage"]] = state["stages"].get(lead["stage"], 0) + 1
+                if on_lead:
+                    on_lead(lead)
+                batch.append(lead)
+                if len(batch) >= self.batch_size:
+                    state["stored"] += len(self.lead_store.add_leads(batch))
+                    batch = []
+                    self._publish(state)
+            if batch:
+                state["stored"] += len(self.lead_store.add_leads(batch))
+            state["status"] = "completed"
+        except asyncio.CancelledError:
+            # Campaign closed or server shutting down - keep the leads already qualified
+            if batch:
+                state["stored"] += len(self.lead_store.add_leads(batch))
+            state["status"] = "stopped"
+            raise
+        except Exception as e:
+            state["status"] = "failed"
+            state["error"] = str(e)
+            logger.error("❌ Lead sourcing run %s failed: %s", run_id, e)
+        finally:
+            state["duration_seconds"] = round(time.perf_counter() - started, 2)
+            self._publish(state)
+            logger.info("🎯 Lead sourcing %s: %s leads stored (%s pages fetched)", run_id, state['stored'], crawler.stats['fetched'])
+        return state
+
+
+async def main(argv: List[str]):
+    """Run a sourcing pass from the command line and store qualified leads"""
+    parser = argparse.ArgumentParser(description="Source leads from CSV exports, sitemaps and HTML pages")
+    parser.add_argument("--csv", action="append", default=[], help="Lead list CSV")
+    parser.add_argument("--sitemap", action="append", default=[], help="sitemap.xml URL or file")
+    parser.add_argument("--html", action="append", default=[], help="Directory of HTML pages")
+    parser.add_argument("--workers", type=int, default=CRAWL_WORKERS)
+    args = parser.parse_args(argv)
+
+    from lead_store import LeadStore
+    from sales_automation import SalesAutomation
+
+    sources = ([CSVSource(path) for path in args.csv] + [SitemapSource(path) for path in args.sitemap]
+               + [HTMLFixtureSource(path) for path in args.html])
+    pipeline = LeadSourcingPipeline(SalesAutomation(), LeadStore(), workers=args.workers)
+    state = await pipeline.run(sources)
+    print(json.dumps(state, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
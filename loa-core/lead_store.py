@@ -0,0 +1,138 @@
+"""
+9LMNTS STUDIO - Lead Store
+Local SQLite storage for leads, segments and follow-up state
+"""
+
+import os
+import json
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Iterable, Iterator, Tuple
+from log_config import setup_logging
+
+# Configure logging
+setup_logging()
+logger = logging.getLogger("LEAD_STORE")
+
+LEAD_STORE_PATH = os.getenv("LEAD_STORE_PATH", "loa_leads.db")
+
+LEAD_STAGES = ["hot_lead", "warm_lead", "nurture", "cold", "closed", "lost"]
+
+# Columns stored natively; anything else on the lead dict goes into `extra` as JSON
+LEAD_COLUMNS = ["name", "email", "company", "industry", "business_type", "budget",
+                "timeline", "requirements", "source", "stage", "score"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leads (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    email TEXT,
+    company TEXT,
+    industry TEXT,
+    business_type TEXT,
+    budget INTEGER,
+    timeline TEXT,
+    requirements TEXT,
+    source TEXT,
+    stage TEXT NOT NULL DEFAULT 'nurture',
+    score INTEGER,
+    extra TEXT,
+    created_at TEXT NOT NULL,
+    last_followup_at TEXT,
+    last_followup_stage TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_leads_stage_id ON leads(stage, id);
+CREATE INDEX IF NOT EXISTS idx_leads_email ON leads(email);
+"""
+
+
+class LeadStore:
+    """Thread-safe SQLite lead storage (WAL mode so readers don't block the writer)"""
+
+    def __init__(self, path: str = LEAD_STORE_PATH):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _row_values(lead: Dict) -> tuple:
+        extra = {key: value for key, value in lead.items() if key not in LEAD_COLUMNS and key != "id"}
+        return tuple(lead.get(column) for column in LEAD_COLUMNS[:-2]) + (
+            lead.get("stage") or "nurture",
+            lead.get("score"),
+            json.dumps(extra) if extra else None,
+            datetime.now().isoformat()
+        )
+
+    def add_lead(self, lead: Dict) -> int:
+        return self.add_leads([lead])[0]
+
+    def add_leads(self, leads: Iterable[Dict]) -> List[int]:
+        """Insert a batch of leads in a single transaction; returns their ids"""
+        sql = (f"INSERT INTO leads ({', '.join(LEAD_COLUMNS)}, extra, created_at) "
+               f"VALUES ({', '.join('?' * (len(LEAD_COLUMNS) + 2))})")
+        ids = []
+        with self._lock, self._conn:
+            for lead in leads:
+                ids.append(self._conn.execute(sql, self._row_values(lead)).lastrowid)
+        return ids
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        lead = dict(row)
+        extra = lead.pop("extra")
+        if extra:
+            lead.update(json.loads(extra))
+        return lead
+
+    def get(self, lead_id: int) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM leads WHERE id = ?", (lead_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def iter_segment(self, stages: List[str], after_id: int = 0, batch_size: int = 500) -> Iterator[List[Dict]]:
+        """Page through leads in the given stages in id order (keyset pagination, resumable via after_id)"""
+        placeholders = ", ".join("?" * len(stages))
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT * FROM leads WHERE stage IN ({placeholders}) AND id > ? ORDER BY id LIMIT ?",
+                    (*stages, after_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            batch = [self._to_dict(row) for row in rows]
+            after_id = batch[-1]["id"]
+            yield batch
+
+    def count(self, stages: Optional[List[str]] = None, after_id: int = 0) -> int:
+        with self._lock:
+            if stages:
+                placeholders = ", ".join("?" * len(stages))
+                return self._conn.execute(
+                    f"SELECT COUNT(*) FROM leads WHERE stage IN ({placeholders}) AND id > ?", (*stages, after_id)
+                ).fetchone()[0]
+            return self._conn.execute("SELECT COUNT(*) FROM leads WHERE id > ?", (after_id,)).fetchone()[0]
+
+    def update_stage(self, lead_id: int, stage: str, score: Optional[int] = None):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE leads SET stage = ?, score = COALESCE(?, score) WHERE id = ?", (stage, score, lead_id))
+
+    def mark_followed_up(self, sent: List[Tuple[int, str]]):
+        """Record (lead_id, stage) follow-ups that were delivered"""
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE leads SET last_followup_at = ?, last_followup_stage = ? WHERE id = ?",
+                [(now, stage, lead_id) for lead_id, stage in sent]
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
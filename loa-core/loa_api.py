@@ -3,39 +3,85 @@
 RESTful API for Nine Pillars AI Services and Sales Automation
 """
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request, Query
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Dict, Any, Optional, List
 import os
 import logging
 import asyncio
-import json
+import time
+import threading
 from datetime import datetime
 from dotenv import load_dotenv
 
 # Import LoA Brain and Integrations
-from loa_brain import LOABrain, NINE_PILLARS_SERVICES, QUICK_SALES_PACKAGES
+from loa_brain import LOABrain
 from notion_integration import NotionIntegration
+from loa_telegram_bot import TelegramBotRunner, TELEGRAM_MODE
+from n8n_mcp_server import N8nMCPServer
+from event_os_license import EventOSLicense, LicenseRegistry, LicenseSigner, SIGNING_AVAILABLE
+from compliance_engine import ComplianceEngine
+from lead_store import LeadStore
+from followup_campaigns import CampaignManager, FOLLOWUP_STAGES
+from timer_scheduler import TimerScheduler, TIMER_JOURNAL_PATH
+from sales_automation import SalesAutomation
+from lead_sourcing import build_source
+from proposal_engine import ProposalEngine, ProposalStore, MAX_PROPOSAL_BATCH
+from lead_import import LeadImporter, export_leads, iter_error_report, FORMATS as LEAD_FILE_FORMATS
+from service_catalog import get_catalog, CatalogError
+from service_search import get_service_index
+from metrics import metrics, http_request_duration, queue_depth, log_records_dropped, record_cache
+from document_renderer import renderer
+from tracing import start_span, set_attributes, exporter as span_exporter
+from webhook_pipeline import WebhookPipeline, TwilioSMSHandler, verify_hmac_sha256, verify_twilio_signature, JOURNAL_PATH as WEBHOOK_JOURNAL_PATH
+from log_config import setup_logging, get_stats as get_log_stats
+import profiler
+from execution import execution, execution_policy, loop_monitor, BLOCKING
+from admission import admission, Rejected
+from shared_state import get_shared_state, worker_path, WORKER_SLOT
+from conversation_memory import conversation_memory
+from interaction_analytics import InteractionAnalytics, parse_time
+from serialization import FastJSONResponse, EncodedJSONResponse, model_encoder, dumps, dumps_str
 
 # Load environment variables
 load_dotenv()
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+setup_logging()
 logger = logging.getLogger("LOA_API")
 
 # Initialize FastAPI app
 app = FastAPI(
     title="LOA Brain API - Nine Pillars AI Services",
     description="9LMNTS Studio - AI-Powered Digital Dominance Platform",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse
 )
 
+# Admission control runs inside CORS (so 429/503 still carry CORS headers) but before any handler
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    """Per-client rate limits and a global concurrency cap; overload gets a fast 429/503 with Retry-After"""
+    lane = admission.lane_for(request.url.path)
+    if lane is None or request.method == "OPTIONS":
+        return await call_next(request)
+    try:
+        await admission.admit(lane, admission.client_key(request.headers, request.client.host if request.client else None))
+    except Rejected as e:
+        return JSONResponse({"detail": "Too many requests" if e.status == 429 else "Server busy", "reason": e.reason},
+                            status_code=e.status, headers={"Retry-After": str(e.retry_after)})
+    started = time.perf_counter()
+    try:
+        return await call_next(request)
+    finally:
+        admission.release(time.perf_counter() - started)
+
 # CORS middleware for IDE integrations
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # Configure for production
+    allow_origins=[origin.strip() for origin in os.getenv("CORS_ORIGINS", "*").split(",")],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -44,6 +90,176 @@ app.add_middleware(
 # Initialize LoA Brain and Integrations
 brain = LOABrain()
 notion = NotionIntegration()
+telegram_runner = TelegramBotRunner(brain)
+n8n_server = N8nMCPServer()
+license_registry = LicenseRegistry()
+license_system = EventOSLicense(
+    registry=license_registry,
+    signer=LicenseSigner() if SIGNING_AVAILABLE else None
+)
+compliance_engine = ComplianceEngine(license_system)
+lead_store = LeadStore()
+campaigns = CampaignManager(lead_store)
+scheduler = TimerScheduler(worker_path(TIMER_JOURNAL_PATH))  # journals get one file per worker process
+sales_bot = SalesAutomation(brain, scheduler, lead_store)
+lead_importer = LeadImporter(sales_bot, lead_store)
+proposal_store = ProposalStore()
+interaction_analytics = InteractionAnalytics()
+proposal_engine = ProposalEngine(proposal_store)
+brain.use_stores(lead_store, proposal_store)
+
+# Webhook ingestion: verify, journal, ack with 202, process on a bounded worker pool.
+# A platform whose signing secret is unset is disabled - unsigned events never reach its handler.
+N8N_WEBHOOK_SECRET = os.getenv("N8N_WEBHOOK_SECRET", "")
+TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN", "")
+webhooks = WebhookPipeline(worker_path(WEBHOOK_JOURNAL_PATH))
+webhooks.register(
+    "n8n",
+    n8n_server.handle_n8n_trigger,
+    verifier=verify_hmac_sha256(N8N_WEBHOOK_SECRET, "X-N8N-Signature"),
+    blocking=True,  # N8n handlers make synchronous HTTP calls
+    enabled=lambda: bool(N8N_WEBHOOK_SECRET)
+)
+webhooks.register(
+    "telegram",
+    telegram_runner.process_webhook_update,
+    verifier=lambda body, headers, url: telegram_runner.verify_webhook_secret(headers.get("x-telegram-bot-api-secret-token")),
+    enabled=lambda: telegram_runner.webhook_active
+)
+webhooks.register(
+    "twilio",
+    TwilioSMSHandler(brain),
+    verifier=verify_twilio_signature(TWILIO_AUTH_TOKEN, os.getenv("TWILIO_WEBHOOK_URL", "")),
+    blocking=True,
+    enabled=lambda: bool(TWILIO_AUTH_TOKEN)
+)
+
+requests_served = 0
+HEARTBEAT_INTERVAL = float(os.getenv("WORKER_HEARTBEAT_INTERVAL", "2.0"))
+# Its own single thread: a saturated blocking pool must not read as a hung worker
+execution.add_pool("heartbeat", BLOCKING, 1)
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    global requests_served
+    requests_served += 1
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Route template ("/proposals/{proposal_id}"), not the raw path, keeps label cardinality bounded
+        route = request.scope.get("route")
+        http_request_duration.observe(time.perf_counter() - started, method=request.method,
+                                      route=getattr(route, "path", "unmatched"), status=status)
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Server span per request, continuing the caller's W3C traceparent (e.g. the Supabase edge function)"""
+    with start_span(f"{request.method} {request.url.path}", kind="server",
+                    traceparent=request.headers.get("traceparent")) as span:
+        span.set_attribute("http.method", request.method)
+        response = await call_next(request)
+        route = request.scope.get("route")
+        if route is not None:
+            span.name = f"{request.method} {route.path}"
+        span.set_attribute("http.status_code", response.status_code)
+        if response.status_code >= 500:
+            span.status = "error"
+        response.headers["traceparent"] = span.traceparent
+        return response
+
+if profiler.is_enabled():
+    # Only installed when PROFILER_TOKEN is set, so a disabled profiler costs nothing per request
+    @app.middleware("http")
+    async def profile_requests(request: Request, call_next):
+        """X-Profile: 1 (with X-Profiler-Token) samples the threads serving this request: the event loop
+        plus any execution-pool thread while it runs work for the request (e.g. brain.think for /chat).
+
+        The event loop thread is shared, so concurrent requests on it show up in the same profile.
+        """
+        if not request.headers.get(profiler.PROFILE_HEADER) or not profiler.authorized(
+                request.headers.get(profiler.TOKEN_HEADER)):
+            return await call_next(request)
+        profile = profiler.SamplingProfiler(profiler.PROFILE_REQUEST_INTERVAL, [threading.get_ident()]).start()
+        try:
+            with profiler.profiling_request(profile):
+                response = await call_next(request)
+        finally:
+            profile.stop()
+        response.headers["X-Profile-Id"] = profiler.profiles.add(f"{request.method} {request.url.path}", profile)
+        return response
+
+def require_profiler(request: Request):
+    if not profiler.is_enabled():
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not profiler.authorized(request.headers.get(profiler.TOKEN_HEADER)):
+        raise HTTPException(status_code=403, detail="Invalid profiler token")
+
+def require_admin(request: Request):
+    """Operator-only endpoints share the profiler token (X-Profiler-Token); unset = they are disabled"""
+    if not profiler.is_enabled():
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not profiler.authorized(request.headers.get(profiler.TOKEN_HEADER)):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+def collect_runtime_metrics():
+    """Queue depths (webhooks, timers, logs) and cache hit rates, refreshed on every /metrics scrape"""
+    queue_depth.set(webhooks.queue.qsize() if webhooks.queue else 0, queue="webhooks")
+    queue_depth.set(len(scheduler.wheel), queue="timers")
+    log_stats = get_log_stats()
+    queue_depth.set(log_stats["queued"], queue="logs")
+    log_records_dropped.set(log_stats["dropped"])
+    record_cache("document_renderer", renderer.stats["hits"], renderer.stats["misses"])
+    analyzer_stats = sales_bot.website_analyzer.stats
+    record_cache("website_http", analyzer_stats["not_modified"], analyzer_stats["fetched"])
+    memory_stats = conversation_memory.counters
+    record_cache("conversation_memory", memory_stats["hits"], memory_stats["loads"] + memory_stats["misses"])
+
+metrics.add_collector(collect_runtime_metrics)
+metrics.add_collector(admission.collect)
+
+async def worker_heartbeat():
+    """Under loa_server.py: report liveness to the supervisor - a blocked event loop stops the heartbeat"""
+    shared = get_shared_state()
+    while True:
+        await execution.run_in("heartbeat", shared.heartbeat, int(WORKER_SLOT), os.getpid(), requests_served)
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+heartbeat_task: Optional[asyncio.Task] = None
+
+@app.on_event("startup")
+async def start_background_services():
+    global heartbeat_task
+    if WORKER_SLOT:
+        heartbeat_task = asyncio.create_task(worker_heartbeat())
+    loop_monitor.start()
+    await webhooks.start()
+    await scheduler.start()
+    await get_catalog().start()
+    if TELEGRAM_MODE == "webhook":
+        await telegram_runner.start_webhook()
+
+@app.on_event("shutdown")
+async def stop_background_services():
+    if heartbeat_task is not None:
+        heartbeat_task.cancel()
+    await webhooks.stop()
+    await scheduler.stop()
+    await get_catalog().stop()
+    await sales_bot.website_analyzer.close()
+    sales_bot.close()
+    await telegram_runner.stop()
+    await loop_monitor.stop()
+    execution.shutdown()  # let in-flight offloaded calls finish before the stores close
+    conversation_memory.flush()
+    license_registry.close()
+    lead_store.close()
+    proposal_store.close()
+    interaction_analytics.close()
+    span_exporter.flush()
 
 # Pydantic models
 class ChatRequest(BaseModel):
@@ -60,6 +276,8 @@ class ChatResponse(BaseModel):
     suggested_actions: Optional[List[str]] = None
     revenue_potential: Optional[int] = None
 
+encode_chat_response = model_encoder(ChatResponse)
+
 class LeadRequest(BaseModel):
     client_name: str
     business_type: str
@@ -67,6 +285,7 @@ class LeadRequest(BaseModel):
     timeline: Optional[str] = None
     requirements: str
     contact_info: str
+    website: Optional[str] = None
 
 class ProposalRequest(BaseModel):
     service_package: str
@@ -74,6 +293,32 @@ class ProposalRequest(BaseModel):
     budget: Optional[int] = None
     timeline: Optional[str] = None
 
+class ProposalBatchItem(ProposalRequest):
+    client_name: Optional[str] = None
+
+class ProposalBatchRequest(BaseModel):
+    proposals: List[ProposalBatchItem]
+
+class BulkLicenseRequest(BaseModel):
+    service_package: str
+    clients: List[Dict[str, Any]]
+    batch_name: Optional[str] = None
+    custom_terms: Optional[Dict[str, Any]] = None
+
+class ComplianceAuditRequest(BaseModel):
+    events: List[Dict[str, Any]]
+    include_results: Optional[bool] = False
+
+class FollowupCampaignRequest(BaseModel):
+    stages: Optional[List[str]] = None  # defaults to every follow-up stage
+    campaign_id: Optional[str] = None  # re-use an id to resume a campaign from its checkpoint
+
+class ScrapeRequest(BaseModel):
+    sources: Optional[List[Dict[str, Any]]] = None  # [{"type": "csv"|"sitemap"|"html", "path": ...}]
+
+class WebsiteAnalysisRequest(BaseModel):
+    urls: List[str]
+
 class StatusResponse(BaseModel):
     status: str
     active_leads: int
@@ -90,31 +335,94 @@ async def root():
     return {
         "message": "LOA Brain API Online - Nine Pillars AI Services", 
         "version": "1.0.0",
-        "services": len(NINE_PILLARS_SERVICES),
-        "packages": len(QUICK_SALES_PACKAGES)
+        "services": len(get_catalog().current.services),
+        "packages": len(get_catalog().current.packages)
     }
 
+def sales_dashboard() -> Dict:
+    # Counts come from the SQLite stores every worker process shares, not from this process's memory
+    return brain.get_sales_dashboard()
+
 @app.get("/health")
 async def health_check():
-    dashboard = brain.get_sales_dashboard()
-    return StatusResponse(**dashboard)
+    dashboard = sales_dashboard()
+    return StatusResponse(status="healthy", **dashboard)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/debug/profile", response_class=PlainTextResponse)
+async def profile_process(request: Request, seconds: float = Query(10.0, gt=0, le=profiler.PROFILE_MAX_SECONDS),
+                          interval: float = Query(profiler.PROFILE_INTERVAL, ge=0.001, le=1.0)):
+    """Sample every thread for N seconds; returns collapsed stacks for flamegraph.pl / speedscope"""
+    require_profiler(request)
+    try:
+        profile = await profiler.profile_process(seconds, interval)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(profile.collapsed(), headers={"X-Profile-Samples": str(profile.samples)})
+
+@app.get("/debug/profiles")
+async def list_request_profiles(request: Request):
+    """Recent per-request profiles (X-Profile header)"""
+    require_profiler(request)
+    return profiler.profiles.list()
+
+@app.get("/debug/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_request_profile(profile_id: str, request: Request):
+    require_profiler(request)
+    entry = profiler.profiles.get(profile_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(entry["collapsed"])
+
+@app.get("/workers")
+async def list_workers():
+    """API worker processes and their last heartbeat (populated when started via loa_server.py)"""
+    now = time.time()
+    return [{**worker, "heartbeat_age": round(now - worker["heartbeat_at"], 1)} for worker in get_shared_state().workers()]
 
 @app.get("/services")
 async def get_services():
-    """Get all Nine Pillars AI services"""
-    return NINE_PILLARS_SERVICES
+    """Get all Nine Pillars AI services (encoded once per catalog version)"""
+    return EncodedJSONResponse(get_catalog().current.derive("services_json", lambda snapshot: dumps(snapshot.services)))
 
 @app.get("/packages")
 async def get_packages():
-    """Get quick sales packages"""
-    return QUICK_SALES_PACKAGES
+    """Get quick sales packages (encoded once per catalog version)"""
+    return EncodedJSONResponse(get_catalog().current.derive("packages_json", lambda snapshot: dumps(snapshot.packages)))
+
+@app.get("/catalog")
+async def get_catalog_version():
+    """Live catalog version plus recent reload history"""
+    catalog = get_catalog()
+    return {"current": catalog.current.describe(), "history": catalog.history}
+
+@app.get("/recommend")
+async def recommend_services(budget: Optional[int] = Query(None, ge=0), requirements: str = "",
+                             limit: int = Query(3, ge=1, le=9)):
+    """Best-fit pillars and packages for a budget and requirement text (served from the catalog index)"""
+    return get_service_index().recommend(budget, requirements, limit)
+
+@app.post("/catalog/reload")
+async def reload_catalog():
+    """Reload the catalog file now (the watcher also picks up edits automatically)"""
+    try:
+        snapshot = await execution.run(get_catalog().reload)
+    except CatalogError as e:
+        raise HTTPException(status_code=400, detail={"error": "Catalog rejected", "problems": e.problems})
+    except (ValueError, OSError) as e:
+        raise HTTPException(status_code=400, detail=f"Catalog file unreadable: {e}")
+    return snapshot.describe()
 
 @app.post("/chat", response_model=ChatResponse)
 async def chat_with_loa(request: ChatRequest, background_tasks: BackgroundTasks):
     """Chat with LOA Brain for sales and service recommendations"""
     try:
         # Process message through LoA Brain
-        response = brain.think(request.message, request.context)
+        response = await execution.run(brain.think, request.message, request.context, request.user_id)
         
         # Log interaction in background
         background_tasks.add_task(
@@ -141,64 +449,157 @@ async def chat_with_loa(request: ChatRequest, background_tasks: BackgroundTasks)
         elif "proposal" in request.message.lower():
             suggested_actions = ["generate_proposal", "send_contract", "setup_payment"]
         
-        return ChatResponse(
+        return EncodedJSONResponse(encode_chat_response(ChatResponse(
             response=response,
             timestamp=datetime.now(),
             user_id=request.user_id,
             action_required=action_required,
             suggested_actions=suggested_actions if suggested_actions else None,
             revenue_potential=revenue_potential
-        )
+        )))
         
     except Exception as e:
-        logger.error(f"Error processing chat: {e}")
+        logger.error("Error processing chat: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.get("/interactions")
+async def query_interactions(request: Request, user_id: Optional[str] = None, type: Optional[str] = None,
+                             intent: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None,
+                             limit: int = Query(100, ge=1, le=1000)):
+    """Indexed interaction log search, newest first - since/until take "7d", "24h" or ISO dates - admin only"""
+    require_admin(request)
+    try:
+        window = {"since": parse_time(since), "until": parse_time(until)}
+    except ValueError:
+        raise HTTPException(status_code=400, detail="since/until must look like 7d, 24h, 30m or an ISO date")
+    filters = {"user_id": user_id, "type": type, "intent": intent, **window}
+    total = await execution.run(interaction_analytics.count, **filters)
+    rows = await execution.run(interaction_analytics.query, limit=limit, **filters)
+    return FastJSONResponse({"total": total, "interactions": rows})
+
+@app.get("/interactions/intents")
+async def top_interaction_intents(days: int = Query(7, ge=1, le=366), top: int = Query(5, ge=1, le=20)):
+    """Most frequent intents per day"""
+    return await execution.run(interaction_analytics.top_intents, days, top)
+
+@app.get("/interactions/stats")
+async def interaction_index_stats():
+    """How far the analytics index has caught up with the interaction log"""
+    return await execution.run(interaction_analytics.stats)
+
+@app.get("/memory/stats")
+async def get_memory_stats():
+    """Conversation memory: conversations in RAM, cache hits, store loads and writes"""
+    return conversation_memory.stats()
+
+@app.get("/memory/{user_id}")
+async def get_user_memory(user_id: str, request: Request, max_tokens: int = Query(2000, ge=0, le=32000)):
+    """Rolling summary and recent turns LOA Brain would prompt with for this user - admin only"""
+    require_admin(request)
+    return await execution.run(conversation_memory.context, user_id, max_tokens)
+
+@app.delete("/memory/{user_id}")
+async def forget_user_memory(user_id: str, request: Request):
+    """Erase a user's conversation history - admin only"""
+    require_admin(request)
+    await execution.run(conversation_memory.forget, user_id)
+    return {"status": "forgotten", "user_id": user_id}
+
 @app.post("/lead", response_model=Dict)
 async def create_lead(lead: LeadRequest):
     """Create and qualify new lead"""
     try:
-        # Add to active leads
-        brain.active_leads.append(lead.dict())
-        
         # Auto-qualify based on budget
         qualification = "HOT LEAD" if lead.budget and lead.budget >= 2000 else "WARM LEAD"
+
+        # Persist for follow-up campaigns
+        stored_id = lead_store.add_lead({
+            "name": lead.client_name,
+            "email": lead.contact_info if "@" in lead.contact_info else None,
+            "contact_info": lead.contact_info,
+            "business_type": lead.business_type,
+            "budget": lead.budget,
+            "timeline": lead.timeline,
+            "requirements": lead.requirements,
+            "website": lead.website,
+            "source": "api",
+            "stage": "hot_lead" if qualification == "HOT LEAD" else "warm_lead"
+        })
+        set_attributes(lead_id=stored_id, lead_email=lead.contact_info, lead_name=lead.client_name)
+        
+        # Schedule the follow-up for the lead's expected closing timeline
+        lead_info = {key: value for key, value in lead.dict().items() if value is not None}
+        await sales_bot.calculate_deal_probability({"id": stored_id, "name": lead.client_name, **lead_info})
+
+        # Scan the prospect's site for pain points (public hosts only)
+        website_analysis = await sales_bot.analyze_website(lead_info) if lead.website else None
         
         # Recommend package
-        recommended_package = None
-        if lead.budget:
-            if lead.budget >= 5000:
-                recommended_package = QUICK_SALES_PACKAGES["ai_brand_transformation"]
-            elif lead.budget >= 7500:
-                recommended_package = QUICK_SALES_PACKAGES["digital_dominance_starter"]
-            elif lead.budget >= 15000:
-                recommended_package = QUICK_SALES_PACKAGES["ai_business_empire"]
+        package_key = get_service_index().package_for_budget(lead.budget)
+        recommended_package = get_catalog().current.packages[package_key] if package_key else None
         
         return {
             "status": "lead_created",
             "qualification": qualification,
-            "lead_id": len(brain.active_leads),
+            "lead_id": stored_id,
             "recommended_package": recommended_package,
+            "website_analysis": website_analysis,
             "next_steps": ["generate_proposal", "send_invoice", "schedule_call"]
         }
         
     except Exception as e:
-        logger.error(f"Error creating lead: {e}")
+        logger.error("Error creating lead: %s", e)
         raise HTTPException(status_code=500, detail="Failed to create lead")
 
+@app.post("/leads/import", response_model=Dict)
+async def import_leads(request: Request, format: str = "csv"):
+    """Bulk import a CSV/JSONL upload (raw request body), parsed as it streams in"""
+    if format not in LEAD_FILE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(LEAD_FILE_FORMATS)}")
+    try:
+        return await lead_importer.import_stream(request.stream(), format, source="upload")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/leads/import/{import_id}/errors")
+async def get_import_errors(import_id: str):
+    """Full per-row error report of an import (JSONL)"""
+    report = iter_error_report(import_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="No error report for this import")
+    return StreamingResponse(report, media_type="application/x-ndjson")
+
+@app.get("/leads/export")
+async def export_stored_leads(format: str = "csv", stage: Optional[List[str]] = Query(None)):
+    """Stream stored leads as CSV or JSONL"""
+    if format not in LEAD_FILE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(LEAD_FILE_FORMATS)}")
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        export_leads(lead_store, format, stage),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=leads.{format}"}
+    )
+
+@execution_policy(BLOCKING, pool="brain")
+def assess_lead(payload: Dict[str, Any]) -> str:
+    """Serialize and assess an inbound lead (off the event loop, on the brain pool)"""
+    return brain.think(f"New Lead: {dumps_str(payload)}")
+
 @app.post("/api/submit-lead")
 async def submit_lead_v2(payload: Dict[str, Any], background_tasks: BackgroundTasks):
     """
     Compatibility endpoint for Supabase Edge Functions.
     Orchestrates the LOA Brain analysis and Notion sync for inbound leads.
     """
-    logger.info(f"🚀 Incoming Edge Function Lead: {payload.get('email')}")
+    logger.info("🚀 Incoming Edge Function Lead: %s", payload.get('email'))
+    set_attributes(lead_email=payload.get("email"), lead_name=payload.get("name"))
     
     # 1. Background task: Sync to Notion
     background_tasks.add_task(notion.add_lead_to_notion, payload)
     
     # 2. Process through LoA Brain
-    assessment = brain.think(f"New Lead: {json.dumps(payload)}")
+    assessment = await execution.run(assess_lead, payload)
     
     return {
         "status": "imperial_success",
@@ -211,45 +612,114 @@ async def submit_lead_v2(payload: Dict[str, Any], background_tasks: BackgroundTa
 async def generate_proposal(proposal: ProposalRequest):
     """Generate AI-powered proposal"""
     try:
-        # Get package details
-        package = QUICK_SALES_PACKAGES.get(proposal.service_package)
-        if not package:
-            raise HTTPException(status_code=404, detail="Package not found")
-        
-        # Calculate ROI
-        roi_percentage = ((package["value"] - package["price"]) / package["price"]) * 100
-        
-        proposal_data = {
-            "package_name": package["name"],
-            "price": package["price"],
-            "value": package["value"],
-            "roi": f"{roi_percentage:.1f}%",
-            "services": [NINE_PILLARS_SERVICES[service] for service in package["services"]],
-            "timeline": "24-48 hours",
-            "event_os_license": "Included",
-            "payment_terms": "50% upfront, 50% on delivery",
-            "guarantee": "AI setup satisfaction guaranteed"
-        }
-        
-        # Add to proposals sent
-        brain.proposals_sent.append(proposal_data)
-        
-        return {
-            "status": "proposal_generated",
-            "proposal": proposal_data,
-            "next_steps": ["send_invoice", "get_approval", "start_work"]
-        }
-        
+        proposal_data = await execution.run(proposal_engine.generate, proposal.dict())
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Package not found")
     except Exception as e:
-        logger.error(f"Error generating proposal: {e}")
+        logger.error("Error generating proposal: %s", e)
         raise HTTPException(status_code=500, detail="Failed to generate proposal")
+    
+    return FastJSONResponse({
+        "status": "proposal_generated",
+        "proposal": proposal_data,
+        "next_steps": ["send_invoice", "get_approval", "start_work"]
+    })
+
+@app.post("/proposals/batch", response_model=Dict)
+async def generate_proposals_batch(request: ProposalBatchRequest):
+    """Generate and persist proposals for many clients at once (e.g. after a campaign)"""
+    if len(request.proposals) > MAX_PROPOSAL_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_PROPOSAL_BATCH} proposals per batch")
+    proposals, errors = await execution.run(proposal_engine.generate_batch, [item.dict() for item in request.proposals])
+    return FastJSONResponse({
+        "status": "proposals_generated",
+        "generated": len(proposals),
+        "rejected": len(errors),
+        "proposals": proposals,
+        "errors": errors
+    })
+
+@app.get("/proposals/{proposal_id}", response_model=Dict)
+async def get_proposal(proposal_id: str):
+    """Look up a stored proposal"""
+    proposal_data = proposal_store.get(proposal_id)
+    if proposal_data is None:
+        raise HTTPException(status_code=404, detail="Proposal not found")
+    return FastJSONResponse(proposal_data)
+
+@app.post("/licenses/bulk", response_model=Dict)
+async def issue_bulk_licenses(request: BulkLicenseRequest):
+    """Issue Event OS licenses for a whole batch of clients (JSONL archive + index)"""
+    if request.service_package not in license_system.license_types:
+        raise HTTPException(status_code=404, detail="License package not found")
+    try:
+        # File writing for thousands of licenses - keep it off the event loop
+        result = await execution.run(
+            license_system.issue_bulk_licenses,
+            request.clients, request.service_package, request.batch_name, request.custom_terms
+        )
+        return {"status": "licenses_issued", **result}
+    except FileExistsError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.error("Error issuing bulk licenses: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to issue licenses")
+
+@app.get("/licenses/verify/{license_id}")
+async def verify_license(license_id: str):
+    """Look up an issued license by ID (single hash-index lookup)"""
+    record = license_registry.lookup(license_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="License not found")
+    return {"valid": record["status"] == "active", "license": record}
+
+@app.get("/licenses/public-key")
+async def get_license_public_key():
+    """Ed25519 public key for verifying signed licenses offline"""
+    if not license_system.signer:
+        raise HTTPException(status_code=503, detail="License signing not configured")
+    return {"algorithm": "Ed25519", "public_key": license_system.signer.public_key}
+
+@app.post("/licenses/compliance/audit", response_model=Dict)
+async def audit_license_compliance(request: ComplianceAuditRequest):
+    """Audit a batch of platform usage events against issued licenses"""
+    if request.include_results:
+        results = await execution.run(lambda: list(compliance_engine.evaluate_batch(request.events)))
+        return {"status": "audited", "results": results}
+    summary = await execution.run(compliance_engine.audit, request.events)
+    return {"status": "audited", "summary": summary}
+
+@app.post("/campaigns/followup", response_model=Dict)
+async def start_followup_campaign(request: FollowupCampaignRequest):
+    """Start (or resume) a follow-up email campaign over stored leads"""
+    try:
+        return campaigns.start(request.stages or FOLLOWUP_STAGES, request.campaign_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/campaigns/{campaign_id}", response_model=Dict)
+async def get_followup_campaign(campaign_id: str):
+    """Campaign progress (live or from its checkpoint)"""
+    state = campaigns.status(campaign_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return state
 
 @app.post("/scrape/start", response_model=Dict)
-async def start_scraping():
-    """Start automated lead scraping and outreach"""
+async def start_scraping(http_request: Request, request: Optional[ScrapeRequest] = None):
+    """Start automated lead scraping and outreach - admin only (it makes outbound requests)"""
+    require_admin(http_request)
     try:
+        sources = [build_source(spec) for spec in (request.sources or [])] if request else []
+    except (ValueError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid lead source: {e}")
+    try:
+        # Closes itself at its 12-hour deadline; sources are crawled and qualified in the background
+        campaign = await sales_bot.start_lead_scraping_campaign(sources, lead_store)
         return {
             "status": "scraping_started",
+            "campaign_id": campaign["campaign_id"],
+            "sourcing_run_id": campaign["sourcing_run_id"],
             "targets": [
                 "Businesses needing AI transformation",
                 "Companies with outdated websites", 
@@ -260,7 +730,7 @@ async def start_scraping():
             ],
             "automation": {
                 "linkedin_scraping": "Active",
-                "website_analysis": "Running",
+                "website_analysis": "Running" if campaign["sourcing_run_id"] else "Idle (no sources)",
                 "email_outreach": "Automated",
                 "lead_qualification": "Instant",
                 "proposal_generation": "AI-powered"
@@ -270,33 +740,77 @@ async def start_scraping():
         }
         
     except Exception as e:
-        logger.error(f"Error starting scraping: {e}")
+        logger.error("Error starting scraping: %s", e)
         raise HTTPException(status_code=500, detail="Failed to start scraping")
 
-@app.post("/webhook/{platform}")
-async def webhook_handler(platform: str, payload: Dict[str, Any]):
-    """Handle webhooks from N8n, Telegram, etc."""
+@app.post("/analyze/website", response_model=Dict)
+async def analyze_websites(request: WebsiteAnalysisRequest):
+    """Score prospect websites for pain points (re-analysis of unchanged pages is served by 304s)"""
+    if not request.urls or len(request.urls) > 50:
+        raise HTTPException(status_code=400, detail="Provide between 1 and 50 URLs")
+    analyses = await sales_bot.website_analyzer.analyze_many(request.urls)
+    return {"analyses": analyses, "http": sales_bot.website_analyzer.stats}
+
+@app.get("/scrape/{run_id}", response_model=Dict)
+async def get_scraping_run(run_id: str):
+    """Lead sourcing progress: pages fetched, leads stored and their qualification stages"""
+    state = sales_bot.get_sourcing_run(run_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Sourcing run not found")
+    return state
+
+@app.get("/execution/stats")
+async def get_execution_stats():
+    """Per-pool saturation for offloaded work, plus event-loop lag"""
+    return {"pools": execution.stats(), "event_loop": loop_monitor.stats()}
+
+@app.get("/admission/stats")
+async def get_admission_stats():
+    """Concurrency slots in use, queue length and lane limits"""
+    return admission.stats()
+
+@app.get("/timers/stats")
+async def timer_stats():
+    """Pending follow-up/re-score/campaign timers and scheduler counters"""
+    return scheduler.get_stats()
+
+@app.post("/webhooks/replay")
+async def replay_webhooks(request: Request, from_seq: int = 0, platform: Optional[str] = None, only_pending: bool = True):
+    """Re-dispatch journaled webhook events (default: those that never completed) - admin only"""
+    require_admin(request)
+    return await webhooks.replay(from_seq=from_seq, platform=platform, only_pending=only_pending)
+
+@app.get("/webhooks/stats")
+async def webhook_stats():
+    """Webhook pipeline counters and queue depth"""
+    return webhooks.get_stats()
+
+@app.post("/webhook/{platform}", status_code=202)
+async def webhook_handler(platform: str, request: Request):
+    """Handle webhooks from N8n, Telegram, Twilio - acknowledged immediately, processed in background"""
+    if not webhooks.supports(platform):
+        raise HTTPException(status_code=400, detail="Unsupported platform")
+    if not webhooks.is_enabled(platform):
+        # e.g. Telegram outside TELEGRAM_MODE=webhook - refuse now rather than journal an event that can only fail
+        raise HTTPException(status_code=404, detail=f"{platform} webhooks are not enabled on this server")
+
+    body = await request.body()
+    headers = {name.lower(): value for name, value in request.headers.items()}
+
+    if not webhooks.verify(platform, body, headers, str(request.url)):
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+
     try:
-        if platform == "n8n":
-            # Process N8n workflow triggers
-            return {"status": "processed", "action": "workflow_triggered"}
-        elif platform == "telegram":
-            # Process Telegram updates
-            return {"status": "processed", "action": "telegram_response"}
-        elif platform == "twilio":
-            # Process SMS/webhook
-            return {"status": "processed", "action": "sms_response"}
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported platform")
+        return webhooks.ingest(platform, body, headers)
     except Exception as e:
-        logger.error(f"Webhook error for {platform}: {e}")
+        logger.error("Webhook error for %s: %s", platform, e)
         raise HTTPException(status_code=500, detail="Webhook processing failed")
 
 @app.get("/dashboard")
 async def get_dashboard():
     """Get sales dashboard"""
-    dashboard = brain.get_sales_dashboard()
-    return dashboard
+    dashboard = sales_dashboard()
+    return FastJSONResponse(dashboard)
 
 @app.get("/ide/{ide_type}/config")
 async def get_ide_config(ide_type: str):
@@ -4,20 +4,31 @@ Master Intelligence Layer for Multi-Agent Coordination
 """
 
 import os
-import json
 import logging
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 import requests
+from service_catalog import get_catalog
+from service_search import get_service_index
+from metrics import timed_scorer
+from tracing import traced
+from execution import execution, execution_policy, BLOCKING
+from log_config import setup_logging
+from serialization import dumps
+from conversation_memory import conversation_memory, classify_intent
+from interaction_analytics import INTERACTION_LOG_PATH
 # Placeholder imports - these would be actual library imports in production
 # from anthropic import Anthropic 
 # import openai 
 
 # Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+setup_logging()
 logger = logging.getLogger("LOA_Brain")
 
-# Nine Pillars AI Services Configuration
+# think() runs on its own pool: future LLM calls there must not queue behind Notion or SQLite work
+execution.add_pool("brain", BLOCKING, int(os.getenv("BRAIN_WORKERS", "8")))
+
+# Nine Pillars AI Services Configuration (built-in defaults - the live catalog is service_catalog)
 NINE_PILLARS_SERVICES = {
     "mcing_element": {
         "name": "AI Brand Voice & Content Generation",
@@ -100,9 +111,22 @@ QUICK_SALES_PACKAGES = {
     }
 }
 
+PILLAR_LABELS = {"mcing_element": "MCing Element", "djing_element": "DJing Element"}
+
+
+def render_services_prompt(snapshot) -> str:
+    """System prompt pillar lines with live catalog price ranges"""
+    lines = []
+    for pillar, data in snapshot.services.items():
+        low, high = snapshot.price_range(pillar)
+        label = PILLAR_LABELS.get(pillar, pillar.replace("_", " ").title())
+        lines.append(f"        - {label}: {data['name']} (${low:,}-${high:,})")
+    return "\n".join(lines)
+
+
 class LOABrain:
     def __init__(self):
-        self.system_prompt = """
+        self.system_prompt_template = """
         You are LOA (Lead Orchestrator Agent), Chief of Staff for 9LMNTS Studio.
         Your goal is to help the founder manage 20+ clients and scale to $100k/week.
         
@@ -114,15 +138,7 @@ class LOABrain:
         5. Sell Nine Pillars AI services with urgency and value.
         
         Nine Pillars AI Services:
-        - MCing Element: AI Brand Voice & Content Generation ($2,500-$25,000)
-        - DJing Element: AI User Experience Flow ($3,000-$35,000)
-        - Graffiti Element: AI Visual Design System ($2,000-$25,000)
-        - Breaking Element: AI Innovation & Disruption ($1,500-$15,000)
-        - Beatboxing Element: AI Interaction & Animation ($2,000-$25,000)
-        - Knowledge Element: AI Content & Learning Systems ($1,000-$18,000)
-        - Fashion Element: AI Trend Forecasting ($2,500-$35,000)
-        - Entrepreneurship Element: AI Business Automation ($3,000-$50,000)
-        - Language Element: AI Multilingual Communication ($3,500-$35,000)
+{services}
         
         Sales Strategy:
         - Target businesses needing AI transformation
@@ -142,56 +158,77 @@ class LOABrain:
             "twilio": os.getenv("TWILIO_ACCOUNT_SID")
         }
         
-        # Sales automation
+        # Sales automation (in-memory fallback; the API attaches the shared stores with use_stores)
         self.active_leads = []
         self.proposals_sent = []
         self.deals_closed = []
+        self.lead_store = None
+        self.proposal_store = None
         
         logger.info("LOA Brain initialized with Nine Pillars AI services.")
 
-    def think(self, user_input: str, context: Optional[Dict] = None) -> str:
+    @property
+    def system_prompt(self) -> str:
+        # Rendered once per catalog version - a price change shows up without a restart
+        snapshot = get_catalog().current
+        return self.system_prompt_template.replace("{services}", snapshot.derive("services_prompt", render_services_prompt))
+
+    @execution_policy(BLOCKING, pool="brain")
+    @traced("brain.think")
+    def think(self, user_input: str, context: Optional[Dict] = None, user_id: Optional[str] = None) -> str:
         """
         Processes user input and decides on the next action.
+        With a user_id the exchange is remembered, and earlier turns inform the answer.
         """
-        logger.info(f"Thinking about: {user_input}")
-        
+        logger.debug("Thinking about input (%d chars)", len(user_input))
+        response = self._respond(user_input, user_id)
+        if user_id:
+            conversation_memory.record(user_id, user_input, response, context)
+        return response
+
+    def build_messages(self, user_input: str, user_id: str) -> List[Dict[str, str]]:
+        """LLM prompt: system prompt, the user's rolling summary and a token-bounded window of recent turns"""
+        return conversation_memory.messages(user_id, self.system_prompt, user_input)
+
+    def _respond(self, user_input: str, user_id: Optional[str]) -> str:
         # Nine Pillars AI service detection
         if any(pillar in user_input.lower() for pillar in ["mcing", "djing", "graffiti", "breaking", "beatboxing", "knowledge", "fashion", "entrepreneurship", "language"]):
             return self._handle_nine_pillars_service(user_input)
         
         # Sales and lead detection
         elif any(keyword in user_input.lower() for keyword in ["lead", "client", "customer", "sale", "deal", "revenue", "money", "paid"]):
-            return self._handle_sales_opportunity(user_input)
+            remembered = conversation_memory.recall(user_id) if user_id else {}
+            return self._handle_sales_opportunity(user_input, remembered.get("budget"))
         elif "proposal" in user_input.lower():
             return self._generate_ai_proposal(user_input)
         elif "deploy" in user_input.lower():
             return "Deployment Protocol Initiated: checking Windsurf context... Ready to push AI services to production."
         elif "status" in user_input.lower():
-             return f"All systems operational. {len(self.active_leads)} Active Leads. {len(self.deals_closed)} Deals Closed. Revenue tracking: Online."
+             dashboard = self.get_sales_dashboard()
+             return f"All systems operational. {dashboard['active_leads']} Active Leads. {dashboard['deals_closed']} Deals Closed. Revenue tracking: Online."
         elif "scrap" in user_input.lower() or "target" in user_input.lower():
             return self._start_lead_scraping()
         
-        # Fallback to generic AI response (simulated)
+        # Fallback to generic AI response (simulated) - the LLM call goes here, prompted with build_messages()
         return f"LOA Heard: '{user_input}'. Ready to close deals with Nine Pillars AI services. Integration with Claude/Deepseek is pending API key configuration."
 
     def _handle_nine_pillars_service(self, input_text: str) -> str:
         """Handle Nine Pillars AI service inquiries"""
-        input_lower = input_text.lower()
-        
-        for pillar_key, pillar_data in NINE_PILLARS_SERVICES.items():
-            if pillar_key.replace("_", " ") in input_lower:
-                return f"{pillar_data['name']} - Available packages:\n" + "\n".join([
-                    f"Basic: ${pillar_data['basic']['price']:,} - {', '.join(pillar_data['basic']['features'])}",
-                    f"Standard: ${pillar_data['standard']['price']:,} - {', '.join(pillar_data['standard']['features'])}",
-                    f"Pro: ${pillar_data['pro']['price']:,} - {', '.join(pillar_data['pro']['features'])}"
-                ])
+        pillar_key = get_service_index().find_pillar(input_text)
+        if pillar_key is not None:
+            pillar_data = get_catalog().current.services[pillar_key]
+            return f"{pillar_data['name']} - Available packages:\n" + "\n".join([
+                f"Basic: ${pillar_data['basic']['price']:,} - {', '.join(pillar_data['basic']['features'])}",
+                f"Standard: ${pillar_data['standard']['price']:,} - {', '.join(pillar_data['standard']['features'])}",
+                f"Pro: ${pillar_data['pro']['price']:,} - {', '.join(pillar_data['pro']['features'])}"
+            ])
         
         return "I can help you with any of the Nine Pillars AI services. Which pillar interests you?"
     
-    def _handle_sales_opportunity(self, input_text: str) -> str:
+    def _handle_sales_opportunity(self, input_text: str, known_budget: Optional[int] = None) -> str:
         """Handle sales opportunities and lead qualification"""
-        # Extract potential value from input
-        if any(amount in input_text.lower() for amount in ["5000", "5k", "2000", "2k"]):
+        # Extract potential value from input (or a budget the user gave earlier in the conversation)
+        if any(amount in input_text.lower() for amount in ["5000", "5k", "2000", "2k"]) or (known_budget or 0) >= 2000:
             return "🚀 EXCELLENT! This meets our minimum target. Let's close this deal NOW!\n\nRecommended: AI Brand Transformation Package - $5,000\n✅ Custom GPT + AI Visual Design + Multilingual Communication\n✅ Setup in 24-48 hours\n✅ Event OS IP License included\n\nReady to send invoice and start immediately!"
         
         return "Let's qualify this lead. What's their budget and timeline? I can recommend the perfect Nine Pillars AI package."
@@ -226,31 +263,43 @@ class LOABrain:
             "user_id": user_id,
             "message": message,
             "response": response,
-            "type": "sales_inquiry" if any(keyword in message.lower() for keyword in ["lead", "sale", "deal", "money"]) else "general"
+            "type": "sales_inquiry" if any(keyword in message.lower() for keyword in ["lead", "sale", "deal", "money"]) else "general",
+            "intent": classify_intent(message)
         }
         
         # Save to local file for now
-        with open("loa_interactions.json", "a") as f:
-            f.write(json.dumps(log_entry) + "\n")
+        with open(INTERACTION_LOG_PATH, "ab") as f:
+            f.write(dumps(log_entry) + b"\n")
         
-        logger.info(f"Logged interaction: {user_id} - {message[:50]}...")
+        logger.debug("Logged interaction for %s (%d chars)", user_id, len(message))
     
+    def use_stores(self, lead_store=None, proposal_store=None):
+        """Count leads, deals and proposals from the SQLite stores every worker process shares"""
+        self.lead_store = lead_store
+        self.proposal_store = proposal_store
+
     def get_sales_dashboard(self) -> Dict:
         """Return current sales status"""
+        if self.lead_store is not None:
+            active_leads = self.lead_store.count(["hot_lead", "warm_lead", "nurture"])
+            deals_closed = self.lead_store.count(["closed"])
+        else:
+            active_leads, deals_closed = len(self.active_leads), len(self.deals_closed)
         return {
-            "active_leads": len(self.active_leads),
-            "proposals_sent": len(self.proposals_sent),
-            "deals_closed": len(self.deals_closed),
+            "active_leads": active_leads,
+            "proposals_sent": self.proposal_store.count() if self.proposal_store is not None else len(self.proposals_sent),
+            "deals_closed": deals_closed,
             "revenue_target": 5000,
             "current_revenue": sum([deal.get("value", 0) for deal in self.deals_closed]),
-            "services_available": len(NINE_PILLARS_SERVICES),
+            "services_available": len(get_catalog().current.services),
             "automation_status": "ACTIVE",
             "scraping_status": "RUNNING 24/7"
         }
     
+    @timed_scorer("brain_qualify_lead")
     async def qualify_lead_instantly(self, lead_info: Dict) -> Dict:
         """Qualify lead using AI analysis"""
-        logger.info(f"Qualifying lead: {lead_info.get('name', 'Unknown')}")
+        logger.info("Qualifying lead: %s", lead_info.get('name', 'Unknown'))
         
         # Simulate AI qualification logic
         qualification_score = 0
@@ -319,7 +368,7 @@ class LOABrain:
     
     async def generate_urgent_sales_pitch(self, business_type: str, budget: str) -> str:
         """Generate urgent sales pitch based on business type and budget"""
-        logger.info(f"Generating urgent pitch for {business_type} with budget {budget}")
+        logger.info("Generating urgent pitch for %s with budget %s", business_type, budget)
         
         # AI-powered pitch generation
         pitch_templates = {
@@ -389,7 +438,7 @@ Let's schedule a call to discuss your AI transformation roadmap.
     
     async def calculate_deal_probability(self, lead_info: Dict) -> Dict:
         """Calculate probability of closing deal"""
-        logger.info(f"Calculating deal probability for {lead_info.get('name', 'Unknown')}")
+        logger.info("Calculating deal probability for %s", lead_info.get('name', 'Unknown'))
         
         probability_score = 0
         factors = []
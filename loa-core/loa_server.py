@@ -0,0 +1,216 @@
+"""
+9LMNTS STUDIO - API Server
+Production launcher: N uvicorn workers on one listening socket, rolling reload and heartbeat-based restarts
+"""
+
+import os
+import sys
+import time
+import signal
+import socket
+import logging
+import argparse
+import multiprocessing
+from typing import Dict, Any, Optional
+from log_config import setup_logging
+from shared_state import get_shared_state
+
+# Configure logging
+setup_logging()
+logger = logging.getLogger("LOA_SERVER")
+
+LOA_WORKERS = int(os.getenv("LOA_WORKERS", str(os.cpu_count() or 1)))
+LOA_HOST = os.getenv("LOA_HOST", "0.0.0.0")
+LOA_PORT = int(os.getenv("LOA_PORT", "8000"))
+HEARTBEAT_TIMEOUT = float(os.getenv("WORKER_HEARTBEAT_TIMEOUT", "30"))  # no heartbeat for this long = hung
+STARTUP_GRACE = float(os.getenv("WORKER_STARTUP_GRACE", "60"))  # time allowed before the first heartbeat
+GRACEFUL_TIMEOUT = float(os.getenv("WORKER_GRACEFUL_TIMEOUT", "30"))  # drain time before SIGKILL
+MAX_RESTART_BACKOFF = 30.0
+SUPERVISOR_TICK = 1.0
+
+
+def run_worker(sock: socket.socket):
+    """Worker process entry point: serve loa_api on the inherited socket"""
+    import uvicorn
+    # log_config=None keeps uvicorn from replacing our logging setup - its loggers propagate to the queue handler
+    config = uvicorn.Config("loa_api:app", log_config=None, proxy_headers=True, timeout_graceful_shutdown=GRACEFUL_TIMEOUT)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class WorkerSupervisor:
+    """Pre-bind the port once, keep one uvicorn process per slot alive and healthy.
+
+    Workers are spawned (not forked) so each one imports loa_api fresh - that is what makes
+    SIGHUP a real code reload. Slots are stable: worker N always owns the per-slot webhook
+    and timer journals (see shared_state.worker_path), so a restarted worker replays them.
+    Running with fewer workers than before leaves the higher slots' journals unreplayed.
+    Admission buckets, metrics and execution pools are per process: rate limits apply per
+    worker, i.e. N times the configured rate overall.
+    """
+
+    def __init__(self, workers: int = LOA_WORKERS, host: str = LOA_HOST, port: int = LOA_PORT):
+        self.size = max(1, workers)
+        self.host = host
+        self.port = port
+        self.context = multiprocessing.get_context("spawn")
+        self.shared = get_shared_state()
+        self.slots: Dict[int, Dict[str, Any]] = {}
+        self.socket: Optional[socket.socket] = None
+        self._stopping = False
+        self._reload_requested = False
+
+    def bind(self) -> socket.socket:
+        family = socket.AF_INET6 if ":" in self.host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        self.socket = sock
+        return sock
+
+    def spawn(self, slot: int):
+        # The child reads its slot from the environment at import time (spawn copies os.environ)
+        os.environ["LOA_WORKER_SLOT"] = str(slot)
+        try:
+            process = self.context.Process(target=run_worker, args=(self.socket,), name=f"loa-worker-{slot}")
+            process.start()
+        finally:
+            os.environ.pop("LOA_WORKER_SLOT", None)
+        previous = self.slots.get(slot, {})
+        self.slots[slot] = {"process": process, "started": time.time(), "restarts": previous.get("restarts", 0),
+                            "backoff": previous.get("backoff", 1.0), "retry_at": None}
+        logger.info("🚀 Worker %d started (pid %d)", slot, process.pid)
+
+    def terminate(self, slot: int):
+        """SIGTERM (uvicorn drains in-flight requests), SIGKILL after the graceful timeout"""
+        process = self.slots[slot]["process"]
+        if process.is_alive():
+            process.terminate()
+            process.join(GRACEFUL_TIMEOUT)
+            if process.is_alive():
+                logger.warning("⚠️ Worker %d (pid %d) ignored SIGTERM - killing", slot, process.pid)
+                process.kill()
+                process.join()
+
+    def heartbeats(self) -> Dict[int, Dict[str, Any]]:
+        return {worker["slot"]: worker for worker in self.shared.workers()}
+
+    def unhealthy_reason(self, slot: int, beats: Dict[int, Dict[str, Any]]) -> Optional[str]:
+        state = self.slots[slot]
+        process = state["process"]
+        if not process.is_alive():
+            return f"exited with code {process.exitcode}"
+        now = time.time()
+        beat = beats.get(slot)
+        if beat is None or beat["pid"] != process.pid:
+            return "no heartbeat after startup" if now - state["started"] > STARTUP_GRACE else None
+        if now - beat["heartbeat_at"] > HEARTBEAT_TIMEOUT:
+            return f"heartbeat stale for {now - beat['heartbeat_at']:.0f}s"
+        return None
+
+    def check(self):
+        """Restart dead or hung workers, with exponential backoff for ones that crash on startup"""
+        beats = self.heartbeats()
+        now = time.time()
+        for slot in range(self.size):
+            state = self.slots[slot]
+            if state["retry_at"] is not None:
+                if now >= state["retry_at"]:
+                    self.spawn(slot)
+                continue
+            reason = self.unhealthy_reason(slot, beats)
+            if reason is None:
+                if now - state["started"] > STARTUP_GRACE:
+                    state["backoff"] = 1.0  # stayed up - forget earlier crashes
+                continue
+            logger.error("❌ Worker %d (pid %d) %s - restarting in %.0fs", slot, state["process"].pid, reason, state["backoff"])
+            self.terminate(slot)
+            state["restarts"] += 1
+            state["retry_at"] = now + state["backoff"]
+            state["backoff"] = min(state["backoff"] * 2, MAX_RESTART_BACKOFF)
+
+    def wait_healthy(self, slot: int, timeout: float = STARTUP_GRACE) -> bool:
+        deadline = time.time() + timeout
+        pid = self.slots[slot]["process"].pid
+        while time.time() < deadline and not self._stopping:
+            beat = self.heartbeats().get(slot)
+            if beat is not None and beat["pid"] == pid:
+                return True
+            if not self.slots[slot]["process"].is_alive():
+                return False
+            time.sleep(0.2)
+        return False
+
+    def reload(self):
+        """Rolling restart, one slot at a time - the other workers keep accepting on the shared socket"""
+        logger.info("🔄 Rolling reload of %d workers", self.size)
+        for slot in range(self.size):
+            if self._stopping:
+                return
+            self.terminate(slot)
+            self.spawn(slot)
+            if not self.wait_healthy(slot):
+                logger.error("❌ Worker %d did not become healthy - stopping the reload here", slot)
+                return
+        logger.info("✅ Reload complete")
+
+    def _on_stop(self, signum, frame):
+        self._stopping = True
+
+    def _on_reload(self, signum, frame):
+        self._reload_requested = True
+
+    def run(self):
+        self.bind()
+        self.shared.clear_workers()
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, self._on_reload)
+        logger.info("🌐 Supervisor pid %d serving http://%s:%d with %d workers (SIGHUP = reload)",
+                    os.getpid(), self.host, self.port, self.size)
+        for slot in range(self.size):
+            self.spawn(slot)
+        try:
+            while not self._stopping:
+                time.sleep(SUPERVISOR_TICK)
+                if self._reload_requested:
+                    self._reload_requested = False
+                    self.reload()
+                self.check()
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        logger.info("🛑 Stopping %d workers", len(self.slots))
+        for state in self.slots.values():
+            if state["process"].is_alive():
+                state["process"].terminate()
+        deadline = time.time() + GRACEFUL_TIMEOUT
+        for slot, state in self.slots.items():
+            state["process"].join(max(0.0, deadline - time.time()))
+            if state["process"].is_alive():
+                state["process"].kill()
+                state["process"].join()
+        if self.socket is not None:
+            self.socket.close()
+        self.shared.clear_workers()
+
+
+def main(argv=None) -> int:
+    """CLI: python loa_server.py [--workers N] [--host H] [--port P]"""
+    parser = argparse.ArgumentParser(description="Run the LOA API with multiple worker processes")
+    parser.add_argument("--workers", type=int, default=LOA_WORKERS)
+    parser.add_argument("--host", default=LOA_HOST)
+    parser.add_argument("--port", type=int, default=LOA_PORT)
+    args = parser.parse_args(argv)
+
+    # Every worker must see the same license registry - dbm files can't be shared between processes
+    os.environ.setdefault("LICENSE_REGISTRY_BACKEND", "shared")
+    WorkerSupervisor(args.workers, args.host, args.port).run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,27 +4,144 @@ Your persistent AI Chief of Staff accessible from anywhere
 """
 
 import os
+import hmac
+import time
 import logging
 import asyncio
-from typing import Final
+from concurrent.futures import ThreadPoolExecutor
+from typing import Final, Dict, Any, Optional
 
 # Import LOA Brain
 from loa_brain import LOABrain
+from log_config import setup_logging
 
-# Telegram Libraries (placeholder for structure, requires `pip install python-telegram-bot`)
-# from telegram import Update
-# from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
+# Telegram Libraries (requires `pip install python-telegram-bot`)
+try:
+    from telegram import Update
+    from telegram.ext import Application, BaseUpdateProcessor, CommandHandler, MessageHandler, filters
+    TELEGRAM_AVAILABLE = True
+except ImportError:
+    Update = None
+    BaseUpdateProcessor = object
+    TELEGRAM_AVAILABLE = False
 
 # Configure logging
-logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # Config
 TOKEN: Final = os.getenv('TELEGRAM_BOT_TOKEN', 'YOUR_BOT_TOKEN_HERE')
 BOT_USERNAME: Final = '@NineElementsLOA_Bot'
+TELEGRAM_MODE: Final = os.getenv('TELEGRAM_MODE', 'polling')  # polling, webhook
+WEBHOOK_URL: Final = os.getenv('TELEGRAM_WEBHOOK_URL', '')  # e.g. https://api.9lmntsstudio.com/webhook/telegram
+WEBHOOK_SECRET: Final = os.getenv('TELEGRAM_WEBHOOK_SECRET', '')
+
+# Concurrency and rate limiting
+MAX_CONCURRENT_UPDATES: Final = int(os.getenv('TELEGRAM_MAX_CONCURRENT_UPDATES', '256'))
+BRAIN_WORKERS: Final = int(os.getenv('TELEGRAM_BRAIN_WORKERS', '8'))
+CHAT_RATE_PER_SECOND: Final = float(os.getenv('TELEGRAM_CHAT_RATE', '1.0'))
+CHAT_BURST: Final = int(os.getenv('TELEGRAM_CHAT_BURST', '5'))
+
+
+class ChatRateLimiter:
+    """Token bucket per chat - refills at `rate` tokens/second up to `burst`"""
+
+    def __init__(self, rate: float = CHAT_RATE_PER_SECOND, burst: int = CHAT_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._buckets: Dict[int, list] = {}  # chat_id -> [tokens, last_refill, warned]
+
+    def allow(self, chat_id: int) -> bool:
+        now = time.monotonic()
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._buckets[chat_id] = [float(self.burst), now, False]
+        else:
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            bucket[2] = False
+            return True
+        return False
+
+    def should_warn(self, chat_id: int) -> bool:
+        """Only warn once per throttling episode so we don't spam the chat"""
+        bucket = self._buckets.get(chat_id)
+        if bucket is None or bucket[2]:
+            return False
+        bucket[2] = True
+        return True
+
+    def prune(self, idle_seconds: float = 600):
+        """Drop buckets for chats that have been quiet (they'd be full anyway)"""
+        cutoff = time.monotonic() - idle_seconds
+        for chat_id in [cid for cid, bucket in self._buckets.items() if bucket[1] < cutoff]:
+            del self._buckets[chat_id]
+
+
+class ChatSerializer:
+    """Runs work for the same chat strictly in arrival order, different chats in parallel"""
+
+    def __init__(self):
+        self._locks: Dict[int, asyncio.Lock] = {}
+        self._pending: Dict[int, int] = {}
+
+    async def run(self, chat_id: int, coroutine):
+        lock = self._locks.get(chat_id)
+        if lock is None:
+            lock = self._locks[chat_id] = asyncio.Lock()
+        self._pending[chat_id] = self._pending.get(chat_id, 0) + 1
+        try:
+            # asyncio.Lock wakes waiters FIFO, so updates keep their order per chat
+            async with lock:
+                await coroutine
+        finally:
+            self._pending[chat_id] -= 1
+            if not self._pending[chat_id]:
+                del self._pending[chat_id]
+                del self._locks[chat_id]
+
+    @property
+    def active_chats(self) -> int:
+        return len(self._locks)
+
+
+class PerChatUpdateProcessor(BaseUpdateProcessor):
+    """PTB update processor: concurrent across chats, ordered and rate-limited per chat"""
+
+    def __init__(self, max_concurrent_updates: int = MAX_CONCURRENT_UPDATES):
+        super().__init__(max_concurrent_updates)
+        self.serializer = ChatSerializer()
+        self.rate_limiter = ChatRateLimiter()
+        self._processed = 0
+
+    async def do_process_update(self, update, coroutine):
+        chat = getattr(update, "effective_chat", None)
+        if chat is None:
+            await coroutine
+            return
+
+        if not self.rate_limiter.allow(chat.id):
+            coroutine.close()
+            logger.debug("Rate limited chat %s", chat.id)  # per message under a flood - rate-limited at DEBUG
+            if self.rate_limiter.should_warn(chat.id) and update.effective_message:
+                await update.effective_message.reply_text("⏳ Easy - I'm still working on your last messages. Give me a second.")
+            return
+
+        await self.serializer.run(chat.id, coroutine)
+
+        self._processed += 1
+        if self._processed % 1000 == 0:
+            self.rate_limiter.prune()
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
 
-# Initialize Brain
-brain = LOABrain()
 
 async def start_command(update, context):
     await update.message.reply_text('Yo! LOA System Online. I am your 9LMNTS Chief of Staff. What needs to get done?')
@@ -37,32 +154,107 @@ async def help_command(update, context):
     Just chat with me to manage leads or tasks.
     """)
 
-async def handle_message(update, context):
-    message_type = update.message.chat.type
-    text = update.message.text
-    
-    logger.info(f'User ({update.message.chat.id}) in {message_type}: "{text}"')
-    
-    # Process with LOA Brain
-    response = brain.think(text)
-    
-    logger.info(f'LOA says: "{response}"')
-    await update.message.reply_text(response)
-
 async def error(update, context):
-    logger.error(f'Update {update} caused error {context.error}')
+    logger.error("Update %s caused error %s", update, context.error)
+
+
+class TelegramBotRunner:
+    """Runs the LOA bot in long-polling mode or behind the API's /webhook/telegram route"""
+
+    def __init__(self, brain: Optional[LOABrain] = None):
+        self.brain = brain or LOABrain()
+        self.executor = ThreadPoolExecutor(max_workers=BRAIN_WORKERS, thread_name_prefix="loa-brain")
+        self.application = None
+
+    async def handle_message(self, update, context):
+        message_type = update.message.chat.type
+        text = update.message.text
+
+        logger.debug("Message from chat %s (%s): %d chars", update.message.chat.id, message_type, len(text or ""))
+
+        # brain.think is synchronous - keep it off the event loop so other chats keep flowing
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(self.executor, self.brain.think, text, None, f"telegram:{update.message.chat.id}")
+
+        logger.debug("Reply to chat %s: %d chars", update.message.chat.id, len(response))
+        await update.message.reply_text(response)
+
+    def build_application(self, with_updater: bool = True):
+        """Build the PTB application with the per-chat update processor"""
+        if not TELEGRAM_AVAILABLE:
+            raise RuntimeError("python-telegram-bot is not installed")
+
+        builder = Application.builder().token(TOKEN).concurrent_updates(PerChatUpdateProcessor())
+        if not with_updater:
+            builder = builder.updater(None)
+        app = builder.build()
+
+        app.add_handler(CommandHandler('start', start_command))
+        app.add_handler(CommandHandler('help', help_command))
+        app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_message))
+        app.add_error_handler(error)
+        return app
+
+    def run_polling(self, poll_interval: float = 0.0):
+        """Blocking long-polling loop (standalone bot process)"""
+        self.application = self.build_application()
+        logger.info('Polling...')
+        try:
+            self.application.run_polling(poll_interval=poll_interval, allowed_updates=Update.ALL_TYPES)
+        finally:
+            self.executor.shutdown(wait=False)
+
+    async def start_webhook(self) -> bool:
+        """Start processing updates pushed to /webhook/telegram; registers the webhook if a URL is configured"""
+        if not TELEGRAM_AVAILABLE:
+            logger.warning("python-telegram-bot not installed - Telegram webhook disabled")
+            return False
+
+        self.application = self.build_application(with_updater=False)
+        await self.application.initialize()
+        await self.application.start()
+
+        if WEBHOOK_URL:
+            await self.application.bot.set_webhook(
+                url=WEBHOOK_URL,
+                secret_token=WEBHOOK_SECRET or None,
+                allowed_updates=Update.ALL_TYPES
+            )
+            logger.info("✅ Telegram webhook registered: %s", WEBHOOK_URL)
+        return True
+
+    def verify_webhook_secret(self, header_token: Optional[str]) -> bool:
+        """Check X-Telegram-Bot-Api-Secret-Token against TELEGRAM_WEBHOOK_SECRET"""
+        if not WEBHOOK_SECRET:
+            return True
+        return hmac.compare_digest(header_token or "", WEBHOOK_SECRET)
+
+    @property
+    def webhook_active(self) -> bool:
+        return self.application is not None and self.application.running
+
+    async def process_webhook_update(self, payload: Dict[str, Any]):
+        """Queue a raw webhook update - returns immediately, processing happens in the background"""
+        if not self.webhook_active:
+            raise RuntimeError("Telegram webhook mode not enabled (set TELEGRAM_MODE=webhook)")
+        update = Update.de_json(payload, self.application.bot)
+        await self.application.update_queue.put(update)
+
+    async def stop(self):
+        if self.application is not None and self.application.running:
+            await self.application.stop()
+            await self.application.shutdown()
+        self.executor.shutdown(wait=False)
+
 
 if __name__ == '__main__':
     print('Starting LOA Telegram Bot...')
-    
-    # This is where the actual bot polling would happen.
-    # Commented out to prevent errors until dependencies are installed.
-    # app = Application.builder().token(TOKEN).build()
-    # app.add_handler(CommandHandler('start', start_command))
-    # app.add_handler(CommandHandler('help', help_command))
-    # app.add_handler(MessageHandler(filters.TEXT, handle_message))
-    # app.add_error_handler(error)
-    # print('Polling...')
-    # app.run_polling(poll_interval=3)
-    
-    print("Bot Module Loaded. Configure TELEGRAM_BOT_TOKEN in .env and uncomment polling loop to run.")
+
+    if not TELEGRAM_AVAILABLE:
+        print("python-telegram-bot is not installed. Run `pip install -r requirements.txt` first.")
+    elif TOKEN == 'YOUR_BOT_TOKEN_HERE':
+        print("Configure TELEGRAM_BOT_TOKEN in .env to run the bot.")
+    elif TELEGRAM_MODE == 'webhook':
+        print("Webhook mode is served by the API: run `python loa_api.py` with TELEGRAM_MODE=webhook.")
+    else:
+        TelegramBotRunner().run_polling()
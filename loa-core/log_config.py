@@ -0,0 +1,187 @@
+"""
+9LMNTS STUDIO - Logging
+Central logging setup: structured JSON output through a non-blocking queue, per-logger levels and rate-limited hot paths
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import queue
+import random
+import logging
+import threading
+import logging.handlers
+from typing import Dict, Any, Optional, Tuple
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # text | json
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")  # "LOA_API=WARNING,TRACING=DEBUG"
+LOG_FILE = os.getenv("LOG_FILE", "")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_RATE_LIMIT = float(os.getenv("LOG_RATE_LIMIT", "20"))  # INFO/DEBUG records per second per call site
+LOG_RATE_BURST = int(os.getenv("LOG_RATE_BURST", "100"))
+
+# Attributes every LogRecord has - anything else came in via extra= and goes into the JSON
+_RECORD_FIELDS = frozenset(vars(logging.makeLogRecord({})).keys()) | {"message", "asctime"}
+
+_setup_lock = threading.Lock()
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional["NonBlockingQueueHandler"] = None
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, extras and the active trace id"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Plain text lines; a rate-limited call site notes how many records it dropped since the last one"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        return f"{text} [suppressed={suppressed}]" if suppressed else text
+
+
+class TraceContextFilter(logging.Filter):
+    """Stamp records with the current trace/span id so logs and spans can be joined"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        tracing = sys.modules.get("tracing")  # only if tracing is in use - never imported from here
+        span = tracing.current_span() if tracing is not None else None
+        if span is not None:
+            record.trace_id = span.trace_id
+            record.span_id = span.span_id
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket per call site (file + line) for INFO and below.
+
+    Warnings and errors always pass. A suppressed burst is reported on the next record
+    that gets through as suppressed=<count>, so nothing disappears silently.
+    """
+
+    def __init__(self, rate: float = LOG_RATE_LIMIT, burst: int = LOG_RATE_BURST):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self._buckets: Dict[Tuple[str, int], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.rate <= 0:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.burst), now, 0]
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if tokens < 1:
+                bucket[0] = tokens
+                bucket[2] += 1
+                return False
+            bucket[0] = tokens - 1
+            suppressed, bucket[2] = bucket[2], 0
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the listener thread without formatting them or blocking when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stock QueueHandler formats here, on the caller's thread; formatting
+        # (getMessage, JSON, tracebacks) is deferred to the listener instead
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_levels(spec: str) -> Dict[str, int]:
+    """"LOA_API=WARNING,TRACING=DEBUG" -> {logger name: level}"""
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.strip().partition("=")
+        if name and level:
+            levels[name.strip()] = logging.getLevelName(level.strip().upper())
+    return levels
+
+
+def setup_logging(level: Optional[str] = None, fmt: Optional[str] = None, levels: Optional[Dict[str, Any]] = None):
+    """Install the queue-based root handler once per process (later calls only update levels)"""
+    global _listener, _queue_handler
+    with _setup_lock:
+        root = logging.getLogger()
+        if level or _listener is None:
+            root.setLevel((level or LOG_LEVEL).upper())
+        for name, logger_level in {**parse_levels(LOG_LEVELS), **(levels or {})}.items():
+            logging.getLogger(name).setLevel(logger_level)
+        if _listener is not None:
+            return
+
+        formatter = JSONFormatter() if (fmt or LOG_FORMAT) == "json" else TextFormatter(
+            "%(asctime)s %(levelname)s:%(name)s:%(message)s")
+        outputs = [logging.StreamHandler()]
+        if LOG_FILE:
+            outputs.append(logging.handlers.WatchedFileHandler(LOG_FILE, encoding="utf-8"))
+        for handler in outputs:
+            handler.setFormatter(formatter)
+
+        _queue_handler = NonBlockingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+        _queue_handler.addFilter(RateLimitFilter())
+        _queue_handler.addFilter(TraceContextFilter())
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)  # replace any basicConfig handler installed before us
+        root.addHandler(_queue_handler)
+        _listener = logging.handlers.QueueListener(_queue_handler.queue, *outputs, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread (also runs at interpreter exit)"""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def sampled(rate: float) -> bool:
+    """Guard for very hot events: `if sampled(0.01): logger.debug(...)` logs ~1% of them"""
+    return rate >= 1.0 or random.random() < rate
+
+
+def get_stats() -> Dict[str, int]:
+    return {
+        "queued": _queue_handler.queue.qsize() if _queue_handler else 0,
+        "dropped": _queue_handler.dropped if _queue_handler else 0
+    }
@@ -0,0 +1,300 @@
+"""
+9LMNTS STUDIO - Metrics
+In-process counters, gauges and histograms with Prometheus text exposition, plus instrumentation decorators
+"""
+
+import time
+import bisect
+import inspect
+import logging
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Tuple, Callable, Sequence
+from log_config import setup_logging
+
+# Configure logging
+setup_logging()
+logger = logging.getLogger("METRICS")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SCORER_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1)
+LLM_BUCKETS = (0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0)
+
+# Pillar label for LLM calls made while generating a pillar deliverable
+current_pillar: contextvars.ContextVar[str] = contextvars.ContextVar("current_pillar", default="none")
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    """One metric family; children are keyed by label values"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple, Any] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_child(key, value))
+        return lines
+
+    def _render_child(self, key: Tuple, value: Any) -> List[str]:
+        return [f"{self.name}{_label_text(self.label_names, key)} {value}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1  # per-bucket counts; made cumulative at render time
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self, **labels) -> Dict[str, float]:
+        state = self._values.get(self._key(labels))
+        if state is None:
+            return {"count": 0, "sum": 0.0}
+        return {"count": state[2], "sum": state[1]}
+
+    def _render_child(self, key: Tuple, state: List) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), state[0]):
+            cumulative += count
+            le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+            lines.append(f"{self.name}_bucket{_label_text(self.label_names, key, le)} {cumulative}")
+        lines.append(f"{self.name}_sum{_label_text(self.label_names, key)} {state[1]}")
+        lines.append(f"{self.name}_count{_label_text(self.label_names, key)} {state[2]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metric families plus collectors that refresh gauges at scrape time"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labels, buckets))
+
+    def add_collector(self, collector: Callable[[], None]):
+        """collector() runs before each scrape - use it to copy queue depths / cache stats into gauges"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.error("❌ Metrics collector failed: %s", e)
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+http_request_duration = metrics.histogram(
+    "loa_http_request_duration_seconds", "API request latency by route", ("method", "route", "status"))
+llm_call_duration = metrics.histogram(
+    "loa_llm_call_duration_seconds", "LLM call latency", ("provider", "pillar", "status"), LLM_BUCKETS)
+llm_tokens = metrics.counter("loa_llm_tokens_total", "LLM tokens used", ("provider", "pillar"))
+integration_call_duration = metrics.histogram(
+    "loa_integration_call_duration_seconds", "Integration method latency", ("integration", "operation"))
+integration_errors = metrics.counter(
+    "loa_integration_errors_total", "Integration calls that raised or returned an error status", ("integration", "operation"))
+queue_depth = metrics.gauge("loa_queue_depth", "Items waiting in internal queues", ("queue",))
+log_records_dropped = metrics.gauge("loa_log_records_dropped", "Log records dropped because the log queue was full")
+cache_requests = metrics.gauge("loa_cache_requests", "Cache lookups by result (cumulative)", ("cache", "result"))
+cache_hit_ratio = metrics.gauge("loa_cache_hit_ratio", "Cache hit ratio since start", ("cache",))
+executor_in_flight = metrics.gauge("loa_executor_in_flight", "Calls submitted to an execution pool and not finished", ("pool",))
+executor_saturation = metrics.gauge("loa_executor_saturation", "In-flight calls per pool worker (>1 means calls are queueing)", ("pool",))
+executor_duration = metrics.histogram(
+    "loa_executor_call_duration_seconds", "Queue wait plus run time of offloaded calls", ("pool",))
+loop_lag = metrics.histogram(
+    "loa_event_loop_lag_seconds", "How late the event loop woke up from a timed sleep", (), SCORER_BUCKETS + (0.25, 0.5, 1.0, 5.0))
+loop_stalls = metrics.counter("loa_event_loop_stalls_total", "Event loop stalls longer than LOOP_STALL_THRESHOLD")
+admission_rejected = metrics.counter(
+    "loa_admission_rejected_total", "Requests refused by admission control", ("lane", "reason"))
+admission_wait = metrics.histogram(
+    "loa_admission_wait_seconds", "Time admitted requests waited for a concurrency slot", ("lane",), SCORER_BUCKETS + (0.25, 0.5, 1.0, 2.5))
+admission_active = metrics.gauge("loa_admission_active", "Requests currently holding an admission slot")
+scorer_duration = metrics.histogram(
+    "loa_scorer_duration_seconds", "Lead/site scoring time", ("scorer",), SCORER_BUCKETS)
+
+
+def _is_error(result: Any) -> bool:
+    """Integrations report failures as {"status": "error", ...} rather than raising"""
+    return isinstance(result, dict) and result.get("status") == "error"
+
+
+def _wrap(func: Callable, before: Callable[[], Any], after: Callable[[Any, float, Any, bool], None]) -> Callable:
+    """Time func (sync or async); after(state, seconds, result, failed) records the outcome"""
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            state = before()
+            started = time.perf_counter()
+            try:
+                result = await func(*args, **kwargs)
+            except BaseException:
+                after(state, time.perf_counter() - started, None, True)
+                raise
+            after(state, time.perf_counter() - started, result, _is_error(result))
+            return result
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        state = before()
+        started = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException:
+            after(state, time.perf_counter() - started, None, True)
+            raise
+        after(state, time.perf_counter() - started, result, _is_error(result))
+        return result
+    return wrapper
+
+
+def instrument(integration: str, operation: Optional[str] = None, pillar: Optional[str] = None) -> Callable:
+    """Decorator: latency + error count for an integration method (sets the LLM pillar label if given)"""
+    def decorator(func: Callable) -> Callable:
+        name = operation or func.__name__.lstrip("_")
+
+        def before():
+            return current_pillar.set(pillar) if pillar else None
+
+        def after(token, seconds: float, result: Any, failed: bool):
+            integration_call_duration.observe(seconds, integration=integration, operation=name)
+            if failed:
+                integration_errors.inc(integration=integration, operation=name)
+            if token is not None:
+                current_pillar.reset(token)
+
+        return _wrap(func, before, after)
+    return decorator
+
+
+def instrument_class(integration: str, exclude: Sequence[str] = ()) -> Callable:
+    """Class decorator: instrument every method defined on the class (not inherited, not dunder)"""
+    def decorator(cls):
+        for name, member in list(vars(cls).items()):
+            if name.startswith("__") or name in exclude or not inspect.isfunction(member):
+                continue
+            setattr(cls, name, instrument(integration)(member))
+        return cls
+    return decorator
+
+
+def instrument_llm(provider: str) -> Callable:
+    """Decorator for provider calls returning {"status", "tokens_used", ...}: latency and tokens per pillar"""
+    def decorator(func: Callable) -> Callable:
+        def after(_, seconds: float, result: Any, failed: bool):
+            pillar = current_pillar.get()
+            llm_call_duration.observe(seconds, provider=provider, pillar=pillar, status="error" if failed else "success")
+            if isinstance(result, dict) and result.get("tokens_used"):
+                llm_tokens.inc(result["tokens_used"], provider=provider, pillar=pillar)
+
+        return _wrap(func, lambda: None, after)
+    return decorator
+
+
+def timed_scorer(scorer: str) -> Callable:
+    """Decorator: scoring time histogram (sync or async)"""
+    def decorator(func: Callable) -> Callable:
+        return _wrap(func, lambda: None, lambda _, seconds, result, failed: scorer_duration.observe(seconds, scorer=scorer))
+    return decorator
+
+
+def record_cache(cache: str, hits: int, misses: int):
+    """Copy a component's cumulative hit/miss counters into the cache gauges (for collectors)"""
+    cache_requests.set(hits, cache=cache, result="hit")
+    cache_requests.set(misses, cache=cache, result="miss")
+    total = hits + misses
+    cache_hit_ratio.set(round(hits / total, 4) if total else 0.0, cache=cache)
@@ -7,14 +7,25 @@ import asyncio
 import json
 import logging
 from typing import Dict, Any, List, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
+import os
 import requests
-from loa_brain import LOABrain, NINE_PILLARS_SERVICES, QUICK_SALES_PACKAGES
+from loa_brain import LOABrain
+from service_catalog import get_catalog
+from metrics import instrument_class
+from tracing import traced_class, trace_headers
+from execution import execution, BLOCKING
+from log_config import setup_logging
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+setup_logging()
 logger = logging.getLogger("N8N_MCP_SERVER")
 
+# n8n calls use blocking `requests` - a dedicated pool keeps them off the loop and away from other I/O
+execution.add_pool("n8n", BLOCKING, int(os.getenv("N8N_WORKERS", "4")))
+
+@instrument_class("n8n")
+@traced_class("n8n")
 class N8nMCPServer:
     def __init__(self):
         self.loa_brain = LOABrain()
@@ -27,7 +38,7 @@ class N8nMCPServer:
         workflow_type = workflow_data.get("workflow_type", "")
         trigger_data = workflow_data.get("data", {})
         
-        logger.info(f"🔄 N8n Workflow Triggered: {workflow_type}")
+        logger.info("🔄 N8n Workflow Triggered: %s", workflow_type)
         
         if workflow_type == "lead_qualification":
             return await self._handle_lead_qualification(trigger_data)
@@ -120,7 +131,7 @@ class N8nMCPServer:
         delivery_details = delivery_data.get("delivery_details", {})
         
         # Get service configuration
-        service_config = NINE_PILLARS_SERVICES.get(service_type.replace("_element", "_element"))
+        service_config = get_catalog().current.services.get(service_type)
         if not service_config:
             return {"error": f"Unknown service: {service_type}"}
         
@@ -241,12 +252,14 @@ class N8nMCPServer:
     async def _send_to_n8n(self, data: Dict) -> Dict:
         """Send data to N8n webhook"""
         try:
-            headers = {
+            headers = trace_headers({
                 "Authorization": f"Bearer {self.auth_token}",
                 "Content-Type": "application/json"
-            }
+            })
             
-            response = requests.post(
+            response = await execution.run_in(
+                "n8n",
+                requests.post,
                 self.n8n_webhook_url,
                 json=data,
                 headers=headers,
@@ -254,22 +267,20 @@ class N8nMCPServer:
             )
             
             if response.status_code == 200:
-                logger.info(f"✅ Successfully sent to N8n: {data.get('action', 'unknown')}")
+                logger.info("✅ Successfully sent to N8n: %s", data.get('action', 'unknown'))
                 return {"status": "success", "n8n_response": response.json()}
             else:
-                logger.error(f"❌ Failed to send to N8n: {response.status_code}")
+                logger.error("❌ Failed to send to N8n: %s", response.status_code)
                 return {"status": "error", "error": response.text}
                 
         except Exception as e:
-            logger.error(f"❌ Error sending to N8n: {e}")
+            logger.error("❌ Error sending to N8n: %s", e)
             return {"status": "error", "error": str(e)}
 
 # MCP Server Setup
 async def main():
     """Start N8n MCP server"""
-    print("🚀 9LMNTS N8n MCP Server - STARTING")
-    print("📡 Connecting Loa Brain to N8n workflows")
-    print("🎯 Enabling advanced automation for Nine Pillars AI services")
+    logger.info("🚀 9LMNTS N8n MCP Server - STARTING")
     
     server = N8nMCPServer()
     
@@ -293,31 +304,9 @@ async def main():
     # Process workflow
     result = await server.handle_n8n_trigger(test_workflow)
     
-    print(f"✅ Workflow Result: {result['status']}")
-    print(f"🎯 N8n Integration: {result.get('n8n_workflow_triggered', False)}")
-    print(f"📊 Ready for advanced workflow automation")
-    
-    print("\n🌐 N8n MCP Server Configuration:")
-    print(f"   Webhook URL: {server.n8n_webhook_url}")
-    print(f"   Auth Token: {server.auth_token[:20]}...")
-    print(f"   Loa Brain: Connected")
-    print(f"   Services: {len(NINE_PILLARS_SERVICES)} available")
-    
-    print("\n🚀 READY FOR:")
-    print("   • Lead qualification automation")
-    print("   • AI proposal generation")
-    print("   • Service delivery workflows")
-    print("   • Client onboarding sequences")
-    print("   • Sales campaign management")
-    print("   • Event OS license generation")
-    
-    print("\n💡 N8n Workflows Enabled:")
-    print("   • lead_qualification → Loa Brain qualification → N8n proposal generation")
-    print("   • service_delivery → Automated AI setup → Client training")
-    print("   • sales_campaign → 24/7 lead generation → Multi-channel outreach")
-    print("   • client_onboarding → Welcome sequence → Portal setup")
-    
-    print("\n🎉 Nine Pillars AI + N8n = COMPLETE AUTOMATION EMPIRE!")
+    logger.info("✅ Workflow Result: %s (n8n triggered: %s)", result["status"], result.get("n8n_workflow_triggered", False))
+    logger.info("🌐 Webhook URL: %s | Services: %d available", server.n8n_webhook_url, len(get_catalog().current.services))
+    logger.debug("Workflows enabled: lead_qualification, proposal_generation, service_delivery, client_onboarding, sales_campaign")
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -12,6 +12,10 @@ from typing import Dict, Any, List, Optional
 import requests
 from loa_brain import LOABrain
 from dotenv import load_dotenv
+from metrics import instrument_class
+from tracing import traced_class, trace_headers
+from execution import execution, BLOCKING
+from log_config import setup_logging
 
 # Load environment variables from absolute path
 import pathlib
@@ -19,9 +23,14 @@ project_root = pathlib.Path(__file__).parent.parent
 load_dotenv(dotenv_path=project_root / '.env')
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+setup_logging()
 logger = logging.getLogger("NOTION_INTEGRATION")
 
+# Notion calls use blocking `requests` - a dedicated pool keeps them off the loop and away from other I/O
+execution.add_pool("notion", BLOCKING, int(os.getenv("NOTION_WORKERS", "4")))
+
+@instrument_class("notion")
+@traced_class("notion")
 class NotionIntegration:
     def __init__(self):
         self.api_key = os.getenv("NOTION_API_KEY", "your_notion_integration_token_here")
@@ -102,7 +111,7 @@ class NotionIntegration:
         }
         
         try:
-            response = requests.post(
+            response = await execution.run_in("notion", requests.post,
                 f"{self.base_url}/databases",
                 json=database_schema,
                 headers=self.headers
@@ -110,18 +119,18 @@ class NotionIntegration:
             
             if response.status_code == 200:
                 database = response.json()
-                logger.info(f"✅ Created Notion database: {database['id']}")
+                logger.info("✅ Created Notion database: %s", database['id'])
                 return {
                     "status": "database_created",
                     "database_id": database["id"],
                     "database_url": database["url"]
                 }
             else:
-                logger.error(f"❌ Failed to create database: {response.text}")
+                logger.error("❌ Failed to create database: %s", response.text)
                 return {"status": "error", "error": response.text}
                 
         except Exception as e:
-            logger.error(f"❌ Error creating database: {e}")
+            logger.error("❌ Error creating database: %s", e)
             return {"status": "error", "error": str(e)}
     
     async def add_lead_to_notion(self, lead_info: Dict) -> Dict:
@@ -144,21 +153,21 @@ class NotionIntegration:
                 }
             }
             
-            response = requests.post(
+            response = await execution.run_in("notion", requests.post,
                 f"{self.base_url}/pages",
                 json=page_data,
                 headers=self.headers
             )
             
             if response.status_code == 200:
-                logger.info(f"✅ Lead added successfully: {lead_info.get('name', 'Unknown')}")
+                logger.info("✅ Lead added successfully: %s", lead_info.get('name', 'Unknown'))
                 return {"status": "success", "lead": lead_info.get("name", "Unknown")}
             else:
-                logger.error(f"❌ Failed to add lead: {response.text}")
+                logger.error("❌ Failed to add lead: %s", response.text)
                 return {"status": "error", "error": response.text}
                 
         except Exception as e:
-            logger.error(f"❌ Error adding lead: {e}")
+            logger.error("❌ Error adding lead: %s", e)
             return {"status": "error", "error": str(e)}
     
     async def _trigger_crewai_workflow(self, lead_info: Dict, qualification: Dict):
@@ -176,19 +185,19 @@ class NotionIntegration:
         crewai_webhook = "https://your-crewai-webhook-url"
         
         try:
-            response = requests.post(
+            response = await execution.run_in(BLOCKING, requests.post,
                 crewai_webhook,
                 json=workflow_data,
-                headers={"Content-Type": "application/json"}
+                headers=trace_headers({"Content-Type": "application/json"})
             )
             
             if response.status_code == 200:
-                logger.info(f"🚀 Triggered CrewAI workflow for hot lead: {lead_info.get('name')}")
+                logger.info("🚀 Triggered CrewAI workflow for hot lead: %s", lead_info.get('name'))
             else:
-                logger.error(f"❌ Failed to trigger CrewAI: {response.text}")
+                logger.error("❌ Failed to trigger CrewAI: %s", response.text)
                 
         except Exception as e:
-            logger.error(f"❌ Error triggering CrewAI: {e}")
+            logger.error("❌ Error triggering CrewAI: %s", e)
     
     async def create_proposal_page(self, proposal_data: Dict) -> Dict:
         """Create proposal page in Notion"""
@@ -207,7 +216,7 @@ class NotionIntegration:
         }
         
         try:
-            response = requests.post(
+            response = await execution.run_in("notion", requests.post,
                 f"{self.base_url}/pages",
                 json=page_data,
                 headers=self.headers
@@ -215,18 +224,18 @@ class NotionIntegration:
             
             if response.status_code == 200:
                 page = response.json()
-                logger.info(f"✅ Created proposal page: {proposal_data.get('client_name')}")
+                logger.info("✅ Created proposal page: %s", proposal_data.get('client_name'))
                 return {
                     "status": "proposal_created",
                     "page_id": page["id"],
                     "page_url": page["url"]
                 }
             else:
-                logger.error(f"❌ Failed to create proposal: {response.text}")
+                logger.error("❌ Failed to create proposal: %s", response.text)
                 return {"status": "error", "error": response.text}
                 
         except Exception as e:
-            logger.error(f"❌ Error creating proposal: {e}")
+            logger.error("❌ Error creating proposal: %s", e)
             return {"status": "error", "error": str(e)}
     
     async def update_lead_status(self, page_id: str, status: str, notes: str = "") -> Dict:
@@ -245,21 +254,21 @@ class NotionIntegration:
             }
         
         try:
-            response = requests.patch(
+            response = await execution.run_in("notion", requests.patch,
                 f"{self.base_url}/pages/{page_id}",
                 json=update_data,
                 headers=self.headers
             )
             
             if response.status_code == 200:
-                logger.info(f"✅ Updated lead status: {status}")
+                logger.info("✅ Updated lead status: %s", status)
                 return {"status": "updated", "new_status": status}
             else:
-                logger.error(f"❌ Failed to update status: {response.text}")
+                logger.error("❌ Failed to update status: %s", response.text)
                 return {"status": "error", "error": response.text}
                 
         except Exception as e:
-            logger.error(f" Error updating status: {e}")
+            logger.error(" Error updating status: %s", e)
             return {"status": "error", "error": str(e)}
     
     async def get_sales_dashboard_data(self) -> Dict:
@@ -274,7 +283,7 @@ class NotionIntegration:
                 }
             }
             
-            response = requests.post(
+            response = await execution.run_in("notion", requests.post,
                 f"{self.base_url}/databases/{self.database_id}/query",
                 json=query_data,
                 headers=self.headers
@@ -304,11 +313,11 @@ class NotionIntegration:
                     "raw_leads": leads[:3]  # Return first 3 leads for debugging
                 }
             else:
-                logger.error(f" Failed to query database: {response.text}")
+                logger.error(" Failed to query database: %s", response.text)
                 return {"status": "error", "error": response.text}
                 
         except Exception as e:
-            logger.error(f" Error getting dashboard data: {e}")
+            logger.error(" Error getting dashboard data: %s", e)
             return {"status": "error", "error": str(e)}
 
 # Initialize Notion integration
@@ -0,0 +1,225 @@
+"""
+9LMNTS STUDIO - Profiler
+Opt-in statistical sampling profiler for the running API, emitting flamegraph-compatible collapsed stacks
+"""
+
+import os
+import sys
+import hmac
+import json
+import time
+import uuid
+import asyncio
+import logging
+import argparse
+import threading
+import contextvars
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Iterable
+from shared_state import SharedMapping, get_shared_state, WORKER_SLOT
+from log_config import setup_logging
+
+# Configure logging
+setup_logging()
+logger = logging.getLogger("PROFILER")
+
+PROFILER_TOKEN = os.getenv("PROFILER_TOKEN", "")  # unset = profiling disabled, nothing is installed
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))  # seconds between samples
+PROFILE_REQUEST_INTERVAL = float(os.getenv("PROFILE_REQUEST_INTERVAL", "0.001"))  # finer - one request is short
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))  # per-request profiles kept for download
+PROFILE_HEADER = "x-profile"
+TOKEN_HEADER = "x-profiler-token"
+
+
+class SamplingProfiler:
+    """Samples thread stacks from a background thread and counts them in collapsed form.
+
+    The profiled code is never instrumented - every `interval` the sampler reads
+    sys._current_frames() and folds each stack into "root;caller;leaf", so cost is
+    proportional to the sample rate, not to how much Python the request runs.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL, thread_ids: Optional[Iterable[int]] = None):
+        self.interval = interval
+        self.thread_ids = set(thread_ids) if thread_ids is not None else None  # None = every thread
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.duration = 0.0
+        self._labels: Dict[Any, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            name = getattr(code, "co_qualname", code.co_name)
+            label = self._labels[code] = f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def sample(self):
+        """Take one sample of every watched thread"""
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own or (self.thread_ids is not None and ident not in self.thread_ids):
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(self._label(frame.f_code))
+                frame = frame.f_back
+            labels.append(names.get(ident, f"thread-{ident}"))
+            labels.reverse()
+            self.stacks[";".join(labels)] += 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self) -> "SamplingProfiler":
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="loa-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> "SamplingProfiler":
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.started_at is not None:
+            self.duration = time.perf_counter() - self.started_at
+        return self
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's folded format: one "frame;frame;frame count" line per unique stack"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self) -> Dict[str, Any]:
+        return {"samples": self.samples, "stacks": len(self.stacks), "duration": round(self.duration, 3),
+                "interval": self.interval}
+
+
+class ProfileStore:
+    """Most recent per-request profiles, downloadable by id from any worker.
+
+    Profiles live in the shared SQLite state; each worker keeps its own `keep` newest.
+    """
+
+    def __init__(self, keep: int = PROFILE_KEEP):
+        self.keep = keep
+        self._ids: "OrderedDict[str, None]" = OrderedDict()  # this worker's profiles, oldest first
+        self._store: Optional[SharedMapping] = None  # opened on first use - disabled profiling touches no state
+        self._lock = threading.Lock()
+
+    @property
+    def store(self) -> SharedMapping:
+        if self._store is None:
+            self._store = SharedMapping(get_shared_state(), "profiles")
+        return self._store
+
+    def add(self, label: str, profile: SamplingProfiler) -> str:
+        profile_id = uuid.uuid4().hex[:16]
+        entry = {"label": label, "worker": WORKER_SLOT, "created_at": time.time(), "collapsed": profile.collapsed(),
+                 **profile.summary()}
+        with self._lock:
+            self.store[profile_id] = json.dumps(entry)
+            self._ids[profile_id] = None
+            while len(self._ids) > self.keep:
+                self.store.pop(self._ids.popitem(last=False)[0])
+        return profile_id
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        raw = self.store.get(profile_id)
+        return json.loads(raw) if raw else None
+
+    def list(self):
+        entries = [(key, json.loads(raw)) for key, raw in self.store.items()]
+        entries.sort(key=lambda item: item[1].get("created_at", 0), reverse=True)
+        return [{"profile_id": key, **{k: v for k, v in entry.items() if k != "collapsed"}} for key, entry in entries]
+
+
+_request_profile: contextvars.ContextVar[Optional[SamplingProfiler]] = contextvars.ContextVar("request_profile", default=None)
+
+
+@contextmanager
+def profiling_request(profile: SamplingProfiler):
+    """Make `profile` the current request's profile, so pool threads doing its work join it"""
+    token = _request_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _request_profile.reset(token)
+
+
+@contextmanager
+def following_thread():
+    """Sample the calling (pool) thread while it works for a profiled request - no-op otherwise"""
+    profile = _request_profile.get()
+    if profile is None or profile.thread_ids is None:
+        yield
+        return
+    ident = threading.get_ident()
+    profile.thread_ids.add(ident)
+    try:
+        yield
+    finally:
+        profile.thread_ids.discard(ident)
+
+
+profiles = ProfileStore()
+_session_lock = asyncio.Lock()
+
+
+def is_enabled() -> bool:
+    return bool(PROFILER_TOKEN)
+
+
+def authorized(token: Optional[str]) -> bool:
+    """Constant-time check of the X-Profiler-Token header"""
+    return is_enabled() and bool(token) and hmac.compare_digest(token, PROFILER_TOKEN)
+
+
+async def profile_process(seconds: float, interval: float = PROFILE_INTERVAL) -> SamplingProfiler:
+    """Sample every thread for `seconds` while the event loop keeps serving requests (one session at a time)"""
+    if _session_lock.locked():
+        raise RuntimeError("A profiling session is already running")
+    async with _session_lock:
+        profile = SamplingProfiler(interval).start()
+        try:
+            await asyncio.sleep(min(seconds, PROFILE_MAX_SECONDS))
+        finally:
+            profile.stop()
+    logger.info("🔬 Profiled process for %.1fs: %d samples, %d stacks", profile.duration, profile.samples,
+                len(profile.stacks))
+    return profile
+
+
+def main(argv=None) -> int:
+    """CLI: python profiler.py top <file.folded> - hottest leaf frames of a collapsed-stack file"""
+    parser = argparse.ArgumentParser(description="Inspect collapsed-stack profiles")
+    commands = parser.add_subparsers(dest="command", required=True)
+    top = commands.add_parser("top", help="Hottest leaf frames by self samples")
+    top.add_argument("path")
+    top.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    leaves: Counter = Counter()
+    total = 0
+    with open(args.path, encoding="utf-8") as handle:
+        for line in handle:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            if not stack or not count.isdigit():
+                continue
+            leaves[stack.rsplit(";", 1)[-1]] += int(count)
+            total += int(count)
+    for frame, count in leaves.most_common(args.limit):
+        print(f"{count / total:6.1%}  {count:6d}  {frame}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
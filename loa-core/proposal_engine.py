@@ -0,0 +1,181 @@
+"""
+9LMNTS STUDIO - Proposal Engine
+Precomputed package catalog and bulk proposal generation with persistent proposal storage
+"""
+
+import os
+import json
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from loa_brain import NINE_PILLARS_SERVICES, QUICK_SALES_PACKAGES
+from event_os_license import ulid
+from service_catalog import get_catalog
+from log_config import setup_logging
+from execution import execution_policy, BLOCKING
+
+# Configure logging
+setup_logging()
+logger = logging.getLogger("PROPOSAL_ENGINE")
+
+PROPOSAL_STORE_PATH = os.getenv("PROPOSAL_STORE_PATH", "loa_proposals.db")
+MAX_PROPOSAL_BATCH = int(os.getenv("MAX_PROPOSAL_BATCH", "1000"))
+SERVICE_TIERS = ("basic", "standard", "pro")
+
+# Fixed commercial terms shared by every proposal
+PROPOSAL_TERMS = {
+    "timeline": "24-48 hours",
+    "event_os_license": "Included",
+    "payment_terms": "50% upfront, 50% on delivery",
+    "guarantee": "AI setup satisfaction guaranteed"
+}
+
+
+def resolve_service(service_ref: str, services: Dict = NINE_PILLARS_SERVICES) -> Dict[str, Any]:
+    """Resolve a package service reference like "mcing_element_basic" to its pillar tier"""
+    pillar, _, tier = service_ref.rpartition("_")
+    if tier not in SERVICE_TIERS or pillar not in services:
+        raise KeyError(f"Unknown service reference: {service_ref}")
+    pillar_data = services[pillar]
+    return {
+        "service": service_ref,
+        "pillar": pillar,
+        "tier": tier,
+        "name": pillar_data["name"],
+        "price": pillar_data[tier]["price"],
+        "features": pillar_data[tier]["features"]
+    }
+
+
+def build_package_catalog(packages: Dict = QUICK_SALES_PACKAGES, services: Dict = NINE_PILLARS_SERVICES) -> Dict[str, Dict]:
+    """Resolve every package once: tier services, ROI and totals"""
+    catalog = {}
+    for key, package in packages.items():
+        resolved = [resolve_service(ref, services) for ref in package["services"]]
+        list_price = sum(service["price"] for service in resolved)
+        roi_percentage = ((package["value"] - package["price"]) / package["price"]) * 100
+        catalog[key] = {
+            "service_package": key,
+            "package_name": package["name"],
+            "description": package.get("description", ""),
+            "price": package["price"],
+            "value": package["value"],
+            "roi": f"{roi_percentage:.1f}%",
+            "services": resolved,
+            "services_list_price": list_price,
+            "bundle_savings": max(0, list_price - package["price"]),
+            **PROPOSAL_TERMS
+        }
+    return catalog
+
+
+PROPOSAL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS proposals (
+    proposal_id TEXT PRIMARY KEY,
+    service_package TEXT NOT NULL,
+    client_name TEXT,
+    price INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'sent',
+    created_at TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_proposals_package ON proposals(service_package);
+"""
+
+
+class ProposalStore:
+    """SQLite proposal persistence (replaces the unbounded in-memory proposals list)"""
+
+    def __init__(self, path: str = PROPOSAL_STORE_PATH):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(PROPOSAL_SCHEMA)
+        self._lock = threading.Lock()
+
+    def save_many(self, proposals: List[Dict]):
+        rows = [(p["proposal_id"], p["service_package"], p.get("client_name"), p["price"], p["created_at"],
+                 json.dumps(p, separators=(",", ":"), ensure_ascii=False)) for p in proposals]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO proposals (proposal_id, service_package, client_name, price, created_at, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+
+    def get(self, proposal_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT data, status FROM proposals WHERE proposal_id = ?", (proposal_id,)).fetchone()
+        if row is None:
+            return None
+        return {**json.loads(row[0]), "status": row[1]}
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM proposals").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ProposalEngine:
+    """Proposals are lookups into the precomputed catalog plus the client's details"""
+
+    def __init__(self, store: Optional[ProposalStore] = None, packages: Optional[Dict] = None,
+                 services: Optional[Dict] = None):
+        self.store = store
+        # Explicit packages/services pin the catalog; otherwise it follows the live service catalog
+        self._pinned = None
+        if packages is not None or services is not None:
+            self._pinned = build_package_catalog(packages or QUICK_SALES_PACKAGES, services or NINE_PILLARS_SERVICES)
+        logger.info("📋 Proposal catalog ready: %s packages", len(self.catalog))
+
+    @property
+    def catalog(self) -> Dict[str, Dict]:
+        if self._pinned is not None:
+            return self._pinned
+        # Built once per catalog version; a reload drops it together with the old snapshot
+        return get_catalog().current.derive(
+            "proposal_packages", lambda snapshot: build_package_catalog(snapshot.packages, snapshot.services)
+        )
+
+    def _build(self, request: Dict, created_at: str) -> Dict:
+        package = self.catalog.get(request.get("service_package"))
+        if package is None:
+            raise KeyError(f"Package not found: {request.get('service_package')}")
+        # Catalog entries are shared and never mutated - the proposal is a shallow overlay
+        return {
+            **package,
+            "proposal_id": f"PROP-{ulid.new()}",
+            "client_name": request.get("client_name"),
+            "client_requirements": request.get("client_requirements", ""),
+            "client_budget": request.get("budget"),
+            "client_timeline": request.get("timeline"),
+            "created_at": created_at
+        }
+
+    @execution_policy(BLOCKING)
+    def generate(self, request: Dict) -> Dict:
+        proposal = self._build(request, datetime.now().isoformat())
+        if self.store is not None:
+            self.store.save_many([proposal])
+        return proposal
+
+    @execution_policy(BLOCKING)
+    def generate_batch(self, requests: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """Build proposals for many clients and persist them in one transaction; returns (proposals, errors)"""
+        created_at = datetime.now().isoformat()
+        proposals, errors = [], []
+        for index, request in enumerate(requests):
+            try:
+                proposals.append(self._build(request, created_at))
+            except KeyError as e:
+                errors.append({"index": index, "error": str(e.args[0])})
+        if proposals and self.store is not None:
+            self.store.save_many(proposals)
+        logger.info("📋 Generated %s proposals (%s rejected)", len(proposals), len(errors))
+        return proposals, errors
@@ -3,21 +3,168 @@
 24/7 Lead Generation, Qualification, and Closing for Nine Pillars AI Services
 """
 
+import json
 import asyncio
 import logging
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import requests
 from loa_brain import LOABrain
+from document_renderer import renderer
+from timer_scheduler import TimerScheduler, parse_duration
+from lead_sourcing import LeadSourcingPipeline
+from website_analyzer import WebsiteAnalyzer
+from shared_state import get_shared_state, SharedMapping
+from metrics import timed_scorer
+from execution import execution, BLOCKING
+from log_config import setup_logging
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+setup_logging()
 logger = logging.getLogger("SALES_AUTOMATION")
 
+# Timed follow-ups go out over SMTP - their own pool, so a slow mail server can't starve other I/O
+execution.add_pool("smtp", BLOCKING, 2)
+
+# Campaign fields shared with other workers (the sourcing task itself stays with the process that runs it)
+CAMPAIGN_RECORD_FIELDS = ("id", "status", "start_time", "end_time", "sourcing_run_id")
+
+# Follow-up templates - compiled once by the shared document renderer
+FOLLOWUP_TEMPLATES = {
+    "hot_lead": """
+🚀 FOLLOW-UP: Your AI Transformation is Ready!
+
+Hi {name},
+
+Following up on your inquiry about AI transformation for {company}.
+
+Our AI Brand Transformation Package ($5,000) includes:
+• Custom GPT trained on your brand voice
+• AI Visual Design System with unlimited variations  
+• Multilingual Communication for global reach
+• 24-48 hour setup guarantee
+
+🎯 LIMITED TIME: We can start TODAY and have your AI systems running by tomorrow.
+
+📞 Ready to proceed? Reply "YES" and I'll send the proposal immediately.
+
+Best regards,
+9LMNTS Studio AI Team
+🌐 9lmntsstudio.com
+""",
+
+    "warm_lead": """
+📈 FOLLOW-UP: Scale Your Business with AI
+
+Hi {name},
+
+Hope you're having a great week! 
+
+Following up on your interest in AI transformation for {company}. Many businesses like yours are using AI to:
+
+✨ Reduce operational costs by 40%
+⚡ Increase content output 10x
+🌍 Expand to global markets automatically
+💰 Generate revenue while you sleep
+
+Our AI packages start at $2,000 with immediate ROI.
+
+Would you be open to a 15-minute call to explore how AI could transform {company}?
+
+Best,
+9LMNTS Studio
+""",
+
+    "nurture": """
+💡 AI INSIGHT: Transform Your Industry
+
+Hi {name},
+
+Sharing an interesting case study: Similar {industry} companies using AI saw 300% ROI in 6 months.
+
+Key transformations:
+• Manual processes → Automated workflows
+• Local presence → Global reach  
+• Static content → AI-generated variations
+
+When you're ready to explore AI transformation, we're here.
+
+9LMNTS Studio
+"""
+}
+
+# Urgent pitch packages with their feature lists pre-joined
+PITCH_PACKAGES = {
+    "ai_brand_transformation": {
+        "package": "AI Brand Transformation Package",
+        "price": "$5,000",
+        "value": "$9,000",
+        "features": "\n".join([
+            "✅ Custom GPT trained on your brand",
+            "✅ AI Visual Design System with unlimited variations", 
+            "✅ AI Multilingual Communication for global reach",
+            "✅ Setup in 24-48 hours",
+            "✅ Event OS IP License included"
+        ])
+    },
+    "digital_dominance_starter": {
+        "package": "Digital Dominance Starter Package",
+        "price": "$7,500",
+        "value": "$13,500",
+        "features": "\n".join([
+            "✅ Advanced AI Brand Voice + UX Optimization",
+            "✅ AI Content & Learning Systems",
+            "✅ Automated workflow setup",
+            "✅ Priority support and maintenance"
+        ])
+    }
+}
+
+CUSTOM_SOLUTION_FEATURES = "\n".join([
+    "✅ Tailored AI solution for your specific needs",
+    "✅ Professional implementation and training",
+    "✅ Ongoing support and optimization"
+])
+
+URGENT_PITCH_TEMPLATE = """🚀 URGENT: AI Transformation Opportunity for {business_type}
+
+📦 RECOMMENDED: {package}
+💰 INVESTMENT: {price} (Value: {value})
+⏱️ DELIVERY: 24-48 hours
+🔧 SETUP: Full implementation and training
+
+{features}
+
+🎯 WHY CHOOSE 9LMNTS:
+✨ Only studio offering Hip-Hop culture + AI transformation
+⚡ 24/7 automated lead generation and closing
+🌍 Global multilingual AI capabilities
+📈 Proven ROI of 80%+ on AI investments
+
+📞 NEXT STEPS:
+1️⃣ Accept proposal → 2️⃣ AI setup starts → 3️⃣ Revenue generation begins
+
+Ready to transform your business into an AI powerhouse? Let's close this deal NOW!"""
+
+for _stage, _template in FOLLOWUP_TEMPLATES.items():
+    renderer.register(f"followup_{_stage}", _template)
+renderer.register("urgent_pitch", URGENT_PITCH_TEMPLATE)
+
 class SalesAutomation:
-    def __init__(self):
-        self.loa_brain = LOABrain()
-        self.active_campaigns = []
+    def __init__(self, loa_brain: Optional[LOABrain] = None, scheduler: Optional[TimerScheduler] = None,
+                 lead_store=None):
+        self.loa_brain = loa_brain or LOABrain()
+        self.active_campaigns = []  # started by this process
+        self.scheduler = scheduler
+        self.lead_store = lead_store
+        self._smtp_pool = None  # opened by the first timed follow-up
+        self._stores: Dict[str, SharedMapping] = {}
+        self.website_analyzer = WebsiteAnalyzer()
+        if scheduler is not None:
+            # Deadlines recorded on campaigns and deal timelines are acted on by these timers
+            scheduler.register("campaign_close", self._close_campaign_timer)
+            scheduler.register("lead_followup", self._followup_timer)
+            scheduler.register("lead_rescore", self._rescore_timer)
         self.target_markets = [
             "Businesses needing AI transformation",
             "Companies with outdated websites", 
@@ -29,12 +176,12 @@ class SalesAutomation:
             "Traditional businesses going digital"
         ]
         
-    async def start_lead_scraping_campaign(self):
-        """Start 24/7 lead generation campaign"""
+    async def start_lead_scraping_campaign(self, sources: Optional[List] = None, lead_store=None):
+        """Start 24/7 lead generation campaign; with sources and a lead store it runs a real sourcing pass"""
         logger.info("🎯 Starting 24/7 Lead Scraping Campaign")
         
         campaign = {
-            "id": len(self.active_campaigns) + 1,
+            "id": get_shared_state().kv_increment("counters", "campaign"),
             "start_time": datetime.now(),
             "status": "ACTIVE",
             "targets": self.target_markets,
@@ -54,75 +201,67 @@ class SalesAutomation:
             }
         }
         
+        if sources and lead_store is not None:
+            # Crawl/import in the background; leads stream into qualification and the lead store
+            # Leads with a website get it analyzed so qualification can score its pain points
+            pipeline = LeadSourcingPipeline(self, lead_store, analyze_websites=True,
+                                            run_store=self._store("sourcing_runs"))
+            campaign["sourcing_run_id"] = f"campaign_{campaign['id']}_{campaign['start_time'].strftime('%Y%m%d%H%M%S')}"
+            campaign["sourcing"] = pipeline.runs
+            campaign["sourcing_task"] = asyncio.create_task(pipeline.run(sources, campaign["sourcing_run_id"]))
+        
         self.active_campaigns.append(campaign)
-        logger.info(f"🚀 Campaign {campaign['id']} started with {len(self.target_markets)} target markets")
+        self._save_campaign(campaign)
+        logger.info("🚀 Campaign %s started with %s target markets", campaign['id'], len(self.target_markets))
+
+        if self.scheduler is not None:
+            self.scheduler.schedule_at(
+                "campaign_close",
+                campaign["start_time"].timestamp() + parse_duration(campaign["expected_results"]["timeline"]),
+                {"campaign_id": campaign["id"]},
+                key=f"campaign:{campaign['id']}"
+            )
         
         return {
             "status": "campaign_started",
             "campaign_id": campaign["id"],
+            "sourcing_run_id": campaign.get("sourcing_run_id"),
             "message": "🤖 AI Sales Machine ACTIVATED - Targeting businesses ready for transformation",
             "expected_revenue": "$5,000+",
             "timeline": "12 hours"
         }
     
+    async def analyze_website(self, lead_info: Dict) -> Dict:
+        """Scan the lead's website for AI opportunities and pain points; attaches the result to the lead"""
+        website = lead_info.get("website")
+        if not website:
+            return {}
+        analysis = await self.website_analyzer.analyze(website)
+        lead_info["website_analysis"] = analysis
+        logger.info("🌐 Website analysis for %s: pain score %s", website, analysis['pain_point_score'])
+        return analysis
+    
     async def generate_urgent_sales_pitch(self, business_type: str, budget: int) -> str:
         """Generate urgent sales pitch based on business type and budget"""
         
-        if budget >= 5000:
-            package = "AI Brand Transformation Package"
-            price = "$5,000"
-            value = "$9,000"
-            features = [
-                "✅ Custom GPT trained on your brand",
-                "✅ AI Visual Design System with unlimited variations", 
-                "✅ AI Multilingual Communication for global reach",
-                "✅ Setup in 24-48 hours",
-                "✅ Event OS IP License included"
-            ]
-        elif budget >= 7500:
-            package = "Digital Dominance Starter Package"
-            price = "$7,500"
-            value = "$13,500"
-            features = [
-                "✅ Advanced AI Brand Voice + UX Optimization",
-                "✅ AI Content & Learning Systems",
-                "✅ Automated workflow setup",
-                "✅ Priority support and maintenance"
-            ]
+        # Largest threshold first - each tier must be reachable
+        if budget >= 7500:
+            package = PITCH_PACKAGES["digital_dominance_starter"]
+        elif budget >= 5000:
+            package = PITCH_PACKAGES["ai_brand_transformation"]
         else:
-            package = "Custom AI Solution"
-            price = f"${budget:,}"
-            value = f"${budget * 1.8:,}"
-            features = [
-                "✅ Tailored AI solution for your specific needs",
-                "✅ Professional implementation and training",
-                "✅ Ongoing support and optimization"
-            ]
-        
-        pitch = f"""
-🚀 URGENT: AI Transformation Opportunity for {business_type}
-
-📦 RECOMMENDED: {package}
-💰 INVESTMENT: {price} (Value: {value})
-⏱️ DELIVERY: 24-48 hours
-🔧 SETUP: Full implementation and training
-
-{chr(10).join(features)}
-
-🎯 WHY CHOOSE 9LMNTS:
-✨ Only studio offering Hip-Hop culture + AI transformation
-⚡ 24/7 automated lead generation and closing
-🌍 Global multilingual AI capabilities
-📈 Proven ROI of 80%+ on AI investments
-
-📞 NEXT STEPS:
-1️⃣ Accept proposal → 2️⃣ AI setup starts → 3️⃣ Revenue generation begins
-
-Ready to transform your business into an AI powerhouse? Let's close this deal NOW!
-        """
+            package = {
+                "package": "Custom AI Solution",
+                "price": f"${budget:,}",
+                "value": f"${budget * 1.8:,}",
+                "features": CUSTOM_SOLUTION_FEATURES
+            }
+        
+        pitch = renderer.render("urgent_pitch", {"business_type": business_type, **package})
         
-        return pitch.strip()
+        return pitch
     
+    @timed_scorer("qualify_lead")
     async def qualify_lead_instantly(self, lead_info: Dict) -> Dict:
         """Instant lead qualification using AI"""
         
@@ -155,6 +294,12 @@ Ready to transform your business into an AI powerhouse? Let's close this deal NO
             qualification_score += 25
             reasons.append("💡 Identified AI automation opportunities")
         
+        # Website pain points (from analyze_website)
+        website_analysis = lead_info.get("website_analysis") or {}
+        if website_analysis.get("pain_point_score", 0) >= 50:
+            qualification_score += 20
+            reasons.append(f"🌐 Website needs work - {len(website_analysis['pain_points'])} pain points found")
+        
         # Determine qualification level
         if qualification_score >= 80:
             level = "🔥 HOT LEAD - Close Immediately"
@@ -182,80 +327,21 @@ Ready to transform your business into an AI powerhouse? Let's close this deal NO
     async def send_automated_followup(self, lead_info: Dict, stage: str) -> str:
         """Send automated follow-up based on lead stage"""
         
-        followup_templates = {
-            "hot_lead": """
-🚀 FOLLOW-UP: Your AI Transformation is Ready!
-
-Hi {name},
-
-Following up on your inquiry about AI transformation for {company}.
-
-Our AI Brand Transformation Package ($5,000) includes:
-• Custom GPT trained on your brand voice
-• AI Visual Design System with unlimited variations  
-• Multilingual Communication for global reach
-• 24-48 hour setup guarantee
-
-🎯 LIMITED TIME: We can start TODAY and have your AI systems running by tomorrow.
-
-📞 Ready to proceed? Reply "YES" and I'll send the proposal immediately.
-
-Best regards,
-9LMNTS Studio AI Team
-🌐 9lmntsstudio.com
-            """,
-            
-            "warm_lead": """
-📈 FOLLOW-UP: Scale Your Business with AI
-
-Hi {name},
-
-Hope you're having a great week! 
-
-Following up on your interest in AI transformation for {company}. Many businesses like yours are using AI to:
-
-✨ Reduce operational costs by 40%
-⚡ Increase content output 10x
-🌍 Expand to global markets automatically
-💰 Generate revenue while you sleep
-
-Our AI packages start at $2,000 with immediate ROI.
-
-Would you be open to a 15-minute call to explore how AI could transform {company}?
-
-Best,
-9LMNTS Studio
-            """,
-            
-            "nurture": """
-💡 AI INSIGHT: Transform Your Industry
-
-Hi {name},
-
-Sharing an interesting case study: Similar {industry} companies using AI saw 300% ROI in 6 months.
-
-Key transformations:
-• Manual processes → Automated workflows
-• Local presence → Global reach  
-• Static content → AI-generated variations
-
-When you're ready to explore AI transformation, we're here.
-
-9LMNTS Studio
-            """
-        }
-        
-        template = followup_templates.get(stage, followup_templates["nurture"])
+        template_name = f"followup_{stage}" if stage in FOLLOWUP_TEMPLATES else "followup_nurture"
         
-        # Personalize template
-        personalized = template.replace("{name}", lead_info.get("name", "there")).replace("{company}", lead_info.get("company", "your company")).replace("{industry}", lead_info.get("industry", "your industry"))
+        # Personalize compiled template
+        personalized = renderer.render(template_name, {
+            "name": lead_info.get("name", "there"),
+            "company": lead_info.get("company", "your company"),
+            "industry": lead_info.get("industry", "your industry")
+        })
         
-        logger.info(f"📧 Generated follow-up for {lead_info.get('name', 'unknown')} - Stage: {stage}")
+        logger.info("📧 Generated follow-up for %s - Stage: %s", lead_info.get('name', 'unknown'), stage)
         
         return personalized
     
-    async def calculate_deal_probability(self, lead_info: Dict) -> Dict:
-        """Calculate probability of closing deal"""
+    async def calculate_deal_probability(self, lead_info: Dict, schedule: bool = True) -> Dict:
+        """Calculate probability of closing deal (and schedule its follow-up when a scheduler is attached)"""
         
         factors = {
             "budget_alignment": 0.3,
@@ -296,12 +382,107 @@ When you're ready to explore AI transformation, we're here.
         
         probability = min(score, 95)  # Cap at 95%
         
-        return {
+        result = {
             "probability": f"{probability:.0f}%",
             "confidence": "HIGH" if probability >= 70 else "MEDIUM" if probability >= 50 else "LOW",
             "recommended_action": "CLOSE NOW" if probability >= 80 else "NURTURE" if probability >= 60 else "FOLLOW UP",
             "expected_timeline": "24 hours" if probability >= 80 else "2-3 days" if probability >= 60 else "1 week"
         }
+        
+        if schedule and self.scheduler is not None and lead_info.get("id") is not None:
+            self.schedule_lead_timeline(lead_info, probability, result["expected_timeline"])
+        
+        return result
+    
+    @staticmethod
+    def _followup_stage(probability: float) -> str:
+        return "hot_lead" if probability >= 80 else "warm_lead" if probability >= 60 else "nurture"
+    
+    def schedule_lead_timeline(self, lead_info: Dict, probability: float, expected_timeline: str):
+        """Follow up when the expected timeline runs out and re-score halfway there (replaces earlier timers)"""
+        deadline = parse_duration(expected_timeline)
+        stage = self._followup_stage(probability)
+        lead_key = f"lead:{lead_info['id']}"
+        self.scheduler.schedule("lead_followup", deadline, {"lead": lead_info, "stage": stage}, key=f"{lead_key}:followup")
+        self.scheduler.schedule("lead_rescore", deadline / 2, {"lead": lead_info, "stage": stage}, key=f"{lead_key}:rescore")
+    
+    async def _close_campaign_timer(self, payload: Dict):
+        """Close the persisted campaign; the timer can outlive the process that started it"""
+        record = self.get_campaign(payload["campaign_id"])
+        if record is None or record["status"] != "ACTIVE":
+            return
+        campaign = next((c for c in self.active_campaigns if c["id"] == record["id"]), None)
+        if campaign is not None:
+            if campaign.get("sourcing_task") and not campaign["sourcing_task"].done():
+                campaign["sourcing_task"].cancel()
+        else:
+            # Started before this worker restarted - its sourcing task died with the old process
+            campaign = record
+            run = self.get_sourcing_run(record["sourcing_run_id"]) if record.get("sourcing_run_id") else None
+            if run is not None and run["status"] == "running":
+                run["status"] = "stopped"
+                self._store("sourcing_runs")[run["run_id"]] = json.dumps(run, default=str).encode("utf-8")
+        campaign["status"] = "CLOSED"
+        campaign["end_time"] = datetime.now()
+        self._save_campaign(campaign)
+        logger.info("🏁 Campaign %s closed at its deadline", campaign['id'])
+    
+    def _store(self, namespace: str) -> SharedMapping:
+        if namespace not in self._stores:
+            self._stores[namespace] = SharedMapping(get_shared_state(), namespace)
+        return self._stores[namespace]
+    
+    def _save_campaign(self, campaign: Dict):
+        record = {field: campaign.get(field) for field in CAMPAIGN_RECORD_FIELDS}
+        self._store("campaigns")[str(campaign["id"])] = json.dumps(record, default=str).encode("utf-8")
+    
+    def get_campaign(self, campaign_id: int) -> Optional[Dict]:
+        """Campaign record as saved by whichever worker started it"""
+        raw = self._store("campaigns").get(str(campaign_id))
+        return json.loads(raw) if raw else None
+    
+    def get_sourcing_run(self, run_id: str) -> Optional[Dict]:
+        """Live state if this process runs it, otherwise the last progress any worker published"""
+        for campaign in self.active_campaigns:
+            if campaign.get("sourcing_run_id") == run_id:
+                return campaign["sourcing"].get(run_id)
+        raw = self._store("sourcing_runs").get(run_id)
+        return json.loads(raw) if raw else None
+    
+    async def _followup_timer(self, payload: Dict):
+        """Email the stage follow-up through the campaign SMTP pool and record it on the stored lead"""
+        from followup_campaigns import SMTPPool, build_followup_message  # imports this module's templates
+        
+        lead_info, stage = payload["lead"], payload["stage"]
+        stored = self.lead_store.get(lead_info["id"]) if self.lead_store is not None and isinstance(lead_info.get("id"), int) else None
+        lead = {**lead_info, **(stored or {})}
+        email = lead.get("email") or (lead.get("contact_info") if "@" in str(lead.get("contact_info") or "") else None)
+        if not email:
+            logger.info("📭 No email for lead %s - follow-up skipped", lead_info.get("id"))
+            return
+        
+        if self._smtp_pool is None:
+            self._smtp_pool = SMTPPool(size=2)
+        message = build_followup_message({**lead, "email": email}, stage)
+        await execution.run_in("smtp", self._smtp_pool.send, message)
+        if stored is not None:
+            self.lead_store.mark_followed_up([(stored["id"], stage)])
+        logger.info("📧 Sent %s follow-up to lead %s", stage, lead_info.get("id"))
+    
+    def close(self):
+        if self._smtp_pool is not None:
+            self._smtp_pool.close()
+            self._smtp_pool = None
+    
+    async def _rescore_timer(self, payload: Dict):
+        lead_info = payload["lead"]
+        result = await self.calculate_deal_probability(lead_info, schedule=False)
+        stage = self._followup_stage(float(result["probability"].rstrip("%")))
+        logger.info("🔁 Re-scored lead %s: %s", lead_info.get('id'), result['probability'])
+        if stage != payload["stage"]:
+            # Lead moved stage - its follow-up now runs on the new expected timeline
+            self.scheduler.schedule("lead_followup", parse_duration(result["expected_timeline"]),
+                                    {"lead": lead_info, "stage": stage}, key=f"lead:{lead_info['id']}:followup")
 
 # Initialize sales automation
 sales_bot = SalesAutomation()
@@ -0,0 +1,122 @@
+"""
+9LMNTS STUDIO - Serialization
+Fast JSON encoding for API responses, logs and exports: orjson when installed, compact stdlib json otherwise
+"""
+
+import os
+import json
+import logging
+import dataclasses
+from enum import Enum
+from decimal import Decimal
+from datetime import datetime, date, time as dt_time
+from typing import Dict, Any, Callable, Tuple, Type, get_args
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+from log_config import setup_logging
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Configure logging
+setup_logging()
+logger = logging.getLogger("SERIALIZATION")
+
+JSON_ENCODER = os.getenv("JSON_ENCODER", "auto")  # auto | orjson | stdlib
+USE_ORJSON = ORJSON_AVAILABLE and JSON_ENCODER != "stdlib"
+ENCODER_NAME = "orjson" if USE_ORJSON else "stdlib"
+
+if JSON_ENCODER == "orjson" and not ORJSON_AVAILABLE:
+    logger.warning("⚠️ JSON_ENCODER=orjson but orjson is not installed - using stdlib json")
+
+_TEMPORAL = (datetime, date, dt_time)
+
+
+def _default(obj: Any) -> Any:
+    """Types neither encoder handles natively (orjson already covers datetimes, dataclasses and enums)"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, _TEMPORAL):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+_compact = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False, default=_default)
+_pretty = json.JSONEncoder(indent=2, ensure_ascii=False, default=_default)
+
+
+def _stdlib_dumps(obj: Any, pretty: bool) -> bytes:
+    return (_pretty if pretty else _compact).encode(obj).encode("utf-8")
+
+
+if USE_ORJSON:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS  # int keys become strings, as with json.dumps
+
+    def dumps(obj: Any, pretty: bool = False) -> bytes:
+        """Encode to UTF-8 JSON bytes"""
+        try:
+            return orjson.dumps(obj, default=_default, option=(_OPTIONS | orjson.OPT_INDENT_2) if pretty else _OPTIONS)
+        except orjson.JSONEncodeError:
+            # Integers beyond 64 bits, dict subclasses with exotic keys... - stdlib copes with those
+            return _stdlib_dumps(obj, pretty)
+else:
+    def dumps(obj: Any, pretty: bool = False) -> bytes:
+        """Encode to UTF-8 JSON bytes"""
+        return _stdlib_dumps(obj, pretty)
+
+
+def dumps_str(obj: Any, pretty: bool = False) -> str:
+    """Encode to a JSON string (log lines, prompts)"""
+    return dumps(obj, pretty).decode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with the fast encoder.
+
+    Returning one from a handler also skips FastAPI's jsonable_encoder/response_model pass,
+    which is where most of the CPU went for large dashboard and proposal payloads.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class EncodedJSONResponse(Response):
+    """Body that is already JSON bytes (e.g. encoded once per catalog version) - sent as-is"""
+
+    media_type = "application/json"
+
+
+def model_encoder(model: Type[BaseModel]) -> Callable[[BaseModel], bytes]:
+    """Encoder for one response model, with its field list and datetime fields worked out once.
+
+    Skips pydantic's per-call serializer: field values are read straight off the instance.
+    orjson writes datetimes natively; the stdlib path converts only the known datetime fields.
+    Nested models still go through the default handler.
+    """
+    fields: Tuple[str, ...] = tuple(model.model_fields)
+    temporal = tuple(name for name, field in model.model_fields.items()
+                     if field.annotation in _TEMPORAL or any(arg in _TEMPORAL for arg in get_args(field.annotation)))
+
+    def encode(instance: BaseModel) -> bytes:
+        data: Dict[str, Any] = {name: getattr(instance, name) for name in fields}
+        if not USE_ORJSON:
+            for name in temporal:
+                value = data[name]
+                if value is not None:
+                    data[name] = value.isoformat()
+        return dumps(data)
+
+    encode.__name__ = f"encode_{model.__name__}"
+    return encode
@@ -0,0 +1,354 @@
+"""
+9LMNTS STUDIO - Service Catalog
+Versioned Nine Pillars / package / license catalog with validation, indexes and atomic hot reload
+"""
+
+import os
+import sys
+import json
+import copy
+import bisect
+import asyncio
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Callable, Tuple
+from execution import execution, BLOCKING
+from log_config import setup_logging
+
+# Configure logging
+setup_logging()
+logger = logging.getLogger("SERVICE_CATALOG")
+
+CATALOG_PATH = os.getenv("CATALOG_PATH", "catalog.json")
+CATALOG_WATCH_INTERVAL = float(os.getenv("CATALOG_WATCH_INTERVAL", "2.0"))
+CATALOG_HISTORY = 20
+SERVICE_TIERS = ("basic", "standard", "pro")
+# Keys the proposal, license and compliance code reads from each catalog entry
+PACKAGE_FIELDS = ("name", "price", "value", "services")
+LICENSE_FIELDS = ("name", "code", "duration", "scope", "protections", "restrictions")
+LICENSE_VALUE_FIELDS = ("market_value", "license_price", "client_roi", "protection_level")
+DEFAULT_LICENSE_VALUE = "ai_brand_transformation"  # calculate_license_value falls back to this entry
+
+
+class CatalogError(ValueError):
+    """Catalog file failed validation - the previous version stays live"""
+
+    def __init__(self, problems: List[str]):
+        super().__init__("; ".join(problems))
+        self.problems = problems
+
+
+def builtin_catalog() -> Dict[str, Any]:
+    """The catalog compiled into the code - used when no catalog file exists"""
+    from loa_brain import NINE_PILLARS_SERVICES, QUICK_SALES_PACKAGES
+    from event_os_license import LICENSE_TYPES, LICENSE_VALUES
+    return copy.deepcopy({
+        "version": "builtin",
+        "services": NINE_PILLARS_SERVICES,
+        "packages": QUICK_SALES_PACKAGES,
+        "licenses": LICENSE_TYPES,
+        "license_values": LICENSE_VALUES
+    })
+
+
+def validate_catalog(document: Dict[str, Any]) -> List[str]:
+    """Every problem in a catalog document (empty list = valid)"""
+    problems = []
+    if not isinstance(document.get("version"), str) or not document["version"]:
+        problems.append("version must be a non-empty string")
+    services = document.get("services")
+    if not isinstance(services, dict) or not services:
+        return problems + ["services must be a non-empty object"]
+
+    for pillar, data in services.items():
+        if not isinstance(data, dict) or not data.get("name"):
+            problems.append(f"services.{pillar}: name is required")
+            continue
+        for tier in SERVICE_TIERS:
+            tier_data = data.get(tier)
+            if not isinstance(tier_data, dict):
+                problems.append(f"services.{pillar}.{tier} is missing")
+                continue
+            if not isinstance(tier_data.get("price"), int) or tier_data["price"] <= 0:
+                problems.append(f"services.{pillar}.{tier}.price must be a positive integer")
+            if not isinstance(tier_data.get("features"), list) or not tier_data["features"]:
+                problems.append(f"services.{pillar}.{tier}.features must be a non-empty list")
+
+    packages = document.get("packages")
+    if not isinstance(packages, dict) or not packages:
+        problems.append("packages must be a non-empty object")
+        packages = {}
+    for key, package in packages.items():
+        if not isinstance(package, dict):
+            problems.append(f"packages.{key} must be an object")
+            continue
+        for field in PACKAGE_FIELDS:
+            if field not in package:
+                problems.append(f"packages.{key}.{field} is required")
+        if not isinstance(package.get("price"), int) or package.get("price", 0) <= 0:
+            problems.append(f"packages.{key}.price must be a positive integer")
+        if "value" in package and not isinstance(package["value"], (int, float)):
+            problems.append(f"packages.{key}.value must be a number")
+        if not isinstance(package.get("services", []), list):
+            problems.append(f"packages.{key}.services must be a list")
+            continue
+        for ref in package.get("services", []):
+            pillar, _, tier = str(ref).rpartition("_")
+            if tier not in SERVICE_TIERS or pillar not in services:
+                problems.append(f"packages.{key}: unknown service reference {ref}")
+
+    licenses = document.get("licenses")
+    if not isinstance(licenses, dict) or not licenses:
+        problems.append("licenses must be a non-empty object")
+        licenses = {}
+    for key, license_type in licenses.items():
+        if not isinstance(license_type, dict):
+            problems.append(f"licenses.{key} must be an object")
+            continue
+        for field in LICENSE_FIELDS:
+            if field not in license_type:
+                problems.append(f"licenses.{key}.{field} is required")
+        for field in ("protections", "restrictions"):
+            if field in license_type and not isinstance(license_type[field], list):
+                problems.append(f"licenses.{key}.{field} must be a list")
+
+    license_values = document.get("license_values")
+    if not isinstance(license_values, dict) or not license_values:
+        problems.append("license_values must be a non-empty object")
+        license_values = {}
+    elif DEFAULT_LICENSE_VALUE not in license_values:
+        problems.append(f"license_values.{DEFAULT_LICENSE_VALUE} is required (fallback for unknown packages)")
+    for key, values in license_values.items():
+        if not isinstance(values, dict):
+            problems.append(f"license_values.{key} must be an object")
+            continue
+        for field in LICENSE_VALUE_FIELDS:
+            if field not in values:
+                problems.append(f"license_values.{key}.{field} is required")
+            elif field != "protection_level" and not isinstance(values[field], (int, float)):
+                problems.append(f"license_values.{key}.{field} must be a number")
+    return problems
+
+
+class CatalogSnapshot:
+    """One immutable catalog version plus its lookup indexes.
+
+    Never mutated after construction: reload builds a new snapshot and swaps the reference,
+    so readers just grab `manager.current` without locking. Values derived from a snapshot
+    live in `derived` and disappear with it, which is what invalidates caches on reload.
+    """
+
+    def __init__(self, document: Dict[str, Any], generation: int, source: str):
+        self.version = document["version"]
+        self.generation = generation
+        self.source = source
+        self.loaded_at = datetime.now().isoformat()
+        self.checksum = hashlib.sha256(json.dumps(document, sort_keys=True).encode()).hexdigest()[:16]
+        self.services: Dict[str, Dict] = document["services"]
+        self.packages: Dict[str, Dict] = document.get("packages", {})
+        self.licenses: Dict[str, Dict] = document.get("licenses", {})
+        self.license_values: Dict[str, Dict] = document.get("license_values", {})
+        self.derived: Dict[str, Any] = {}
+
+        # Indexes: (pillar, tier) entries, by tier, and one price-sorted list for range queries
+        self.offerings: Dict[Tuple[str, str], Dict] = {}
+        self.by_tier: Dict[str, List[Dict]] = {tier: [] for tier in SERVICE_TIERS}
+        for pillar, data in self.services.items():
+            for tier in SERVICE_TIERS:
+                entry = {
+                    "service": f"{pillar}_{tier}",
+                    "pillar": pillar,
+                    "tier": tier,
+                    "name": data["name"],
+                    "price": data[tier]["price"],
+                    "features": data[tier]["features"]
+                }
+                self.offerings[(pillar, tier)] = entry
+                self.by_tier[tier].append(entry)
+        for entries in self.by_tier.values():
+            entries.sort(key=lambda entry: entry["price"])
+        self.by_price = sorted(self.offerings.values(), key=lambda entry: (entry["price"], entry["service"]))
+        self._prices = [entry["price"] for entry in self.by_price]
+        self.packages_by_price = sorted(self.packages, key=lambda key: self.packages[key]["price"])
+
+    def resolve_service(self, service_ref: str) -> Dict:
+        """"mcing_element_basic" -> the pillar tier offering"""
+        pillar, _, tier = service_ref.rpartition("_")
+        entry = self.offerings.get((pillar, tier))
+        if entry is None:
+            raise KeyError(f"Unknown service reference: {service_ref}")
+        return entry
+
+    def pillar_tiers(self, pillar: str) -> List[Dict]:
+        return [self.offerings[(pillar, tier)] for tier in SERVICE_TIERS if (pillar, tier) in self.offerings]
+
+    def in_price_range(self, low: int = 0, high: Optional[int] = None) -> List[Dict]:
+        """Offerings priced within [low, high] via bisect on the price index"""
+        start = bisect.bisect_left(self._prices, low)
+        end = len(self._prices) if high is None else bisect.bisect_right(self._prices, high)
+        return self.by_price[start:end]
+
+    def price_range(self, pillar: str) -> Tuple[int, int]:
+        prices = [entry["price"] for entry in self.pillar_tiers(pillar)]
+        return min(prices), max(prices)
+
+    def derive(self, name: str, builder: Callable[["CatalogSnapshot"], Any]) -> Any:
+        """Cache a value computed from this snapshot (rebuilt automatically for the next version)"""
+        value = self.derived.get(name)
+        if value is None:
+            # Two readers may race to build this; both results are identical, last write wins
+            value = self.derived[name] = builder(self)
+        return value
+
+    def to_document(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "services": self.services,
+            "packages": self.packages,
+            "licenses": self.licenses,
+            "license_values": self.license_values
+        }
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "generation": self.generation,
+            "checksum": self.checksum,
+            "source": self.source,
+            "loaded_at": self.loaded_at,
+            "pillars": len(self.services),
+            "packages": len(self.packages),
+            "licenses": len(self.licenses)
+        }
+
+
+class CatalogManager:
+    """Owns the live snapshot; reloads from CATALOG_PATH when the file changes"""
+
+    def __init__(self, path: str = CATALOG_PATH):
+        self.path = path
+        self.history: List[Dict] = []
+        self._generation = 0
+        self._listeners: List[Callable[[CatalogSnapshot], None]] = []
+        self._reload_lock = threading.Lock()  # writers only - readers never lock
+        self._file_state: Optional[Tuple[float, int]] = None
+        self._watcher: Optional[asyncio.Task] = None
+        self.current = self._build(*self._read())
+
+    def _read(self) -> Tuple[Dict[str, Any], str]:
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                document = json.load(f)
+            self._file_state = self._stat()
+            return document, self.path
+        return builtin_catalog(), "builtin"
+
+    def _stat(self) -> Optional[Tuple[float, int]]:
+        try:
+            stat = os.stat(self.path)
+            return stat.st_mtime, stat.st_size
+        except OSError:
+            return None
+
+    def _build(self, document: Dict[str, Any], source: str) -> CatalogSnapshot:
+        problems = validate_catalog(document)
+        if problems:
+            raise CatalogError(problems)
+        self._generation += 1
+        snapshot = CatalogSnapshot(document, self._generation, source)
+        self.history = (self.history + [snapshot.describe()])[-CATALOG_HISTORY:]
+        return snapshot
+
+    def on_change(self, listener: Callable[[CatalogSnapshot], None]):
+        """Call listener(snapshot) after every successful reload"""
+        self._listeners.append(listener)
+
+    def reload(self) -> CatalogSnapshot:
+        """Load, validate and index the catalog file, then swap it in atomically"""
+        with self._reload_lock:
+            document, source = self._read()
+            snapshot = self._build(document, source)
+            previous, self.current = self.current, snapshot  # single reference swap
+        logger.info("📚 Catalog %s -> %s (generation %s)", previous.version, snapshot.version, snapshot.generation)
+        for listener in self._listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                logger.error("❌ Catalog listener failed: %s", e)
+        return snapshot
+
+    def check_for_changes(self) -> bool:
+        """Reload if the file's mtime/size changed; invalid files are logged and skipped"""
+        state = self._stat()
+        if state is None or state == self._file_state:
+            return False
+        self._file_state = state
+        try:
+            self.reload()
+            return True
+        except (CatalogError, ValueError, OSError) as e:
+            logger.error("❌ Catalog file rejected, keeping version %s: %s", self.current.version, e)
+            return False
+
+    async def watch(self, interval: float = CATALOG_WATCH_INTERVAL):
+        while True:
+            await asyncio.sleep(interval)
+            await execution.run_in(BLOCKING, self.check_for_changes)
+
+    async def start(self):
+        if self._watcher is None:
+            self._watcher = asyncio.create_task(self.watch())
+
+    async def stop(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+            try:
+                await self._watcher
+            except asyncio.CancelledError:
+                pass
+            self._watcher = None
+
+    def export(self, path: str):
+        """Write the live catalog to a file (atomic) - the starting point for editing prices"""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.current.to_document(), f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+_manager: Optional[CatalogManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_catalog() -> CatalogManager:
+    """Process-wide catalog manager (created on first use)"""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = CatalogManager()
+    return _manager
+
+
+def main(argv: List[str]) -> int:
+    """CLI: export <path> | validate <path>"""
+    if len(argv) != 2 or argv[0] not in ("export", "validate"):
+        print("Usage: python service_catalog.py export|validate <catalog.json>")
+        return 1
+    command, path = argv
+    if command == "export":
+        get_catalog().export(path)
+        print(f"✅ Catalog {get_catalog().current.version} written to {path}")
+        return 0
+    with open(path, "r", encoding="utf-8") as f:
+        problems = validate_catalog(json.load(f))
+    for problem in problems:
+        print(f"❌ {problem}")
+    print("✅ Catalog valid" if not problems else f"{len(problems)} problems")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
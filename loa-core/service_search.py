@@ -0,0 +1,172 @@
+"""
+9LMNTS STUDIO - Service Search
+Precomputed keyword and price indexes over the service catalog for instant pillar/package recommendations
+"""
+
+import re
+import sys
+import json
+import math
+import bisect
+import logging
+from collections import defaultdict
+from typing import Dict, Any, List, Optional, Tuple
+
+from service_catalog import get_catalog, CatalogSnapshot
+from metrics import timed_scorer
+from log_config import setup_logging
+
+# Configure logging
+setup_logging()
+logger = logging.getLogger("SERVICE_SEARCH")
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset((
+    "a", "an", "and", "ai", "are", "as", "at", "be", "by", "for", "from", "i", "in", "is", "it", "me",
+    "my", "need", "of", "on", "or", "our", "the", "to", "we", "want", "with", "you", "your", "element"
+))
+NAME_WEIGHT = 2.0  # a keyword in the pillar name counts double versus a tier feature
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase keyword tokens with stopwords dropped and a naive plural strip"""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS or len(token) < 2:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class ServiceIndex:
+    """Inverted keyword index and sorted price indexes for one catalog snapshot.
+
+    Built once per catalog version (via snapshot.derive) so a query is a handful of dict
+    lookups plus a bisect - no scan over pillars, tiers or packages.
+    """
+
+    def __init__(self, snapshot: CatalogSnapshot):
+        self.snapshot = snapshot
+
+        # keyword -> {pillar: weight}; idf damps words that appear in most pillars ("automation")
+        postings: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        for pillar, data in snapshot.services.items():
+            for token in tokenize(data["name"]) + tokenize(pillar.replace("_", " ")):
+                postings[token][pillar] += NAME_WEIGHT
+            for entry in snapshot.pillar_tiers(pillar):
+                for feature in entry["features"]:
+                    for token in tokenize(feature):
+                        postings[token][pillar] += 1.0
+        total = len(snapshot.services)
+        self.keywords: Dict[str, Dict[str, float]] = {}
+        for token, pillars in postings.items():
+            idf = math.log(1 + total / len(pillars))
+            self.keywords[token] = {pillar: weight * idf for pillar, weight in pillars.items()}
+
+        # Pillar phrases ("graffiti element") keyed by their first word for message routing
+        self.phrases: Dict[str, List[Tuple[str, str]]] = defaultdict(list)
+        for pillar in snapshot.services:
+            phrase = pillar.replace("_", " ")
+            self.phrases[phrase.split()[0]].append((phrase, pillar))
+
+        # Packages ascending by price, plus which packages contain each pillar
+        self.package_keys = list(snapshot.packages_by_price)
+        self.package_prices = [snapshot.packages[key]["price"] for key in self.package_keys]
+        self.packages_by_pillar: Dict[str, List[str]] = defaultdict(list)
+        for key in self.package_keys:
+            for ref in snapshot.packages[key]["services"]:
+                pillar = ref.rpartition("_")[0]
+                if key not in self.packages_by_pillar[pillar]:
+                    self.packages_by_pillar[pillar].append(key)
+
+    def find_pillar(self, text: str) -> Optional[str]:
+        """The pillar named in a message ("tell me about graffiti element"), if any"""
+        lowered = text.lower()
+        for word in TOKEN_PATTERN.findall(lowered):
+            for phrase, pillar in self.phrases.get(word, ()):
+                if phrase in lowered:
+                    return pillar
+        return None
+
+    def match_pillars(self, text: str) -> Dict[str, float]:
+        """Relevance of each pillar to free-text requirements"""
+        scores: Dict[str, float] = defaultdict(float)
+        for token in set(tokenize(text)):
+            for pillar, weight in self.keywords.get(token, {}).items():
+                scores[pillar] += weight
+        return scores
+
+    def package_for_budget(self, budget: Optional[int]) -> Optional[str]:
+        """Most complete package the budget covers (None below the cheapest package)"""
+        if not budget:
+            return None
+        index = bisect.bisect_right(self.package_prices, budget)
+        return self.package_keys[index - 1] if index else None
+
+    def best_tier(self, pillar: str, budget: Optional[int]) -> Optional[Dict]:
+        """Highest tier of a pillar within budget (the basic tier when there's no budget)"""
+        tiers = self.snapshot.pillar_tiers(pillar)
+        if not budget:
+            return tiers[0]
+        affordable = [entry for entry in tiers if entry["price"] <= budget]
+        return affordable[-1] if affordable else None
+
+    @timed_scorer("service_recommendation")
+    def recommend(self, budget: Optional[int] = None, requirements: str = "", limit: int = 3) -> Dict[str, Any]:
+        """Best-fit pillars (at the tier the budget allows) and packages for a budget and requirements"""
+        scores = self.match_pillars(requirements) if requirements else {}
+        if scores:
+            candidates = sorted(scores, key=lambda pillar: -scores[pillar])
+        else:
+            # No keyword signal: everything the budget can buy, most valuable offering first
+            offerings = self.snapshot.in_price_range(0, budget)
+            candidates = list(dict.fromkeys(entry["pillar"] for entry in reversed(offerings)))
+
+        pillars = []
+        for pillar in candidates:
+            entry = self.best_tier(pillar, budget)
+            if entry is None:
+                continue
+            pillars.append({**entry, "relevance": round(scores.get(pillar, 0.0), 2)})
+            if len(pillars) >= limit:
+                break
+
+        packages = []
+        budget_package = self.package_for_budget(budget)
+        matched = [pillar["pillar"] for pillar in pillars if pillar["relevance"]]
+        for key in [budget_package] + [key for pillar in matched for key in self.packages_by_pillar.get(pillar, [])]:
+            if key is None or key in packages:
+                continue
+            if budget and self.snapshot.packages[key]["price"] > budget:
+                continue
+            packages.append(key)
+
+        return {
+            "budget": budget,
+            "pillars": pillars,
+            "packages": [{"service_package": key, **self.snapshot.packages[key]} for key in packages[:limit]],
+            "recommended_package": budget_package,
+            "catalog_version": self.snapshot.version
+        }
+
+
+def get_service_index() -> ServiceIndex:
+    """Index for the live catalog version (rebuilt automatically after a catalog reload)"""
+    return get_catalog().current.derive("service_index", ServiceIndex)
+
+
+def main(argv: List[str]) -> int:
+    """CLI: python service_search.py <budget> [requirements ...]"""
+    if not argv:
+        print("Usage: python service_search.py <budget> [requirements ...]")
+        return 1
+    budget = int(argv[0]) if argv[0].isdigit() else None
+    requirements = " ".join(argv[1:] if budget is not None else argv)
+    print(json.dumps(get_service_index().recommend(budget, requirements), indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,186 @@
+"""
+9LMNTS STUDIO - Shared State
+SQLite (WAL) state shared by every API worker process: worker heartbeats and key/value tables
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Union, Callable
+from log_config import setup_logging
+
+# Configure logging
+setup_logging()
+logger = logging.getLogger("SHARED_STATE")
+
+SHARED_STATE_PATH = os.getenv("SHARED_STATE_PATH", "loa_shared.db")
+WORKER_SLOT = os.getenv("LOA_WORKER_SLOT", "")  # set by loa_server.py for each worker process
+
+SHARED_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS workers (
+    slot INTEGER PRIMARY KEY,
+    pid INTEGER NOT NULL,
+    started_at REAL NOT NULL,
+    heartbeat_at REAL NOT NULL,
+    requests INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def worker_path(path: str) -> str:
+    """Per-worker variant of a file path ("loa_timers.jsonl" -> "loa_timers.w2.jsonl") under the launcher.
+
+    Journals replayed on startup (webhooks, timers) must have exactly one owner; a
+    restarted worker takes over its slot's journal.
+    """
+    if not WORKER_SLOT:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.w{WORKER_SLOT}{ext}"
+
+
+class SharedState:
+    """One SQLite connection per process; WAL lets every worker read while one writes"""
+
+    def __init__(self, path: str = SHARED_STATE_PATH):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SHARED_SCHEMA)
+        self._lock = threading.Lock()
+
+    # Key/value
+    def kv_get(self, namespace: str, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM kv WHERE namespace = ? AND key = ?", (namespace, key)).fetchone()
+        return row[0] if row else None
+
+    def kv_set(self, namespace: str, key: str, value: bytes):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO kv (namespace, key, value) VALUES (?, ?, ?)", (namespace, key, value))
+
+    def kv_delete(self, namespace: str, key: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM kv WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def kv_update(self, namespace: str, key: str, update: Callable[[Optional[bytes]], bytes]) -> bytes:
+        """Read-modify-write of one value in a single IMMEDIATE transaction - no other worker can write
+        in between, so concurrent updates of the same key never lose each other's changes"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT value FROM kv WHERE namespace = ? AND key = ?", (namespace, key)).fetchone()
+                value = update(row[0] if row else None)
+                self._conn.execute("INSERT OR REPLACE INTO kv (namespace, key, value) VALUES (?, ?, ?)", (namespace, key, value))
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+        return value
+
+    def kv_increment(self, namespace: str, key: str) -> int:
+        """Atomically bump an integer counter - ids handed out this way are unique across workers"""
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "INSERT INTO kv (namespace, key, value) VALUES (?, ?, 1) "
+                "ON CONFLICT(namespace, key) DO UPDATE SET value = value + 1 RETURNING value",
+                (namespace, key)
+            ).fetchone()[0]
+
+    def kv_items(self, namespace: str) -> List[tuple]:
+        """Every (key, value) of a namespace - meant for small, bounded namespaces"""
+        with self._lock:
+            return self._conn.execute("SELECT key, value FROM kv WHERE namespace = ?", (namespace,)).fetchall()
+
+    def kv_count(self, namespace: str) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM kv WHERE namespace = ?", (namespace,)).fetchone()[0]
+
+    # Worker registry
+    def heartbeat(self, slot: int, pid: int, requests: int = 0):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO workers (slot, pid, started_at, heartbeat_at, requests) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(slot) DO UPDATE SET heartbeat_at = excluded.heartbeat_at, requests = excluded.requests, "
+                "started_at = CASE WHEN workers.pid = excluded.pid THEN workers.started_at ELSE excluded.started_at END, "
+                "pid = excluded.pid",
+                (slot, pid, now, now, requests)
+            )
+
+    def workers(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT slot, pid, started_at, heartbeat_at, requests FROM workers ORDER BY slot").fetchall()
+        return [dict(zip(("slot", "pid", "started_at", "heartbeat_at", "requests"), row)) for row in rows]
+
+    def clear_workers(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM workers")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class SharedMapping:
+    """dbm-style mapping over one kv namespace, so dbm users can switch to the shared backend unchanged"""
+
+    def __init__(self, state: SharedState, namespace: str):
+        self.state = state
+        self.namespace = namespace
+
+    @staticmethod
+    def _key(key: Union[str, bytes]) -> str:
+        return key.decode() if isinstance(key, bytes) else key
+
+    def get(self, key: Union[str, bytes], default: Optional[bytes] = None) -> Optional[bytes]:
+        value = self.state.kv_get(self.namespace, self._key(key))
+        return default if value is None else value
+
+    def __getitem__(self, key: Union[str, bytes]) -> bytes:
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: Union[str, bytes], value: Union[str, bytes]):
+        self.state.kv_set(self.namespace, self._key(key), value.encode() if isinstance(value, str) else value)
+
+    def pop(self, key: Union[str, bytes], default: Optional[bytes] = None) -> Optional[bytes]:
+        value = self.get(key, default)
+        self.state.kv_delete(self.namespace, self._key(key))
+        return value
+
+    def modify(self, key: Union[str, bytes], update: Callable[[Optional[bytes]], bytes]) -> bytes:
+        """Atomically replace a value with update(current value or None) - see SharedState.kv_update"""
+        return self.state.kv_update(self.namespace, self._key(key), update)
+
+    def items(self) -> List[tuple]:
+        return self.state.kv_items(self.namespace)
+
+    def __len__(self) -> int:
+        return self.state.kv_count(self.namespace)
+
+    def close(self):
+        pass  # the connection belongs to the SharedState
+
+
+_shared_state: Optional[SharedState] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_state() -> SharedState:
+    global _shared_state
+    with _shared_lock:
+        if _shared_state is None:
+            _shared_state = SharedState()
+        return _shared_state
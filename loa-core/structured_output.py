@@ -0,0 +1,344 @@
+"""
+9LMNTS STUDIO - Structured LLM Output
+Per-pillar JSON schemas, incremental parsing of streamed JSON, repair of common defects and targeted re-asks
+"""
+
+import re
+import json
+import logging
+from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable
+from log_config import setup_logging
+
+# Configure logging
+setup_logging()
+logger = logging.getLogger("STRUCTURED_OUTPUT")
+
+MAX_REASKS = 1  # follow-up calls for missing fields before giving up
+
+_STRING_LIST = {"type": "array", "items": {"type": "string"}, "minItems": 1}
+
+# Deliverable schemas per Nine Pillars generator (JSON Schema subset: type/required/properties/items/minItems)
+PILLAR_SCHEMAS: Dict[str, Dict[str, Any]] = {
+    "mcing_element": {
+        "type": "object",
+        "required": ["personality_traits", "tone_of_voice", "communication_style", "vocabulary",
+                     "emotional_connection", "content_guidelines", "social_media_voice"],
+        "properties": {
+            "personality_traits": _STRING_LIST,
+            "tone_of_voice": {"type": "string"},
+            "communication_style": {"type": "string"},
+            "vocabulary": _STRING_LIST,
+            "emotional_connection": {"type": "string"},
+            "content_guidelines": _STRING_LIST,
+            "social_media_voice": {"type": "object"}
+        }
+    },
+    "graffiti_element": {
+        "type": "object",
+        "required": ["logo_concepts", "color_palette", "typography", "icon_guidelines",
+                     "layout_principles", "brand_applications", "generation_prompts"],
+        "properties": {
+            "logo_concepts": {"type": "array", "items": {"type": "object"}, "minItems": 1},
+            "color_palette": {"type": "object", "required": ["primary", "secondary", "accent"]},
+            "typography": {"type": "object"},
+            "icon_guidelines": _STRING_LIST,
+            "layout_principles": _STRING_LIST,
+            "brand_applications": _STRING_LIST,
+            "generation_prompts": _STRING_LIST
+        }
+    },
+    "entrepreneurship_element": {
+        "type": "object",
+        "required": ["automation_opportunities", "workflows", "integrations", "timeline",
+                     "roi", "risks", "scalability"],
+        "properties": {
+            "automation_opportunities": _STRING_LIST,
+            "workflows": {"type": "array", "items": {"type": "object"}, "minItems": 1},
+            "integrations": _STRING_LIST,
+            "timeline": {"type": "string"},
+            "roi": {"type": "object"},
+            "risks": _STRING_LIST,
+            "scalability": {"type": "string"}
+        }
+    },
+    "language_element": {
+        "type": "object",
+        "required": ["language_priorities", "cultural_adaptation", "localization_framework",
+                     "translation_workflow", "quality_assurance", "market_messaging", "channels"],
+        "properties": {
+            "language_priorities": _STRING_LIST,
+            "cultural_adaptation": {"type": "string"},
+            "localization_framework": {"type": "string"},
+            "translation_workflow": _STRING_LIST,
+            "quality_assurance": _STRING_LIST,
+            "market_messaging": {"type": "object"},
+            "channels": _STRING_LIST
+        }
+    }
+}
+
+_JSON_TYPES = {
+    "object": dict, "array": list, "string": str, "boolean": bool,
+    "integer": int, "number": (int, float), "null": type(None)
+}
+_FENCE = re.compile(r"```(?:json|JSON)?\s*\n?(.*?)(?:```|$)", re.DOTALL)
+_TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+_PY_JSON = {"True": "true", "False": "false", "None": "null"}
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+_PY_LITERALS = re.compile(r"([:\[,]\s*)(True|False|None)(?=\s*[,\]}])")  # value positions only
+
+
+def validate(value: Any, schema: Dict[str, Any], path: str = "") -> List[str]:
+    """Problems with value against a JSON Schema subset (empty list = valid)"""
+    expected = schema.get("type")
+    if expected:
+        python_type = _JSON_TYPES[expected]
+        if not isinstance(value, python_type) or (expected in ("integer", "number") and isinstance(value, bool)):
+            return [f"{path or '$'}: expected {expected}"]
+    problems = []
+    if isinstance(value, dict):
+        for field in schema.get("required", []):
+            if field not in value or value[field] in (None, "", [], {}):
+                problems.append(f"{path}{field}: missing")
+        for field, field_schema in schema.get("properties", {}).items():
+            if field in value and value[field] not in (None, "", [], {}):
+                problems.extend(validate(value[field], field_schema, f"{path}{field}."))
+    elif isinstance(value, list):
+        if len(value) < schema.get("minItems", 0):
+            problems.append(f"{path or '$'}: expected at least {schema['minItems']} items")
+        if "items" in schema:
+            for index, item in enumerate(value):
+                problems.extend(validate(item, schema["items"], f"{path}{index}."))
+    return [problem.replace(".:", ":") for problem in problems]
+
+
+def invalid_fields(value: Dict, schema: Dict[str, Any]) -> List[str]:
+    """Top-level fields that are missing or fail validation - what a re-ask has to cover"""
+    if not isinstance(value, dict):
+        value = {}  # a bare list/string answers nothing - every required field needs asking
+    fields = []
+    for problem in validate(value, schema):
+        field = re.split(r"[.:]", problem, 1)[0]
+        if field and field != "$" and field not in fields:
+            fields.append(field)
+    return fields
+
+
+class IncrementalJSONParser:
+    """Consumes streamed model output chunk by chunk and can produce a valid partial object at any point.
+
+    Each character is scanned once. The parser tracks string/escape state, the open container
+    stack and the last position where the document can be cut cleanly (just before a comma),
+    so a snapshot is the prefix plus the right closing brackets - no re-parse of the stream.
+    """
+
+    def __init__(self):
+        self.buffer: List[str] = []
+        self.started = False
+        self.in_string = False
+        self.escaped = False
+        self.stack: List[str] = []
+        self.safe_cut: Optional[Tuple[int, Tuple[str, ...]]] = None
+        self.complete = False
+        self.completed_keys: List[str] = []
+        self._key_chars: List[str] = []
+        self._last_key: Optional[str] = None
+        self._expect_key = False
+
+    @property
+    def text(self) -> str:
+        return "".join(self.buffer)
+
+    def feed(self, chunk: str):
+        for char in chunk:
+            if self.complete:
+                return
+            if not self.started:
+                # Skip prose and markdown fences before the document
+                if char not in "{[":
+                    continue
+                self.started = True
+            self._consume(char)
+
+    def _consume(self, char: str):
+        self.buffer.append(char)
+        if self.in_string:
+            if self.escaped:
+                self.escaped = False
+            elif char == "\\":
+                self.escaped = True
+            elif char == '"':
+                self.in_string = False
+                if self._expect_key and len(self.stack) == 1:
+                    self._last_key = "".join(self._key_chars)
+            elif self._expect_key and len(self.stack) == 1:
+                self._key_chars.append(char)
+            return
+
+        if char == '"':
+            self.in_string = True
+            self._key_chars = []
+        elif char in "{[":
+            self.stack.append("}" if char == "{" else "]")
+            self._expect_key = char == "{"
+            self.safe_cut = (len(self.buffer), tuple(self.stack))
+        elif char in "}]":
+            if self.stack:
+                self.stack.pop()
+            if len(self.stack) == 1 and self.stack[0] == "}":
+                self._finish_top_level_member()
+            if not self.stack:
+                self._finish_top_level_member()
+                self.complete = True
+        elif char == ",":
+            if len(self.stack) == 1 and self.stack[0] == "}":
+                self._finish_top_level_member()
+            self.safe_cut = (len(self.buffer) - 1, tuple(self.stack))
+            self._expect_key = self.stack[-1] == "}" if self.stack else False
+        elif char == ":":
+            self._expect_key = False
+
+    def _finish_top_level_member(self):
+        if self._last_key is not None and self._last_key not in self.completed_keys:
+            self.completed_keys.append(self._last_key)
+        self._last_key = None
+
+    def snapshot(self) -> Optional[Any]:
+        """Best valid JSON value for what has streamed so far (None before the document starts)"""
+        if not self.started:
+            return None
+        text = self.text
+        if self.complete:
+            return repair_json(text)
+        closers = "".join(reversed(self.stack))
+        candidate = text + ('"' if self.in_string else "")
+        try:
+            return json.loads(_TRAILING_COMMA.sub(r"\1", candidate + closers))
+        except ValueError:
+            pass
+        if self.safe_cut is not None:
+            position, stack = self.safe_cut
+            try:
+                return json.loads(_TRAILING_COMMA.sub(r"\1", text[:position] + "".join(reversed(stack))))
+            except ValueError:
+                pass
+        return None
+
+
+def repair_json(text: str) -> Any:
+    """Parse model output as JSON, fixing fences, prose, smart quotes, Python literals,
+    trailing commas and truncation. Raises ValueError when nothing usable is left."""
+    if not text or not text.strip():
+        raise ValueError("empty model output")
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+
+    # Cheapest fixes first; each is only applied if the text still doesn't parse
+    fenced = _FENCE.search(text)
+    if fenced:
+        text = fenced.group(1)
+    start = min((index for index in (text.find("{"), text.find("[")) if index >= 0), default=-1)
+    if start < 0:
+        raise ValueError("no JSON object in model output")
+    text = text[start:]
+    for fix in (
+        lambda text: _TRAILING_COMMA.sub(r"\1", text),
+        lambda text: _PY_LITERALS.sub(lambda match: match.group(1) + _PY_JSON[match.group(2)], text),
+        lambda text: text.translate(_SMART_QUOTES)
+    ):
+        text = fix(text)
+        try:
+            return json.loads(text)
+        except ValueError:
+            pass
+
+    # Truncated or trailing prose: keep the longest cleanly closable prefix
+    parser = IncrementalJSONParser()
+    parser.feed(text)
+    if parser.complete:
+        return json.loads(_TRAILING_COMMA.sub(r"\1", parser.text))
+    value = parser.snapshot()
+    if value is None:
+        raise ValueError("model output is not recoverable JSON")
+    return value
+
+
+def response_format(name: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+    """OpenAI structured-output request parameter (other providers map it to their JSON mode)"""
+    return {"type": "json_schema", "json_schema": {"name": name, "schema": schema, "strict": False}}
+
+
+def field_subset(schema: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    properties = schema.get("properties", {})
+    return {"type": "object", "required": fields, "properties": {field: properties.get(field, {}) for field in fields}}
+
+
+def reask_prompt(original_prompt: str, partial: Dict, fields: List[str], schema: Dict[str, Any]) -> str:
+    """Ask only for the fields that were missing or invalid, with the rest as context"""
+    field_schemas = field_subset(schema, fields)["properties"]
+    return (
+        f"{original_prompt.strip()}\n\n"
+        f"You already provided: {json.dumps(partial, ensure_ascii=False)[:4000]}\n\n"
+        f"Return ONLY a JSON object with these fields: {', '.join(fields)}.\n"
+        f"Field schemas: {json.dumps(field_schemas)}"
+    )
+
+
+class StructuredOutput:
+    """Turns provider calls into validated pillar deliverables.
+
+    The provider callable takes (prompt, response_format) and returns the usual
+    {"status", "content"} dict. Defective output is repaired locally; only fields still
+    missing after repair are re-requested, and the answers are merged into the first result.
+    """
+
+    def __init__(self, max_reasks: int = MAX_REASKS):
+        self.max_reasks = max_reasks
+        self.stats = {"calls": 0, "parsed": 0, "repaired": 0, "reasks": 0, "valid": 0, "failed": 0}
+
+    def parse(self, content: str, pillar: str) -> Tuple[Dict, bool]:
+        """(parsed object, whether repair was needed) - an unusable response yields {}"""
+        try:
+            value = json.loads(content)
+            return (value if isinstance(value, dict) else {}), False
+        except (ValueError, TypeError):
+            pass
+        try:
+            value = repair_json(content)
+        except ValueError as e:
+            logger.warning("⚠️ %s output unusable: %s", pillar, e)
+            return {}, True
+        return (value if isinstance(value, dict) else {}), True
+
+    async def generate(self, pillar: str, prompt: str,
+                       call: Callable[[str, Dict[str, Any]], Awaitable[Dict]]) -> Dict[str, Any]:
+        schema = PILLAR_SCHEMAS[pillar]
+        self.stats["calls"] += 1
+        response = await call(prompt, response_format(pillar, schema))
+        if response.get("status") != "success":
+            self.stats["failed"] += 1
+            return {"data": {}, "valid": False, "missing": schema["required"], "repaired": False,
+                    "attempts": 1, "error": response.get("error")}
+
+        data, repaired = self.parse(response.get("content", ""), pillar)
+        self.stats["parsed"] += 1
+        self.stats["repaired"] += int(repaired)
+        attempts = 1
+        fields = invalid_fields(data, schema)
+        while fields and attempts <= self.max_reasks:
+            self.stats["reasks"] += 1
+            attempts += 1
+            logger.info("🔁 Re-asking %s for %s fields: %s", pillar, len(fields), ', '.join(fields))
+            followup = await call(reask_prompt(prompt, data, fields, schema),
+                                  response_format(f"{pillar}_missing", field_subset(schema, fields)))
+            if followup.get("status") != "success":
+                break
+            patch, patch_repaired = self.parse(followup.get("content", ""), pillar)
+            repaired = repaired or patch_repaired
+            data.update({field: patch[field] for field in fields if field in patch})
+            fields = invalid_fields(data, schema)
+
+        self.stats["valid" if not fields else "failed"] += 1
+        return {"data": data, "valid": not fields, "missing": fields, "repaired": repaired, "attempts": attempts}
@@ -0,0 +1,392 @@
+"""
+9LMNTS STUDIO - Timer Scheduler
+Persistent hierarchical timing wheel for follow-ups, lead re-scoring and campaign deadlines
+"""
+
+import os
+import re
+import math
+import json
+import time
+import asyncio
+import logging
+import itertools
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Callable, Tuple
+from log_config import setup_logging
+
+# Configure logging
+setup_logging()
+logger = logging.getLogger("TIMER_SCHEDULER")
+
+TIMER_JOURNAL_PATH = os.getenv("TIMER_JOURNAL_PATH", "loa_timers.jsonl")
+TIMER_RESOLUTION = float(os.getenv("TIMER_RESOLUTION", "1.0"))  # seconds per tick
+
+WHEEL_BITS = 6  # 64 slots per level
+WHEEL_SIZE = 1 << WHEEL_BITS
+WHEEL_MASK = WHEEL_SIZE - 1
+WHEEL_LEVELS = 5  # 64^5 ticks ~ 34 years at 1s resolution; anything further waits in overflow
+
+DURATION_UNITS = {
+    "second": 1, "sec": 1, "minute": 60, "min": 60, "hour": 3600, "hr": 3600,
+    "day": 86400, "week": 604800
+}
+_DURATION_PATTERN = re.compile(r"(\d+(?:\.\d+)?)(?:\s*-\s*(\d+(?:\.\d+)?))?\s*([a-z]+)")
+
+
+def parse_duration(text: str) -> float:
+    """Seconds in a human timeline like "12 hours", "2-3 days" or "1 week" (ranges use the upper bound)"""
+    match = _DURATION_PATTERN.search(text.lower())
+    if not match:
+        raise ValueError(f"Unrecognized duration: {text!r}")
+    low, high, unit = match.groups()
+    unit = unit.rstrip("s") if unit not in DURATION_UNITS else unit
+    if unit not in DURATION_UNITS:
+        raise ValueError(f"Unrecognized duration unit in {text!r}")
+    return float(high or low) * DURATION_UNITS[unit]
+
+
+class TimingWheel:
+    """Hierarchical timing wheel with absolute slot placement.
+
+    A timer lives on the lowest level whose window it shares with the current tick, so it
+    cascades one level down each time the wheel enters its window. Slots are dicts keyed by
+    timer id, which makes insert and cancel O(1); per-level occupancy bitmasks let the wheel
+    jump straight to the next tick where anything happens instead of stepping idle ticks.
+    """
+
+    def __init__(self, now_tick: int = 0):
+        self.now_tick = now_tick
+        self.slots: List[List[Dict[int, Dict]]] = [[{} for _ in range(WHEEL_SIZE)] for _ in range(WHEEL_LEVELS)]
+        self.occupied = [0] * WHEEL_LEVELS  # bit s set <=> slot s non-empty
+        self.overflow: Dict[int, Dict] = {}
+        self.location: Dict[int, Tuple[int, int]] = {}  # timer id -> (level, slot); level -1 = overflow
+
+    def __len__(self) -> int:
+        return len(self.location)
+
+    def _place(self, timer: Dict):
+        tick = max(timer["tick"], self.now_tick)
+        # Highest differing bit vs. the current tick picks the level
+        level = max(0, ((tick ^ self.now_tick).bit_length() - 1) // WHEEL_BITS)
+        if level >= WHEEL_LEVELS:
+            self.overflow[timer["id"]] = timer
+            self.location[timer["id"]] = (-1, 0)
+            return
+        slot = (tick >> (WHEEL_BITS * level)) & WHEEL_MASK
+        self.slots[level][slot][timer["id"]] = timer
+        self.occupied[level] |= 1 << slot
+        self.location[timer["id"]] = (level, slot)
+
+    def add(self, timer: Dict):
+        self._place(timer)
+
+    def remove(self, timer_id: int) -> Optional[Dict]:
+        where = self.location.pop(timer_id, None)
+        if where is None:
+            return None
+        level, slot = where
+        if level < 0:
+            return self.overflow.pop(timer_id)
+        bucket = self.slots[level][slot]
+        timer = bucket.pop(timer_id)
+        if not bucket:
+            self.occupied[level] &= ~(1 << slot)
+        return timer
+
+    def next_event_tick(self) -> Optional[int]:
+        """Earliest tick at which a timer fires or a higher-level slot cascades"""
+        best = None
+        for level in range(WHEEL_LEVELS):
+            mask = self.occupied[level]
+            if not mask:
+                continue
+            shift = WHEEL_BITS * level
+            current = (self.now_tick >> shift) & WHEEL_MASK
+            ahead = mask >> current << current  # slots at or after the current index
+            if not ahead:
+                continue  # cannot happen for a consistent wheel, but never wrap backwards
+            slot = (ahead & -ahead).bit_length() - 1
+            window = self.now_tick >> (shift + WHEEL_BITS) << (shift + WHEEL_BITS)
+            tick = window | (slot << shift)
+            if level and tick <= self.now_tick:
+                tick = self.now_tick  # entered the window already - cascade now
+            if best is None or tick < best:
+                best = tick
+        if self.overflow:
+            top = WHEEL_BITS * WHEEL_LEVELS
+            boundary = ((self.now_tick >> top) + 1) << top
+            best = boundary if best is None else min(best, boundary)
+        return best
+
+    def _take(self, level: int, slot: int) -> List[Dict]:
+        bucket = self.slots[level][slot]
+        if not bucket:
+            return []
+        self.slots[level][slot] = {}
+        self.occupied[level] &= ~(1 << slot)
+        for timer_id in bucket:
+            del self.location[timer_id]
+        return list(bucket.values())
+
+    def advance(self, target_tick: int) -> List[Dict]:
+        """Move the wheel to target_tick and return every timer due by then (in due order)"""
+        expired: List[Dict] = []
+        while True:
+            tick = self.next_event_tick()
+            if tick is None or tick > target_tick:
+                break
+            self.now_tick = tick
+            if self.overflow and tick % (1 << (WHEEL_BITS * WHEEL_LEVELS)) == 0:
+                pending, self.overflow = list(self.overflow.values()), {}
+                for timer in pending:
+                    del self.location[timer["id"]]
+                    self._place(timer)
+            # Cascade from the top so timers can fall through several levels in one tick
+            for level in range(WHEEL_LEVELS - 1, 0, -1):
+                shift = WHEEL_BITS * level
+                slot = (tick >> shift) & WHEEL_MASK
+                if self.occupied[level] >> slot & 1:
+                    for timer in self._take(level, slot):
+                        self._place(timer)
+            expired.extend(self._take(0, tick & WHEEL_MASK))
+        self.now_tick = max(self.now_tick, target_tick)
+        expired.sort(key=lambda timer: (timer["due"], timer["id"]))
+        return expired
+
+
+class TimerScheduler:
+    """Durable timers on an asyncio loop: sleeps until the next deadline, no polling.
+
+    Timers are journaled (add/cancel/fire records) and rebuilt on restart; overdue timers fire
+    immediately. Handlers are registered per timer kind and receive the timer's payload.
+    A timer's fire record is written once its handler has finished, so delivery is at-least-once:
+    a timer whose handler was interrupted by a crash fires again after the restart.
+    """
+
+    def __init__(self, path: str = TIMER_JOURNAL_PATH, resolution: float = TIMER_RESOLUTION):
+        self.path = path
+        self.resolution = resolution
+        self.handlers: Dict[str, Callable] = {}
+        self.wheel = TimingWheel(self._tick(time.time()))
+        self.keys: Dict[str, int] = {}  # dedupe key -> timer id (rescheduling replaces)
+        self._ids = itertools.count(1)
+        self._dead_records = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._driver: Optional[asyncio.Task] = None
+        self._wake_at: Optional[int] = None
+        self._inflight: Dict[int, Dict] = {}  # fired timers whose handler hasn't finished yet
+        self._tasks: set = set()  # running async handlers - awaited on stop
+        self.stats = {"scheduled": 0, "cancelled": 0, "fired": 0, "failed": 0}
+        self._load()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def _tick(self, timestamp: float) -> int:
+        return int(timestamp / self.resolution)
+
+    def _due_tick(self, due: float) -> int:
+        return math.ceil(due / self.resolution)  # never fire before the deadline
+
+    # Journal ---------------------------------------------------------
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        live: Dict[int, Dict] = {}
+        records = 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # torn write from a crash
+                records += 1
+                if "id" in record:
+                    live[record["id"]] = record
+                else:
+                    live.pop(record.get("cancel") or record.get("fired"), None)
+        for timer in live.values():
+            timer["tick"] = self._due_tick(timer["due"])
+            self.wheel.add(timer)
+            if timer.get("key"):
+                self.keys[timer["key"]] = timer["id"]
+        self._ids = itertools.count(max(live, default=0) + 1)
+        self._dead_records = records - len(live)
+        if live:
+            logger.info("⏰ Restored %s pending timers", len(live))
+
+    def _write(self, records: List[Dict]):
+        self._file.write("".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records))
+        self._file.flush()
+
+    def compact(self):
+        """Rewrite the journal with only pending timers (atomic replace)"""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for slots in self.wheel.slots:
+                for bucket in slots:
+                    for timer in bucket.values():
+                        f.write(json.dumps(self._record(timer), separators=(",", ":")) + "\n")
+            for timer in self.wheel.overflow.values():
+                f.write(json.dumps(self._record(timer), separators=(",", ":")) + "\n")
+            for timer in self._inflight.values():  # not finished - must survive a crash
+                f.write(json.dumps(self._record(timer), separators=(",", ":")) + "\n")
+        self._file.close()
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._dead_records = 0
+
+    @staticmethod
+    def _record(timer: Dict) -> Dict:
+        return {key: value for key, value in timer.items() if key != "tick"}
+
+    def _retire(self, count: int):
+        self._dead_records += count
+        if self._dead_records > 10000 and self._dead_records > len(self.wheel):
+            self.compact()
+
+    # Scheduling -------------------------------------------------------
+
+    def register(self, kind: str, handler: Callable):
+        self.handlers[kind] = handler
+
+    def schedule(self, kind: str, delay: float, payload: Optional[Dict] = None, key: Optional[str] = None) -> int:
+        """Fire `kind` after `delay` seconds; a timer with the same key is replaced"""
+        return self.schedule_at(kind, time.time() + delay, payload, key)
+
+    def schedule_at(self, kind: str, due: float, payload: Optional[Dict] = None, key: Optional[str] = None) -> int:
+        return self.schedule_many([(kind, due, payload, key)])[0]
+
+    def schedule_many(self, timers: List[Tuple[str, float, Optional[Dict], Optional[str]]]) -> List[int]:
+        """Bulk insert of (kind, due_timestamp, payload, key) with a single journal write"""
+        ids, records = [], []
+        replaced = 0
+        for kind, due, payload, key in timers:
+            if key and key in self.keys:
+                replaced += self.cancel(self.keys[key], _journal=records)
+            timer = {"id": next(self._ids), "kind": kind, "due": due, "payload": payload or {}, "key": key}
+            records.append(self._record(timer))
+            timer["tick"] = self._due_tick(due)
+            self.wheel.add(timer)
+            if key:
+                self.keys[key] = timer["id"]
+            ids.append(timer["id"])
+        self._write(records)
+        self.stats["scheduled"] += len(ids)
+        self._retire(2 * replaced)
+        self._reschedule_driver()
+        return ids
+
+    def cancel(self, timer_id: int, _journal: Optional[List[Dict]] = None) -> bool:
+        timer = self.wheel.remove(timer_id)
+        if timer is None:
+            return False
+        if timer.get("key") and self.keys.get(timer["key"]) == timer_id:
+            del self.keys[timer["key"]]
+        self.stats["cancelled"] += 1
+        if _journal is not None:
+            _journal.append({"cancel": timer_id})  # caller writes and retires
+        else:
+            self._write([{"cancel": timer_id}])
+            self._retire(2)
+        return True
+
+    def cancel_key(self, key: str) -> bool:
+        timer_id = self.keys.get(key)
+        return timer_id is not None and self.cancel(timer_id)
+
+    # Driver -----------------------------------------------------------
+
+    def _reschedule_driver(self):
+        """Wake the driver early if a new timer is due before its current sleep ends"""
+        if self._wakeup is None:
+            return
+        next_tick = self.wheel.next_event_tick()
+        if next_tick is not None and (self._wake_at is None or next_tick < self._wake_at):
+            self._wakeup.set()
+
+    async def start(self):
+        if self._driver is None:
+            self._wakeup = asyncio.Event()
+            self._driver = asyncio.create_task(self._run())
+            logger.info("⏰ Timer scheduler started (%s pending)", len(self.wheel))
+
+    async def stop(self):
+        if self._driver is not None:
+            self._driver.cancel()
+            try:
+                await self._driver
+            except asyncio.CancelledError:
+                pass
+            self._driver = None
+        if self._tasks:
+            # Let running handlers finish so their fire records reach the journal
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._file.close()
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            self._wake_at = self.wheel.next_event_tick()
+            if self._wake_at is None:
+                await self._wakeup.wait()
+                continue
+            delay = self._wake_at * self.resolution - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                    continue  # an earlier timer arrived - recompute
+                except asyncio.TimeoutError:
+                    pass
+            due = self.wheel.advance(self._tick(time.time()))
+            if due:
+                for timer in due:
+                    if timer.get("key") and self.keys.get(timer["key"]) == timer["id"]:
+                        del self.keys[timer["key"]]
+                for timer in due:
+                    await self._fire(timer)
+
+    def _finished(self, timer: Dict):
+        """Journal a timer as fired once its handler is done (failed handlers are not retried)"""
+        self._inflight.pop(timer["id"], None)
+        self._write([{"fired": timer["id"]}])
+        self._retire(2)
+
+    async def _fire(self, timer: Dict):
+        handler = self.handlers.get(timer["kind"])
+        if handler is None:
+            logger.warning("No handler for timer kind %s - dropped timer %s", timer['kind'], timer['id'])
+            self._finished(timer)
+            return
+        self.stats["fired"] += 1
+        self._inflight[timer["id"]] = timer
+        if asyncio.iscoroutinefunction(handler):
+            task = asyncio.create_task(self._guard(handler, timer))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            return
+        try:
+            handler(timer["payload"])
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.error("❌ Timer %s (%s) failed: %s", timer['id'], timer['kind'], e)
+        finally:
+            self._finished(timer)
+
+    async def _guard(self, handler: Callable, timer: Dict):
+        try:
+            await handler(timer["payload"])
+        except asyncio.CancelledError:
+            raise  # interrupted, not finished - the timer stays pending in the journal
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.error("❌ Timer %s (%s) failed: %s", timer['id'], timer['kind'], e)
+        self._finished(timer)
+
+    def get_stats(self) -> Dict:
+        next_tick = self.wheel.next_event_tick()
+        return {
+            **self.stats,
+            "pending": len(self.wheel),
+            "next_wakeup_at": datetime.fromtimestamp(next_tick * self.resolution).isoformat() if next_tick is not None else None
+        }
@@ -0,0 +1,424 @@
+"""
+9LMNTS STUDIO - Tracing
+W3C traceparent propagation, spans exported to a local JSONL file or an OTLP/HTTP collector, critical-path CLI
+"""
+
+import os
+import re
+import sys
+import glob
+import json
+import time
+import queue
+import random
+import hashlib
+import inspect
+import logging
+import argparse
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Callable, Iterable, Iterator
+
+import requests
+from shared_state import worker_path
+from log_config import setup_logging
+
+# Configure logging
+setup_logging()
+logger = logging.getLogger("TRACING")
+
+SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "loa-core")
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "traces/spans.jsonl")
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "")  # e.g. http://localhost:4318
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.05"))  # locally started traces; upstream decisions are kept
+TRACE_FILE_MAX_BYTES = int(os.getenv("TRACE_FILE_MAX_BYTES", str(50 * 1024 * 1024)))
+TRACE_FILE_BACKUPS = int(os.getenv("TRACE_FILE_BACKUPS", "3"))
+# Lead identifiers are exported as hashes; traces_for_lead hashes the query the same way
+PSEUDONYMIZED_ATTRIBUTES = ("lead_email", "lead_name")
+EXPORT_BATCH_SIZE = 256
+EXPORT_INTERVAL = 1.0
+
+TRACEPARENT_PATTERN = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class Span:
+    """One timed operation; ids and timestamps follow the OpenTelemetry data model"""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns",
+                 "attributes", "status", "sampled")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], sampled: bool,
+                 kind: str = "internal", attributes: Optional[Dict[str, Any]] = None):
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = dict(attributes or {})
+        self.status = "ok"
+        self.sampled = sampled
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        attributes = {key: pseudonymize(value) if key in PSEUDONYMIZED_ATTRIBUTES and value is not None else value
+                      for key, value in self.attributes.items()}
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "service": SERVICE_NAME,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3) if self.end_ns else None,
+            "status": self.status,
+            "attributes": attributes
+        }
+
+
+def pseudonymize(value: Any) -> str:
+    return "sha256:" + hashlib.sha256(str(value).strip().lower().encode("utf-8")).hexdigest()[:16]
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Dict[str, Any]]:
+    """{"trace_id", "parent_id", "sampled"} from a W3C traceparent header (None if absent/invalid)"""
+    if not header:
+        return None
+    match = TRACEPARENT_PATTERN.match(header.strip().lower())
+    if not match or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return {"trace_id": match.group(1), "parent_id": match.group(2), "sampled": bool(int(match.group(3), 16) & 1)}
+
+
+class SpanExporter:
+    """Batches finished spans on a background thread; JSONL file, plus OTLP/HTTP JSON when configured.
+
+    Each worker writes its own file, rotated at TRACE_FILE_MAX_BYTES keeping TRACE_FILE_BACKUPS
+    old files (spans.jsonl -> spans.jsonl.1 -> ...).
+    """
+
+    def __init__(self, path: str = TRACE_EXPORT_PATH, otlp_endpoint: str = OTLP_ENDPOINT,
+                 max_bytes: int = TRACE_FILE_MAX_BYTES, backups: int = TRACE_FILE_BACKUPS):
+        self.path = worker_path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.otlp_endpoint = otlp_endpoint.rstrip("/")
+        self._queue: "queue.Queue[Optional[Dict]]" = queue.Queue(maxsize=10000)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def export(self, span: Span):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                    self._thread.start()
+        try:
+            self._queue.put_nowait(span.to_dict())
+        except queue.Full:
+            self.dropped += 1  # never block a request on tracing
+
+    def _run(self):
+        while True:
+            batch = []
+            try:
+                item = self._queue.get(timeout=EXPORT_INTERVAL)
+                if item is None:
+                    return
+                batch.append(item)
+                while len(batch) < EXPORT_BATCH_SIZE:
+                    item = self._queue.get_nowait()
+                    if item is None:
+                        self._write(batch)
+                        return
+                    batch.append(item)
+            except queue.Empty:
+                pass
+            if batch:
+                self._write(batch)
+
+    def _rotate(self):
+        if self.backups <= 0:
+            os.remove(self.path)
+            return
+        for index in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{index}"):
+                os.replace(f"{self.path}.{index}", f"{self.path}.{index + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def _write(self, batch: List[Dict]):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if self.max_bytes and os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+            self._rotate()
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(span, default=str) + "\n" for span in batch))
+        if self.otlp_endpoint:
+            try:
+                requests.post(f"{self.otlp_endpoint}/v1/traces", json=to_otlp(batch), timeout=5)
+            except requests.RequestException as e:
+                logger.debug("OTLP export failed: %s", e)
+
+    def flush(self, timeout: float = 5.0):
+        """Drain queued spans (call on shutdown)"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+
+def to_otlp(spans: List[Dict]) -> Dict[str, Any]:
+    """OTLP/HTTP JSON payload for a batch of exported spans"""
+    kinds = {"internal": 1, "server": 2, "client": 3}
+
+    def attribute(key: str, value: Any) -> Dict:
+        if isinstance(value, bool):
+            return {"key": key, "value": {"boolValue": value}}
+        if isinstance(value, int):
+            return {"key": key, "value": {"intValue": str(value)}}
+        if isinstance(value, float):
+            return {"key": key, "value": {"doubleValue": value}}
+        return {"key": key, "value": {"stringValue": str(value)}}
+
+    return {"resourceSpans": [{
+        "resource": {"attributes": [attribute("service.name", SERVICE_NAME)]},
+        "scopeSpans": [{"scope": {"name": "loa-core.tracing"}, "spans": [{
+            "traceId": span["trace_id"],
+            "spanId": span["span_id"],
+            "parentSpanId": span["parent_id"] or "",
+            "name": span["name"],
+            "kind": kinds.get(span["kind"], 1),
+            "startTimeUnixNano": str(span["start_ns"]),
+            "endTimeUnixNano": str(span["end_ns"]),
+            "attributes": [attribute(key, value) for key, value in span["attributes"].items()],
+            "status": {"code": 2 if span["status"] == "error" else 1}
+        } for span in spans]}]
+    }]}
+
+
+exporter = SpanExporter()
+
+
+@contextmanager
+def start_span(name: str, kind: str = "internal", traceparent: Optional[str] = None,
+               attributes: Optional[Dict[str, Any]] = None) -> Iterator[Span]:
+    """Open a span as a child of the current one (or of an incoming traceparent) and make it current"""
+    parent = _current_span.get()
+    remote = parse_traceparent(traceparent) if parent is None else None
+    if parent is not None:
+        span = Span(name, parent.trace_id, parent.span_id, parent.sampled, kind, attributes)
+    elif remote is not None:
+        span = Span(name, remote["trace_id"], remote["parent_id"], remote["sampled"], kind, attributes)
+    else:
+        span = Span(name, f"{random.getrandbits(128):032x}", None, random.random() < TRACE_SAMPLE_RATE, kind, attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.status = "error"
+        span.attributes["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end_ns = time.time_ns()
+        if span.sampled:
+            exporter.export(span)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def set_attributes(**attributes):
+    """Tag the current span (e.g. lead_email) - no-op outside a trace"""
+    span = _current_span.get()
+    if span is not None:
+        span.attributes.update(attributes)
+
+
+def trace_headers(headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Outbound headers with the current traceparent added"""
+    headers = dict(headers or {})
+    span = _current_span.get()
+    if span is not None:
+        headers["traceparent"] = span.traceparent
+    return headers
+
+
+def traced(name: Optional[str] = None, kind: str = "internal") -> Callable:
+    """Decorator: run the function (sync or async) inside a span; {"status": "error"} results mark it failed"""
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        def finish(span: Span, result: Any):
+            if isinstance(result, dict) and result.get("status") == "error":
+                span.status = "error"
+                span.attributes["error"] = str(result.get("error", ""))[:200]
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with start_span(span_name, kind) as span:
+                    result = await func(*args, **kwargs)
+                    finish(span, result)
+                    return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with start_span(span_name, kind) as span:
+                result = func(*args, **kwargs)
+                finish(span, result)
+                return result
+        return wrapper
+    return decorator
+
+
+def traced_class(prefix: str, exclude: tuple = ()) -> Callable:
+    """Class decorator: a span around every method defined on the class ("notion.add_lead_to_notion")"""
+    def decorator(cls):
+        for name, member in list(vars(cls).items()):
+            if name.startswith("__") or name in exclude or not inspect.isfunction(member):
+                continue
+            setattr(cls, name, traced(f"{prefix}.{name.lstrip('_')}")(member))
+        return cls
+    return decorator
+
+
+# ---- Analysis -------------------------------------------------------------
+
+def span_files(path: str = TRACE_EXPORT_PATH) -> List[str]:
+    """The export file plus its per-worker and rotated siblings (spans.w2.jsonl, spans.jsonl.1, ...)"""
+    root, ext = (glob.escape(part) for part in os.path.splitext(path))
+    patterns = (f"{root}{ext}", f"{root}{ext}.*", f"{root}.w*{ext}", f"{root}.w*{ext}.*")
+    return sorted({match for pattern in patterns for match in glob.glob(pattern)})
+
+
+def iter_spans(path: str = TRACE_EXPORT_PATH) -> Iterator[Dict]:
+    for span_file in span_files(path):
+        with open(span_file, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+
+
+def load_spans(path: str = TRACE_EXPORT_PATH) -> List[Dict]:
+    return list(iter_spans(path))
+
+
+def traces_for_lead(spans: Iterable[Dict], lead: str) -> List[str]:
+    """Trace ids whose spans were tagged with this lead (email, name or id)"""
+    candidates = {lead.strip().lower(), pseudonymize(lead)}
+    trace_ids = []
+    for span in spans:
+        attributes = span.get("attributes", {})
+        values = (attributes.get("lead_email"), attributes.get("lead_id"), attributes.get("lead_name"))
+        if any(value is not None and str(value).lower() in candidates for value in values):
+            if span["trace_id"] not in trace_ids:
+                trace_ids.append(span["trace_id"])
+    return trace_ids
+
+
+def critical_path(spans: List[Dict]) -> List[Dict]:
+    """Longest chain through one trace: from the root, repeatedly follow the child that finished last.
+
+    Each step reports its self time on the path - the part of the span not covered by the
+    next span on the path - which is where the lead actually waited.
+    """
+    by_id = {span["span_id"]: span for span in spans}
+    children: Dict[Optional[str], List[Dict]] = {}
+    for span in spans:
+        parent = span["parent_id"] if span["parent_id"] in by_id else None
+        children.setdefault(parent, []).append(span)
+    roots = children.get(None, [])
+    if not roots:
+        return []
+    # The trace may have started upstream (edge function); treat the earliest local span as root
+    node = min(roots, key=lambda span: span["start_ns"])
+    path = []
+    while node is not None:
+        kids = children.get(node["span_id"], [])
+        nxt = max(kids, key=lambda span: span["end_ns"]) if kids else None
+        duration = (node["end_ns"] - node["start_ns"]) / 1e6
+        # Background work (e.g. the Notion sync) may start after its parent returned - no overlap then
+        covered = max(0, min(nxt["end_ns"], node["end_ns"]) - max(nxt["start_ns"], node["start_ns"])) / 1e6 if nxt else 0.0
+        path.append({
+            "name": node["name"],
+            "service": node.get("service", SERVICE_NAME),
+            "duration_ms": round(duration, 3),
+            "self_ms": round(duration - covered, 3),
+            "status": node.get("status", "ok")
+        })
+        node = nxt
+    return path
+
+
+def summarize_trace(spans: List[Dict], trace_id: str) -> Dict[str, Any]:
+    trace = [span for span in spans if span["trace_id"] == trace_id and span.get("end_ns")]
+    if not trace:
+        return {"trace_id": trace_id, "spans": 0}
+    start = min(span["start_ns"] for span in trace)
+    end = max(span["end_ns"] for span in trace)
+    path = critical_path(trace)
+    return {
+        "trace_id": trace_id,
+        "spans": len(trace),
+        "total_ms": round((end - start) / 1e6, 3),
+        "errors": sum(1 for span in trace if span.get("status") == "error"),
+        "critical_path": path,
+        "slowest_step": max(path, key=lambda step: step["self_ms"])["name"] if path else None
+    }
+
+
+def main(argv: List[str]) -> int:
+    """CLI: python tracing.py critical-path --lead <email|id> | --trace <trace_id> [--spans path]"""
+    parser = argparse.ArgumentParser(description="Summarize critical-path latency from exported spans")
+    parser.add_argument("command", choices=["critical-path"])
+    parser.add_argument("--lead")
+    parser.add_argument("--trace")
+    parser.add_argument("--spans", default=TRACE_EXPORT_PATH)
+    args = parser.parse_args(argv)
+    if not args.lead and not args.trace:
+        parser.error("--lead or --trace is required")
+
+    # Two streaming passes (find the traces, then keep only their spans) - export files can be large
+    trace_ids = [args.trace] if args.trace else traces_for_lead(iter_spans(args.spans), args.lead)
+    if not trace_ids:
+        print(f"No traces found for {args.lead}")
+        return 1
+    wanted = set(trace_ids)
+    spans = [span for span in iter_spans(args.spans) if span["trace_id"] in wanted]
+    for trace_id in trace_ids:
+        summary = summarize_trace(spans, trace_id)
+        print(f"\n🔎 Trace {trace_id}: {summary.get('total_ms', 0)} ms, {summary['spans']} spans, {summary.get('errors', 0)} errors")
+        for step in summary.get("critical_path", []):
+            marker = "❌" if step["status"] == "error" else "  "
+            print(f"{marker} {step['self_ms']:>10.1f} ms self  {step['duration_ms']:>10.1f} ms total  {step['name']}")
+        if summary.get("slowest_step"):
+            print(f"🐢 Slowest step: {summary['slowest_step']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
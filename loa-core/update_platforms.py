@@ -8,9 +8,10 @@ import logging
 import json
 from datetime import datetime
 from typing import Dict, Any
+from log_config import setup_logging
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+setup_logging()
 logger = logging.getLogger("PLATFORM_UPDATE")
 
 class PlatformUpdater:
@@ -0,0 +1,304 @@
+"""
+9LMNTS STUDIO - Webhook Ingestion Pipeline
+Acknowledge fast, journal everything, process in the background for N8n, Telegram and Twilio
+"""
+
+import os
+import json
+import time
+import hmac
+import base64
+import hashlib
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Callable, Set
+from urllib.parse import parse_qsl
+import requests
+from log_config import setup_logging
+
+# Configure logging
+setup_logging()
+logger = logging.getLogger("WEBHOOK_PIPELINE")
+
+JOURNAL_PATH = os.getenv("WEBHOOK_JOURNAL_PATH", "loa_webhook_journal.jsonl")
+JOURNAL_FSYNC = os.getenv("WEBHOOK_JOURNAL_FSYNC", "false").lower() == "true"
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "4"))
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000"))
+
+# Only these headers are worth keeping for replay / signature re-checks
+JOURNALED_HEADERS = ["content-type", "user-agent", "x-n8n-signature", "x-twilio-signature", "x-telegram-bot-api-secret-token"]
+
+
+def verify_hmac_sha256(secret: str, header_name: str) -> Callable:
+    """Verifier for `<header>: sha256=<hex hmac of raw body>` style signatures (used for N8n)"""
+    def verify(body: bytes, headers: Dict[str, str], url: str) -> bool:
+        if not secret:
+            return False  # fail closed - an unset secret must not turn the endpoint into an open one
+        provided = headers.get(header_name.lower(), "")
+        if provided.startswith("sha256="):
+            provided = provided[len("sha256="):]
+        expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(provided, expected)
+    return verify
+
+
+def verify_twilio_signature(auth_token: str, public_url: str = "") -> Callable:
+    """Verifier for X-Twilio-Signature: base64(HMAC-SHA1(url + sorted form params))
+
+    `public_url` overrides the request URL when the API sits behind a proxy.
+    """
+    def verify(body: bytes, headers: Dict[str, str], url: str) -> bool:
+        if not auth_token:
+            return False  # fail closed
+        params = sorted(parse_qsl(body.decode("utf-8", errors="replace"), keep_blank_values=True))
+        data = (public_url or url) + "".join(f"{key}{value}" for key, value in params)
+        expected = base64.b64encode(hmac.new(auth_token.encode(), data.encode(), hashlib.sha1).digest()).decode()
+        return hmac.compare_digest(headers.get("x-twilio-signature", ""), expected)
+    return verify
+
+
+def parse_webhook_body(body: str, content_type: str) -> Dict[str, Any]:
+    """Decode a raw webhook body - JSON or form-encoded (Twilio)"""
+    if "application/x-www-form-urlencoded" in content_type:
+        return dict(parse_qsl(body, keep_blank_values=True))
+    return json.loads(body) if body else {}
+
+
+class WebhookJournal:
+    """Append-only JSONL journal of raw webhook events and their processing outcomes"""
+
+    def __init__(self, path: str = JOURNAL_PATH, fsync: bool = JOURNAL_FSYNC):
+        self.path = path
+        self.fsync = fsync
+        self.last_seq = self._read_last_seq()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def _read_last_seq(self) -> int:
+        """Read the sequence number from the tail of the journal instead of scanning it"""
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return 0
+        # Acks can trail behind newer events, so look for the most recent *event* record
+        window = 65536
+        with open(self.path, "rb") as f:
+            size = f.seek(0, os.SEEK_END)
+            while True:
+                f.seek(max(0, size - window))
+                for line in reversed(f.read().splitlines()):
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # torn write from a crash (or a partial first line) - skip it
+                    if "seq" in record:
+                        return record["seq"]
+                if window >= size:
+                    return 0
+                window *= 4
+
+    def _write(self, record: Dict):
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def append_event(self, platform: str, body: str, headers: Dict[str, str]) -> int:
+        self.last_seq += 1
+        self._write({
+            "seq": self.last_seq,
+            "platform": platform,
+            "received_at": datetime.now().isoformat(),
+            "headers": {name: headers[name] for name in JOURNALED_HEADERS if name in headers},
+            "body": body
+        })
+        return self.last_seq
+
+    def append_ack(self, seq: int, status: str, duration_ms: float, error: Optional[str] = None):
+        record = {"ack": seq, "status": status, "ms": round(duration_ms, 2)}
+        if error:
+            record["error"] = error
+        self._write(record)
+
+    def read_events(self, from_seq: int = 0, platform: Optional[str] = None, only_pending: bool = True) -> List[Dict]:
+        """Load journaled events for replay; `only_pending` skips events that completed successfully"""
+        events = {}
+        done = set()
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if "ack" in record:
+                    if record["status"] == "done":
+                        done.add(record["ack"])
+                elif record["seq"] >= from_seq and (platform is None or record["platform"] == platform):
+                    events[record["seq"]] = record
+        if only_pending:
+            return [event for seq, event in events.items() if seq not in done]
+        return list(events.values())
+
+    def close(self):
+        self._file.close()
+
+
+class WebhookPipeline:
+    """Verify -> journal -> acknowledge -> dispatch to platform handlers on a bounded worker pool"""
+
+    def __init__(self, journal_path: str = JOURNAL_PATH, workers: int = WEBHOOK_WORKERS, queue_size: int = WEBHOOK_QUEUE_SIZE):
+        self.journal_path = journal_path
+        self.workers = workers
+        self.queue_size = queue_size
+        self.handlers: Dict[str, Dict[str, Any]] = {}
+        self.journal: Optional[WebhookJournal] = None
+        self.queue: Optional[asyncio.Queue] = None
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="webhook")
+        self._tasks: List[asyncio.Task] = []
+        self._pending: Set[int] = set()  # seqs queued or being processed right now - replay must not re-run them
+        self.stats = {"received": 0, "processed": 0, "failed": 0, "deferred": 0, "rejected": 0}
+
+    def register(self, platform: str, handler: Callable, verifier: Optional[Callable] = None, blocking: bool = False,
+                 enabled: Optional[Callable[[], bool]] = None):
+        """Register a platform handler. `blocking` handlers run on the thread pool, not the event loop.
+
+        `enabled` is checked per request: while it returns False the endpoint refuses the
+        platform's webhooks instead of journaling events that can't be processed.
+        """
+        self.handlers[platform] = {"handler": handler, "verifier": verifier, "blocking": blocking, "enabled": enabled}
+
+    def supports(self, platform: str) -> bool:
+        return platform in self.handlers
+
+    def is_enabled(self, platform: str) -> bool:
+        enabled = self.handlers[platform]["enabled"]
+        return enabled is None or enabled()
+
+    async def start(self):
+        self.journal = WebhookJournal(self.journal_path)
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info("🔄 Webhook pipeline started: %s workers, journal %s (seq %s)", self.workers, self.journal_path, self.journal.last_seq)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.executor.shutdown(wait=False)
+        if self.journal:
+            self.journal.close()
+
+    def verify(self, platform: str, body: bytes, headers: Dict[str, str], url: str) -> bool:
+        verifier = self.handlers[platform]["verifier"]
+        if verifier is None or verifier(body, headers, url):
+            return True
+        self.stats["rejected"] += 1
+        return False
+
+    def ingest(self, platform: str, body: bytes, headers: Dict[str, str]) -> Dict:
+        """Journal a verified event and queue it. Never waits on processing."""
+        self.stats["received"] += 1
+        seq = self.journal.append_event(platform, body.decode("utf-8", errors="replace"), headers)
+        event = {"seq": seq, "platform": platform, "body": body.decode("utf-8", errors="replace"), "headers": headers}
+        try:
+            self.queue.put_nowait(event)
+            self._pending.add(seq)
+            return {"status": "accepted", "event_id": seq}
+        except asyncio.QueueFull:
+            # Still safe: the event is journaled and will be picked up by the next replay
+            self.stats["deferred"] += 1
+            logger.warning("⚠️ Webhook queue full - event %s deferred to replay", seq)
+            return {"status": "deferred", "event_id": seq}
+
+    async def replay(self, from_seq: int = 0, platform: Optional[str] = None, only_pending: bool = True) -> Dict:
+        """Re-dispatch journaled events (by default only the ones that never completed).
+
+        Events this process still has queued or in flight are skipped - they have no ack yet
+        but are about to be processed, and replaying them would run them twice.
+        """
+        events = await asyncio.get_running_loop().run_in_executor(
+            self.executor, self.journal.read_events, from_seq, platform, only_pending
+        )
+        replayed = 0
+        for record in events:
+            if record["platform"] not in self.handlers or record["seq"] in self._pending:
+                continue
+            self._pending.add(record["seq"])
+            await self.queue.put({
+                "seq": record["seq"],
+                "platform": record["platform"],
+                "body": record["body"],
+                "headers": record.get("headers", {})
+            })
+            replayed += 1
+        logger.info("🔁 Replayed %s webhook events from seq %s", replayed, from_seq)
+        return {"status": "replaying", "events": replayed}
+
+    async def _worker(self, worker_id: int):
+        loop = asyncio.get_running_loop()
+        while True:
+            event = await self.queue.get()
+            started = time.perf_counter()
+            try:
+                entry = self.handlers[event["platform"]]
+                payload = parse_webhook_body(event["body"], event["headers"].get("content-type", ""))
+                if entry["blocking"]:
+                    await loop.run_in_executor(self.executor, _run_handler, entry["handler"], payload)
+                else:
+                    await entry["handler"](payload)
+                self.stats["processed"] += 1
+                self.journal.append_ack(event["seq"], "done", (time.perf_counter() - started) * 1000)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.error("❌ Webhook %s event %s failed: %s", event['platform'], event['seq'], e)
+                self.journal.append_ack(event["seq"], "error", (time.perf_counter() - started) * 1000, str(e))
+            finally:
+                self._pending.discard(event["seq"])
+                self.queue.task_done()
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            "queue_depth": self.queue.qsize() if self.queue else 0,
+            "workers": self.workers,
+            "last_seq": self.journal.last_seq if self.journal else 0
+        }
+
+
+def _run_handler(handler: Callable, payload: Dict):
+    """Run a handler on a pool thread - async handlers get their own short-lived loop"""
+    if asyncio.iscoroutinefunction(handler):
+        return asyncio.run(handler(payload))
+    return handler(payload)
+
+
+class TwilioSMSHandler:
+    """Answers inbound Twilio SMS with LOA Brain and replies via the Twilio REST API"""
+
+    def __init__(self, brain):
+        self.brain = brain
+        self.account_sid = os.getenv("TWILIO_ACCOUNT_SID", "")
+        self.auth_token = os.getenv("TWILIO_AUTH_TOKEN", "")
+        self.from_number = os.getenv("TWILIO_PHONE_NUMBER", "")
+
+    def __call__(self, payload: Dict) -> Dict:
+        sender = payload.get("From", "")
+        text = payload.get("Body", "")
+        response = self.brain.think(text)
+        self.brain.log_interaction(sender, text, response)
+
+        if not (self.account_sid and self.auth_token and self.from_number):
+            logger.warning("Twilio credentials not configured - SMS reply skipped")
+            return {"status": "skipped"}
+
+        result = requests.post(
+            f"https://api.twilio.com/2010-04-01/Accounts/{self.account_sid}/Messages.json",
+            data={"From": self.from_number, "To": sender, "Body": response[:1600]},
+            auth=(self.account_sid, self.auth_token),
+            timeout=15
+        )
+        result.raise_for_status()
+        logger.info("📱 SMS reply sent to %s", sender)
+        return {"status": "sent"}
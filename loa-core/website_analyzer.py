@@ -0,0 +1,278 @@
+"""
+9LMNTS STUDIO - Website Opportunity Analyzer
+Scans prospect websites for AI opportunities and pain points (stale content, missing SEO basics, heavy pages, no chat)
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from datetime import datetime
+from urllib.parse import urljoin, urlparse
+from typing import Dict, Any, List, Optional, Tuple
+
+import httpx
+
+from lead_sourcing import PageExtractor, CONTACT_LINK_HINTS, CRAWL_USER_AGENT, CRAWL_TIMEOUT, UnsafeURLError, guarded_get
+from metrics import timed_scorer
+from execution import execution, execution_policy, BLOCKING
+from log_config import setup_logging
+
+# Configure logging
+setup_logging()
+logger = logging.getLogger("WEBSITE_ANALYZER")
+
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", "http_cache")
+ANALYZER_MAX_PAGES = int(os.getenv("ANALYZER_MAX_PAGES", "8"))
+ANALYZER_CONNECTIONS = int(os.getenv("ANALYZER_CONNECTIONS", "32"))
+ANALYZER_PAGE_CONCURRENCY = int(os.getenv("ANALYZER_PAGE_CONCURRENCY", "4"))  # per site
+ANALYZER_PARSE_WORKERS = int(os.getenv("ANALYZER_PARSE_WORKERS", "4"))
+
+# Page parsing runs on threads: shipping whole pages to the spawn-based process pool costs more than
+# the parse, and every pool worker re-imports the API module
+execution.add_pool("analyzer", BLOCKING, ANALYZER_PARSE_WORKERS)
+
+COPYRIGHT_PATTERN = re.compile(r"(?:©|&copy;|copyright)\s*(?:\d{4}\s*[-–]\s*)?((?:19|20)\d{2})", re.IGNORECASE)
+CHAT_WIDGET_SIGNATURES = (
+    "intercom", "drift.com", "tawk.to", "crisp.chat", "zdassets.com", "livechatinc", "tidio",
+    "js.hs-scripts.com", "hubspot.com/conversations", "olark", "freshchat", "chatra"
+)
+# Pages beyond the homepage most likely to show the business's state (services, contact, pricing)
+PRIORITY_LINK_HINTS = CONTACT_LINK_HINTS + ("service", "pricing", "product", "shop")
+HEAVY_PAGE_BYTES = 500_000
+
+# (signal, weight, pain point) - weights sum to 100
+PAIN_POINT_RULES = [
+    ("stale_copyright", 25, "📅 Outdated website - copyright year is stale"),
+    ("missing_meta_description", 15, "🔍 Missing meta descriptions - weak SEO"),
+    ("missing_viewport", 15, "📱 Not mobile-optimized (no viewport meta tag)"),
+    ("missing_social_meta", 10, "🔗 No social sharing (Open Graph) tags"),
+    ("heavy_pages", 10, "🐢 Heavy pages - slow load times"),
+    ("no_chat_widget", 15, "💬 No chat widget - missed AI customer service opportunity"),
+    ("no_https", 10, "🔓 Not served over HTTPS"),
+]
+
+
+class HTTPCache:
+    """On-disk HTTP cache keyed by URL: validators (ETag/Last-Modified) + body, for conditional GETs"""
+
+    def __init__(self, directory: str = HTTP_CACHE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, url: str) -> Tuple[str, str]:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        shard = os.path.join(self.directory, key[:2])
+        return os.path.join(shard, key + ".json"), os.path.join(shard, key + ".body")
+
+    def load(self, url: str) -> Optional[Dict]:
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            with open(body_path, "rb") as f:
+                entry["body"] = f.read()
+            return entry
+        except (OSError, ValueError):
+            return None
+
+    def store(self, url: str, headers: Dict[str, str], body: bytes):
+        meta_path, body_path = self._paths(url)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        with open(body_path + ".tmp", "wb") as f:
+            f.write(body)
+        os.replace(body_path + ".tmp", body_path)
+        entry = {
+            "url": url,
+            "etag": headers.get("etag"),
+            "last_modified": headers.get("last-modified"),
+            "content_type": headers.get("content-type", ""),
+            "stored_at": datetime.now().isoformat()
+        }
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(meta_path + ".tmp", meta_path)
+
+
+@execution_policy(BLOCKING, pool="analyzer")
+def page_signals(url: str, html: str, size: int) -> Dict[str, Any]:
+    """Pain-point signals for one page"""
+    page = PageExtractor()
+    page.feed(html)
+    years = [int(year) for year in COPYRIGHT_PATTERN.findall(html)]
+    lowered = html.lower()
+    return {
+        "url": url,
+        "title": page.title.strip(),
+        "bytes": size,
+        "copyright_year": max(years) if years else None,
+        "has_meta_description": bool(page.meta.get("description")),
+        "has_viewport": "viewport" in page.meta,
+        "has_social_meta": any(name.startswith(("og:", "twitter:")) for name in page.meta),
+        "has_chat_widget": any(signature in lowered for signature in CHAT_WIDGET_SIGNATURES),
+        "links": page.links
+    }
+
+
+@timed_scorer("website_pain_points")
+def score_signals(site_url: str, pages: List[Dict]) -> Dict[str, Any]:
+    """Aggregate page signals into site-level flags and a 0-100 pain-point score"""
+    current_year = datetime.now().year
+    years = [page["copyright_year"] for page in pages if page["copyright_year"]]
+    flags = {
+        "stale_copyright": bool(years) and max(years) < current_year - 1,
+        "missing_meta_description": any(not page["has_meta_description"] for page in pages),
+        "missing_viewport": any(not page["has_viewport"] for page in pages),
+        "missing_social_meta": not any(page["has_social_meta"] for page in pages),
+        "heavy_pages": any(page["bytes"] > HEAVY_PAGE_BYTES for page in pages),
+        "no_chat_widget": not any(page["has_chat_widget"] for page in pages),
+        "no_https": urlparse(site_url).scheme != "https",
+    }
+    score = 0
+    pain_points = []
+    for signal, weight, message in PAIN_POINT_RULES:
+        if flags[signal]:
+            score += weight
+            pain_points.append(message)
+    return {
+        "pain_point_score": score,
+        "pain_points": pain_points,
+        "signals": flags,
+        "copyright_year": max(years) if years else None,
+        "average_page_bytes": sum(page["bytes"] for page in pages) // len(pages) if pages else 0,
+    }
+
+
+class WebsiteAnalyzer:
+    """Concurrent site analysis over one shared connection pool with an on-disk conditional-GET cache"""
+
+    def __init__(self, cache: Optional[HTTPCache] = None, max_pages: int = ANALYZER_MAX_PAGES):
+        self.cache = cache or HTTPCache()
+        self.max_pages = max_pages
+        self.client: Optional[httpx.AsyncClient] = None
+        self.stats = {"requests": 0, "not_modified": 0, "fetched": 0, "failed": 0, "blocked": 0, "sites": 0}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                timeout=CRAWL_TIMEOUT,
+                follow_redirects=False,  # guarded_get follows them, re-checking each hop
+                headers={"User-Agent": CRAWL_USER_AGENT},
+                limits=httpx.Limits(max_connections=ANALYZER_CONNECTIONS, max_keepalive_connections=ANALYZER_CONNECTIONS)
+            )
+        return self.client
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def fetch(self, url: str) -> Optional[Tuple[str, int]]:
+        """GET with If-None-Match/If-Modified-Since; a 304 is served from the disk cache"""
+        cached = await execution.run_in(BLOCKING, self.cache.load, url)
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        self.stats["requests"] += 1
+        try:
+            response = await guarded_get(self._get_client(), url, headers=headers)
+        except UnsafeURLError as e:
+            self.stats["blocked"] += 1
+            logger.warning("🚫 %s", e)
+            return None
+        except httpx.HTTPError as e:
+            self.stats["failed"] += 1
+            logger.debug("Fetch failed for %s: %s", url, e)
+            return None
+
+        if response.status_code == 304 and cached:
+            self.stats["not_modified"] += 1
+            body = cached["body"]
+        elif response.status_code == 200:
+            self.stats["fetched"] += 1
+            body = response.content
+            if response.headers.get("etag") or response.headers.get("last-modified"):
+                await execution.run_in(BLOCKING, self.cache.store, url, dict(response.headers), body)
+        else:
+            self.stats["failed"] += 1
+            return None
+        return body.decode("utf-8", "replace"), len(body)
+
+    def _pick_pages(self, site_url: str, links: List[str]) -> List[str]:
+        host = urlparse(site_url).netloc
+        candidates = []
+        for href in links:
+            absolute = urljoin(site_url, href).split("#")[0]
+            if urlparse(absolute).netloc == host and absolute.rstrip("/") != site_url.rstrip("/"):
+                candidates.append(absolute)
+        candidates = list(dict.fromkeys(candidates))
+        candidates.sort(key=lambda link: not any(hint in link.lower() for hint in PRIORITY_LINK_HINTS))
+        return candidates[:self.max_pages - 1]
+
+    async def analyze(self, site_url: str) -> Dict[str, Any]:
+        """Fetch the homepage, then its most relevant same-site pages in parallel, and score pain points"""
+        if "://" not in site_url:
+            site_url = "https://" + site_url
+        started = time.perf_counter()
+        homepage = await self.fetch(site_url)
+        if homepage is None:
+            return {"url": site_url, "status": "unreachable", "pain_point_score": 0, "pain_points": []}
+
+        # HTML parsing runs on the analyzer thread pool, not on the loop
+        pages = [await execution.run(page_signals, site_url, *homepage)]
+        semaphore = asyncio.Semaphore(ANALYZER_PAGE_CONCURRENCY)
+
+        async def fetch_page(url: str) -> Optional[Dict]:
+            async with semaphore:
+                result = await self.fetch(url)
+            return await execution.run(page_signals, url, *result) if result else None
+
+        subpages = await asyncio.gather(*[fetch_page(url) for url in self._pick_pages(site_url, pages[0]["links"])])
+        pages.extend(page for page in subpages if page)
+        self.stats["sites"] += 1
+
+        analysis = score_signals(site_url, pages)
+        analysis.update({
+            "url": site_url,
+            "status": "analyzed",
+            "pages_analyzed": len(pages),
+            "analyzed_at": datetime.now().isoformat(),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1)
+        })
+        return analysis
+
+    async def analyze_many(self, site_urls: List[str], concurrency: int = 8) -> List[Dict]:
+        """Analyze several prospects at once over the same pool"""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(url: str) -> Dict:
+            async with semaphore:
+                return await self.analyze(url)
+
+        return await asyncio.gather(*[run(url) for url in site_urls])
+
+
+async def main(argv: List[str]):
+    """python website_analyzer.py <site> [<site> ...]"""
+    if not argv:
+        print("Usage: python website_analyzer.py <site> [<site> ...]")
+        return
+    analyzer = WebsiteAnalyzer()
+    try:
+        for analysis in await analyzer.analyze_many(argv):
+            print(json.dumps(analysis, indent=2, ensure_ascii=False))
+    finally:
+        await analyzer.close()
+    print(json.dumps(analyzer.stats))
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
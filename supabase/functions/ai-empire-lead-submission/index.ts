@@ -18,11 +18,36 @@ const EMAIL_TO = Deno.env.get('EMAIL_TO');
 
 console.log('Function ai-empire-lead-submission starting');
 
-async function forwardToAIEmpire(lead) {
+// W3C trace context: continue the caller's trace or start one, and pass it to the AI Empire API
+function randomHex(bytes) {
+    return Array.from(crypto.getRandomValues(new Uint8Array(bytes)), (b) => b.toString(16).padStart(2, '0')).join('');
+}
+
+function startTrace(req) {
+    const incoming = /^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$/.exec(req.headers.get('traceparent') || '');
+    const traceId = incoming ? incoming[1] : randomHex(16);
+    const spanId = randomHex(8);
+    return { traceId, spanId, parentId: incoming ? incoming[2] : null, start: Date.now(), traceparent: `00-${traceId}-${spanId}-01` };
+}
+
+function endTrace(trace, lead, results) {
+    // Edge logs are the span sink here; the loa-core spans carry the same trace_id
+    console.log(JSON.stringify({
+        span: 'ai-empire-lead-submission',
+        trace_id: trace.traceId,
+        span_id: trace.spanId,
+        parent_id: trace.parentId,
+        duration_ms: Date.now() - trace.start,
+        lead_email: lead.email,
+        forward_ok: results.forward && results.forward.ok,
+    }));
+}
+
+async function forwardToAIEmpire(lead, trace) {
     try {
         const res = await fetch(AI_EMPIRE_URL, {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
+            headers: { 'Content-Type': 'application/json', traceparent: trace.traceparent },
             body: JSON.stringify(lead),
         });
         const data = await res.text();
@@ -120,9 +145,10 @@ serve(async (req) => {
         return new Response(JSON.stringify({ error: 'Missing name or email' }), { status: 400, headers: { 'Content-Type': 'application/json' } });
     }
 
-    const results = {};
+    const trace = startTrace(req);
+    const results = { trace_id: trace.traceId };
     // Forward to AI Empire but don't fail the request if unreachable
-    results.forward = await forwardToAIEmpire(lead);
+    results.forward = await forwardToAIEmpire(lead, trace);
 
     // Save to Supabase
     results.saved = await saveToSupabase(lead);
@@ -134,6 +160,7 @@ serve(async (req) => {
         sendEmail(lead),
     ]);
     results.integrations = { slack: slackRes, notion: notionRes, email: emailRes };
+    endTrace(trace, lead, results);
 
     return new Response(JSON.stringify(results), { status: 200, headers: { 'Content-Type': 'application/json' } });
 });